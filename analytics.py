@@ -0,0 +1,206 @@
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from booking_view import to_day
+from extras import EXTRAS_PRICES, LineItem
+
+# Seasons start in December, March, June and September.
+SEASON_FREQ = 'QS-DEC'
+# Days added at either end when a booking falls outside the tables.
+GROWTH_DAYS = 366
+
+# (site column, first night, departure day, people, ((extras column, amount), ...)),
+# days as datetime64[D] integers.
+Contribution = Tuple[int, int, int, int, Tuple[Tuple[int, int], ...]]
+
+
+class DailyRollups:
+    # Per-day totals over the whole booking history, patched in place as
+    # bookings change so that dashboards over any range read the tables
+    # instead of the bookings. For day d and site s:
+    #   people[d, s]      people staying the night of d
+    #   stays[d, s]       bookings staying the night of d
+    #   arrivals[d, s]    bookings starting on d
+    #   departures[d, s]  bookings ending on d
+    #   extras[d, i]      extras revenue by item (from the extras ledger),
+    #                     counted on the arrival day
+    # Canceled bookings count for nothing.
+    def __init__(self, campsites: Dict[str, int], first_day: Any = None, days: int = 0):
+        self.campsites = list(campsites)
+        self.capacities = np.array([campsites[site] for site in self.campsites], dtype=np.int64)
+        self.first = int(to_day(first_day if first_day is not None else pd.Timestamp.today()).astype(np.int64))
+        shape = (days, len(self.campsites))
+        self.people = np.zeros(shape, dtype=np.int64)
+        self.stays = np.zeros(shape, dtype=np.int32)
+        self.arrivals = np.zeros(shape, dtype=np.int32)
+        self.departures = np.zeros(shape, dtype=np.int32)
+        self.items = [item for item, price in EXTRAS_PRICES.items() if price]
+        self.extras = np.zeros((days, len(self.items)), dtype=np.int64)
+        self._contributions: Dict[int, Contribution] = {}
+
+    @classmethod
+    def from_frame(cls, bookings: pd.DataFrame, campsites: Dict[str, int],
+                   extras: Optional[Mapping[int, Sequence[LineItem]]] = None) -> 'DailyRollups':
+        live = bookings[bookings['Status'] != 'Canceled']
+        if live.empty:
+            return cls(campsites)
+        starts = pd.to_datetime(live['Start Date']).to_numpy(dtype='datetime64[D]').astype(np.int64)
+        ends = np.maximum(pd.to_datetime(live['End Date']).to_numpy(dtype='datetime64[D]').astype(np.int64), starts)
+        first, last = int(starts.min()), int(ends.max())
+        rollups = cls(campsites, np.datetime64(first, 'D'), last - first + 1)
+        sites = live['Campsite'].astype(str)
+        codes = sites.map({site: rollups._site_column(site) for site in pd.unique(sites)}).to_numpy(dtype=np.int64)
+        people = pd.to_numeric(live['People'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+        lo, hi = starts - first, ends - first
+        days = len(rollups.people)
+
+        people_diff = np.zeros((days + 1, len(rollups.campsites)), dtype=np.int64)
+        np.add.at(people_diff, (lo, codes), people)
+        np.add.at(people_diff, (hi, codes), -people)
+        rollups.people = np.cumsum(people_diff, axis=0)[:days]
+        stays_diff = np.zeros((days + 1, len(rollups.campsites)), dtype=np.int32)
+        np.add.at(stays_diff, (lo, codes), 1)
+        np.add.at(stays_diff, (hi, codes), -1)
+        rollups.stays = np.cumsum(stays_diff, axis=0, dtype=np.int32)[:days]
+        np.add.at(rollups.arrivals, (lo, codes), 1)
+        np.add.at(rollups.departures, (hi, codes), 1)
+
+        extras = extras or {}
+        for booking_id, code, start, end, count in zip(live['ID'].astype(int), codes, starts, ends, people):
+            items = rollups._extras_columns(extras.get(booking_id, ()))
+            for item, amount in items:
+                rollups.extras[start - first, item] += amount
+            rollups._contributions[booking_id] = (int(code), int(start), int(end), int(count), items)
+        return rollups
+
+    def __len__(self) -> int:
+        return len(self.people)
+
+    def _site_column(self, campsite: str) -> int:
+        # Sites not in CAMPSITES (old data) get a column with no capacity.
+        if campsite not in self.campsites:
+            self.campsites.append(campsite)
+            self.capacities = np.append(self.capacities, 0)
+            for name in ('people', 'stays', 'arrivals', 'departures'):
+                table = getattr(self, name)
+                setattr(self, name, np.hstack([table, np.zeros((len(table), 1), dtype=table.dtype)]))
+        return self.campsites.index(campsite)
+
+    def _extras_columns(self, lines: Sequence[LineItem]) -> Tuple[Tuple[int, int], ...]:
+        columns = []
+        for item, _, _, amount in lines:
+            if not amount:
+                continue
+            if item not in self.items:
+                self.items.append(item)
+                self.extras = np.hstack([self.extras, np.zeros((len(self.extras), 1), dtype=self.extras.dtype)])
+            columns.append((self.items.index(item), amount))
+        return tuple(columns)
+
+    def _cover(self, first: int, last: int) -> None:
+        # Grow the tables so days first..last (inclusive) have rows.
+        before = max(self.first - first, 0)
+        after = max(last - (self.first + len(self) - 1), 0)
+        if not before and not after:
+            return
+        before += GROWTH_DAYS if before else 0
+        after += GROWTH_DAYS if after else 0
+        if not len(self):
+            before, after = 0, last - first + 1
+            self.first = first
+        for name in ('people', 'stays', 'arrivals', 'departures', 'extras'):
+            setattr(self, name, np.pad(getattr(self, name), ((before, after), (0, 0))))
+        self.first -= before
+
+    def _apply(self, contribution: Contribution, sign: int) -> None:
+        code, start, end, people, items = contribution
+        lo, hi = start - self.first, end - self.first
+        self.people[lo:hi, code] += sign * people
+        self.stays[lo:hi, code] += sign
+        self.arrivals[lo, code] += sign
+        self.departures[hi, code] += sign
+        for item, amount in items:
+            self.extras[lo, item] += sign * amount
+
+    def add(self, record: Dict[str, Any], lines: Sequence[LineItem] = ()) -> None:
+        # Adds or replaces the booking's contribution; lines are its extras
+        # line items.
+        booking_id = int(record['ID'])
+        self.remove(booking_id)
+        if record['Status'] == 'Canceled':
+            return
+        start = int(to_day(record['Start Date']).astype(np.int64))
+        end = max(int(to_day(record['End Date']).astype(np.int64)), start)
+        code = self._site_column(str(record['Campsite']))
+        items = self._extras_columns(lines)
+        contribution = (code, start, end, int(record['People'] or 0), items)
+        self._cover(start, end)
+        self._apply(contribution, 1)
+        self._contributions[booking_id] = contribution
+
+    def remove(self, booking_id: int) -> None:
+        contribution = self._contributions.pop(int(booking_id), None)
+        if contribution is not None:
+            self._apply(contribution, -1)
+
+    def _rows(self, table: np.ndarray, start: int, days: int) -> np.ndarray:
+        # table rows for days start.., zeros where the tables don't reach.
+        out = np.zeros((days,) + table.shape[1:], dtype=table.dtype)
+        lo, hi = max(start - self.first, 0), min(start + days - self.first, len(self))
+        if lo < hi:
+            out[lo - (start - self.first):hi - (start - self.first)] = table[lo:hi]
+        return out
+
+    def _window(self, start_date: Any, end_date: Any) -> Tuple[int, int]:
+        start = int(to_day(start_date).astype(np.int64))
+        return start, max(int(to_day(end_date).astype(np.int64)) - start + 1, 0)
+
+    def daily(self, start_date: Any, end_date: Any, campsites: Optional[List[str]] = None) -> pd.DataFrame:
+        # One row per day from start_date to end_date inclusive. Occupancy %
+        # is people staying that night against the sites' capacity.
+        start, days = self._window(start_date, end_date)
+        columns = [self.campsites.index(site) for site in campsites if site in self.campsites] if campsites else slice(None)
+        people = self._rows(self.people, start, days)[:, columns]
+        stays = self._rows(self.stays, start, days)[:, columns]
+        capacity = int(self.capacities[columns].sum())
+        revenue = self._rows(self.extras, start, days)
+        return pd.DataFrame({
+            'Date': pd.to_datetime(np.arange(start, start + days).astype('datetime64[D]')),
+            'People': people.sum(axis=1),
+            'Capacity': capacity,
+            'Occupancy %': np.round(people.sum(axis=1) * 100 / capacity, 1) if capacity else 0.0,
+            'Sites Occupied': (stays > 0).sum(axis=1),
+            'Arrivals': self._rows(self.arrivals, start, days)[:, columns].sum(axis=1),
+            'Departures': self._rows(self.departures, start, days)[:, columns].sum(axis=1),
+            'Extras Revenue': revenue.sum(axis=1)
+        })
+
+    def by_campsite(self, start_date: Any, end_date: Any) -> pd.DataFrame:
+        start, days = self._window(start_date, end_date)
+        people_nights = self._rows(self.people, start, days).sum(axis=0)
+        capacity_nights = self.capacities * days
+        return pd.DataFrame({
+            'Campsite': self.campsites,
+            'Capacity': self.capacities,
+            'People-Nights': people_nights,
+            'Capacity-Nights': capacity_nights,
+            'Occupancy %': np.round(np.divide(people_nights * 100, capacity_nights, out=np.zeros(len(self.campsites)),
+                                              where=capacity_nights > 0), 1),
+            'Nights Occupied': (self._rows(self.stays, start, days) > 0).sum(axis=0),
+            'Arrivals': self._rows(self.arrivals, start, days).sum(axis=0)
+        })
+
+    def by_period(self, start_date: Any, end_date: Any, freq: str = SEASON_FREQ) -> pd.DataFrame:
+        # Totals per period (seasons by default; 'MS' for months, 'YS' for
+        # years) with extras revenue broken down by item.
+        start, days = self._window(start_date, end_date)
+        daily = self.daily(start_date, end_date).set_index('Date')
+        revenue = pd.DataFrame(self._rows(self.extras, start, days), index=daily.index, columns=self.items)
+        totals = pd.concat([daily[['People', 'Arrivals', 'Departures', 'Extras Revenue']], revenue], axis=1).resample(freq).sum()
+        capacity_nights = daily['Capacity'].resample(freq).sum()
+        totals.insert(1, 'Occupancy %', np.round(totals['People'] * 100 / capacity_nights.where(capacity_nights > 0), 1).fillna(0.0))
+        totals = totals.rename(columns={'People': 'People-Nights'})
+        totals.index.name = 'Period'
+        return totals.reset_index()
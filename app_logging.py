@@ -0,0 +1,75 @@
+import gzip
+import logging
+import os
+import queue
+import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional, Union
+
+LOG_FILE = 'app.log'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+# Starting level; DEBUG, INFO, WARNING... Can be changed later with set_level.
+LOG_LEVEL = os.environ.get('BOOKING_LOG_LEVEL', 'INFO')
+
+_listener: Optional[QueueListener] = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    # The stock QueueHandler formats each message on the calling thread
+    # before queueing it. Here the record goes on the queue untouched, and
+    # the listener thread does the %-formatting and the file write.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    # app.log rolls over at max_bytes into app.log.1.gz ... app.log.N.gz.
+    def __init__(self, filename: str, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True)
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+def configure_logging(path: str = LOG_FILE, level: Union[int, str] = LOG_LEVEL,
+                      max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS) -> QueueListener:
+    # Every logger call just puts a record on a queue; one listener thread
+    # formats and writes them. Call stop_logging() on exit to drain it.
+    global _listener
+    stop_logging()
+    file_handler = CompressingRotatingFileHandler(path, max_bytes, backups)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(records))
+    set_level(level)
+    _listener = QueueListener(records, file_handler)
+    _listener.start()
+    return _listener
+
+
+def set_level(level: Union[int, str]) -> None:
+    logging.getLogger().setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def debug_enabled() -> bool:
+    return logging.getLogger().isEnabledFor(logging.DEBUG)
+
+
+def stop_logging() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
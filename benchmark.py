@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from booking_engine import CAMPSITES, BookingEngine
+from extras import EXTRAS_JOURNAL, EXTRAS_SNAPSHOT, ExtrasLedger
+from journal import BOOKING_COLUMNS, BookingJournal
+from repository import CsvBookingRepository, SqliteBookingRepository
+
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn',
+               'Charlie', 'Drew', 'Harper', 'Kai', 'Logan', 'Peyton', 'Reese', 'Rowan', 'Sky', 'Toby']
+LAST_NAMES = ['Smith', 'Jones', 'Williams', 'Brown', 'Wilson', 'Taylor', 'Nguyen', 'Johnson', 'Martin', 'White',
+              'Anderson', 'Walker', 'Harris', 'Lee', 'Ryan', 'Robinson', 'Kelly', 'King', 'Murphy', 'Campbell']
+EXTRAS_SAMPLES = ['', '', '', 'Fire Wood (2)', 'Bag of Ice (3)', 'Fire Wood (1), Bag of Ice (2)',
+                  'Breakfast Special (4)', 'Meat Tray (1), Portable Toilet (Yes)', 'Kayaks Count (2), Kayaks (Yes)']
+PERCENTILES = [50, 90, 95, 99]
+
+
+def generate_bookings(count: int, seed: int = 0, first_day: str = '2015-01-01', campsites: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    # Seeded synthetic bookings. Arrivals are spread so each site is roughly
+    # 60% occupied (capped at a century of history, so the largest sizes
+    # overbook), stays are 1-21 nights with most under a week, and about 5%
+    # are group bookings of 20-80 people.
+    campsites = campsites if campsites is not None else CAMPSITES
+    rng = np.random.default_rng(seed)
+    sites = np.array(list(campsites))
+    capacity = np.array(list(campsites.values()))
+
+    stays = np.minimum(rng.geometric(0.3, count), 21)
+    window = min(max(int(stays.mean() * count / (len(sites) * 0.6)), 30), 36525)
+    starts = pd.Timestamp(first_day) + pd.to_timedelta(np.sort(rng.integers(0, window, count)), unit='D')
+    site_codes = rng.integers(0, len(sites), count)
+    groups = rng.random(count) < 0.05
+    people = np.where(groups, rng.integers(20, 81, count), rng.integers(1, capacity[site_codes] + 1))
+    kayaks_count = np.where(rng.random(count) < 0.1, rng.integers(1, 5, count), 0)
+    names = (np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), count)].astype(object) + ' '
+             + np.array(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), count)].astype(object))
+
+    df = pd.DataFrame({
+        'ID': np.arange(1, count + 1),
+        'Name': names,
+        'Phone': [f"04{n:08d}" for n in rng.integers(0, 10 ** 8, count)],
+        'Email': [f"{name.replace(' ', '.').lower()}{i}@example.com" for i, name in enumerate(names)],
+        'Campsite': sites[site_codes],
+        'Start Date': starts,
+        'End Date': starts + pd.to_timedelta(stays, unit='D'),
+        'People': people,
+        'Status': rng.choice(['Confirmed', 'Pending', 'Canceled'], count, p=[0.7, 0.2, 0.1]),
+        'Extras': np.array(EXTRAS_SAMPLES, dtype=object)[rng.integers(0, len(EXTRAS_SAMPLES), count)],
+        'Extras Paid': rng.random(count) < 0.5,
+        'Kayaks': kayaks_count > 0,
+        'Kayaks Count': kayaks_count,
+        'Is Group Booking': groups,
+        'Group ID': np.where(groups, np.arange(1, count + 1), 0)
+    })
+    return df[BOOKING_COLUMNS]
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    ms = np.array(samples) * 1000
+    summary = {'runs': len(samples), 'mean_ms': float(ms.mean()), 'min_ms': float(ms.min()), 'max_ms': float(ms.max())}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(ms, p))
+    return summary
+
+
+def measure(fn: Callable[[], Any], runs: int) -> Dict[str, Any]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def calendar_stub(engine: BookingEngine) -> Any:
+    # Stand-in for the Tk BookingManager: just the attributes the calendar
+    # text methods read, so they can be timed without a display.
+    from main import BookingManager
+    stub = SimpleNamespace(color_map={}, occupancy=None,
+                           generate_random_color=lambda: BookingManager.generate_random_color(None))
+    stub.get_booking_text_for_day = lambda day: BookingManager.get_booking_text_for_day(stub, day)
+    stub.get_booking_text_for_date = lambda date: BookingManager.get_booking_text_for_date(stub, date)
+    stub.load_bookings = lambda year, month: setattr(stub, 'occupancy', engine.load_month(year, month)[1])
+    return stub
+
+
+class BenchmarkRun:
+    def __init__(self, size: int, backend: str, workdir: str, seed: int, runs: int):
+        self.size = size
+        self.backend = backend
+        self.workdir = workdir
+        self.runs = runs
+        self.rng = random.Random(seed)
+        self.bookings = generate_bookings(size, seed)
+        self.first_day = self.bookings['Start Date'].min()
+        self.last_day = self.bookings['End Date'].max()
+        self.snapshot_path = os.path.join(workdir, 'bookings.csv')
+        self.bookings.to_csv(self.snapshot_path, index=False, date_format='%Y-%m-%d')
+        if backend == 'sqlite':
+            repository = SqliteBookingRepository(os.path.join(workdir, 'bookings.db'))
+            repository.insert_many(self.bookings.to_dict('records'))
+            repository.close()
+        self.engine = self.open_engine()
+
+    def open_engine(self) -> BookingEngine:
+        ledger = ExtrasLedger(os.path.join(self.workdir, EXTRAS_SNAPSHOT), os.path.join(self.workdir, EXTRAS_JOURNAL))
+        if self.backend == 'sqlite':
+            return BookingEngine(SqliteBookingRepository(os.path.join(self.workdir, 'bookings.db')), ledger=ledger)
+        return BookingEngine(CsvBookingRepository(BookingJournal(
+            snapshot_path=self.snapshot_path,
+            journal_path=os.path.join(self.workdir, 'bookings.journal'),
+            formatted_path=os.path.join(self.workdir, 'bookings_formatted.txt'),
+            compact_every=sys.maxsize
+        )), ledger=ledger)
+
+    def random_day(self) -> pd.Timestamp:
+        return self.first_day + pd.Timedelta(days=self.rng.randrange((self.last_day - self.first_day).days + 1))
+
+    def random_month(self) -> tuple:
+        day = self.random_day()
+        return day.year, day.month
+
+    def run(self) -> Dict[str, Any]:
+        results = {}
+
+        def load_all() -> None:
+            engine = self.open_engine()
+            engine.load()
+            engine.close()
+        results['load_all_bookings'] = measure(load_all, max(1, min(self.runs, 5)))
+        self.engine.load()
+
+        months = [self.random_month() for _ in range(self.runs)]
+        results['load_bookings'] = measure(lambda: self.engine.load_month(*months.pop()), self.runs)
+
+        try:
+            calendar = calendar_stub(self.engine)
+        except ImportError as e:
+            results['get_booking_text_for_date'] = {'skipped': f"main.py could not be imported: {e}"}
+        else:
+            calendar.load_bookings(*self.random_month())
+            days = [(calendar.occupancy.first_day + self.rng.randrange(calendar.occupancy.days)).astype(datetime).strftime('%d/%m/%Y')
+                    for _ in range(self.runs)]
+            results['get_booking_text_for_date'] = measure(lambda: calendar.get_booking_text_for_date(days.pop()), self.runs)
+
+        sites = list(CAMPSITES)
+        checks = []
+        for _ in range(self.runs):
+            start = self.random_day()
+            checks.append((self.rng.choice(sites), start, start + pd.Timedelta(days=self.rng.randrange(1, 8))))
+        results['is_site_booked'] = measure(lambda: self.engine.is_site_booked(*checks.pop()), self.runs)
+
+        searches = [(self.rng.choice(LAST_NAMES + FIRST_NAMES)[:4], self.random_day() if self.rng.random() < 0.5 else None)
+                    for _ in range(self.runs)]
+        results['perform_search'] = measure(lambda: self.engine.search(*searches.pop()), self.runs)
+
+        ids = [self.rng.randrange(1, self.size + 1) for _ in range(self.runs)]
+
+        def save() -> None:
+            record = self.engine.repository.get(ids.pop())
+            record['People'] = int(record['People']) % 10 + 1
+            self.engine.repository.upsert(record)
+        results['save_bookings'] = measure(save, self.runs)
+
+        if self.backend == 'csv':
+            journal = self.engine.repository.journal
+
+            def save_snapshot() -> None:
+                journal.compact()
+                journal.wait_for_compaction()
+            results['save_snapshot'] = measure(save_snapshot, max(1, min(self.runs, 3)))
+
+        self.engine.close()
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the booking load, calendar, search and save paths on synthetic data.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--backend', choices=['csv', 'sqlite'], nargs='+', default=['csv', 'sqlite'])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Write the JSON results here as well as to stdout.")
+    args = parser.parse_args()
+
+    report = {
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'seed': args.seed,
+        'results': []
+    }
+    for size in args.sizes:
+        for backend in args.backend:
+            workdir = tempfile.mkdtemp(prefix='booking-bench-')
+            try:
+                started = time.perf_counter()
+                results = BenchmarkRun(size, backend, workdir, args.seed, args.runs).run()
+                report['results'].append({'bookings': size, 'backend': backend, 'benchmarks': results,
+                                          'total_s': time.perf_counter() - started})
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
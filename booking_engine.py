@@ -0,0 +1,536 @@
+import logging
+import os
+import sys
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics import DailyRollups
+from booking_view import BookingColumns, BookingTable, to_day
+from extras import EXTRAS_JOURNAL, EXTRAS_SNAPSHOT, PRICE_CATALOGUE, ExtrasLedger, LineItem, PriceCatalogue
+from group_allocation import choose_sites, split_people
+from instrumentation import timed
+from occupancy import AvailabilityMatrix, OccupancyMatrix
+from partitions import ArchivedPartitionError
+from pricing import SEASONAL_RATES, SITE_RATES, PricingEngine, Quote
+from repository import BookingRepository, open_repository
+
+CAMPSITES = {
+    '1a': 25, '1b': 25, '1c': 25, '1d': 25,
+    '2a': 25, '2b': 25, '2c': 25, '2d': 25,
+    '3': 15, '4': 15, '5': 15,
+    '6a': 15, '6b': 15,
+    'Sandys': 15,
+    'Jerrys': 20,
+    'Gidgea Flats': 15
+}
+STATUSES = ['Pending', 'Confirmed', 'Canceled']
+EXTRAS_QUANTITIES = ['Fire Wood', 'Bag of Ice', '1 Dozen Eggs', 'Honey', 'Breakfast Special', 'Meat Tray', 'Kayaks Count']
+EXTRAS_OPTIONS = ['Portable Toilet', 'Kayaks']
+
+
+class BookingError(Exception):
+    title = "Error"
+
+
+class BookingValidationError(BookingError):
+    def __init__(self, title: str, message: str):
+        super().__init__(message)
+        self.title = title
+
+
+class BookingNotFoundError(BookingError):
+    title = "ID Error"
+
+    def __init__(self, booking_id: int):
+        super().__init__("Booking ID does not exist.")
+        self.booking_id = booking_id
+
+
+class BookingConflictError(BookingError):
+    title = "Booking Conflict"
+
+    def __init__(self, campsite: str, start_date: Any, end_date: Any):
+        super().__init__(f"Campsite {campsite} is already booked for the selected dates.")
+        self.campsite = campsite
+        self.start_date = start_date
+        self.end_date = end_date
+
+
+class Booking:
+    # One booking as the engine hands it out. Slots instead of a __dict__,
+    # dates kept as proleptic ordinals (start_date/end_date read and write
+    # datetime.date), and campsite and status interned so every booking on
+    # a site shares one string. to_dict() builds the storage record the
+    # repositories take.
+    __slots__ = ('booking_id', 'name', 'phone', 'email', '_campsite', 'start_ordinal', 'end_ordinal', 'people', '_status',
+                 'extras', 'extras_paid', 'kayaks', 'kayaks_count', 'is_group_booking', 'group_id')
+
+    def __init__(self, booking_id: int, name: str, phone: str, email: str, campsite: str, start_date: Any, end_date: Any,
+                 people: int, status: str, extras: str, extras_paid: bool, kayaks: bool, kayaks_count: int, is_group_booking: bool,
+                 group_id: int = 0):
+        self.booking_id = booking_id
+        self.name = name
+        self.phone = phone
+        self.email = email
+        self.campsite = campsite
+        self.start_date = start_date
+        self.end_date = end_date
+        self.people = people
+        self.status = status
+        self.extras = extras
+        self.extras_paid = extras_paid
+        self.kayaks = kayaks
+        self.kayaks_count = kayaks_count
+        self.is_group_booking = is_group_booking
+        # ID of the group's first booking, shared by all of its campsites.
+        self.group_id = group_id
+
+    @property
+    def campsite(self) -> str:
+        return self._campsite
+
+    @campsite.setter
+    def campsite(self, value: Any) -> None:
+        self._campsite = sys.intern(str(value))
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: Any) -> None:
+        self._status = sys.intern(str(value))
+
+    @property
+    def start_date(self) -> date:
+        return date.fromordinal(self.start_ordinal)
+
+    @start_date.setter
+    def start_date(self, value: Any) -> None:
+        self.start_ordinal = pd.Timestamp(value).toordinal()
+
+    @property
+    def end_date(self) -> date:
+        return date.fromordinal(self.end_ordinal)
+
+    @end_date.setter
+    def end_date(self, value: Any) -> None:
+        self.end_ordinal = pd.Timestamp(value).toordinal()
+
+    @property
+    def nights(self) -> int:
+        return self.end_ordinal - self.start_ordinal
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ID": self.booking_id,
+            "Name": self.name,
+            "Phone": self.phone,
+            "Email": self.email,
+            "Campsite": self.campsite,
+            "Start Date": pd.Timestamp(self.start_date),
+            "End Date": pd.Timestamp(self.end_date),
+            "People": self.people,
+            "Status": self.status,
+            "Extras": self.extras,
+            "Extras Paid": self.extras_paid,
+            "Kayaks": self.kayaks,
+            "Kayaks Count": self.kayaks_count,
+            "Is Group Booking": self.is_group_booking,
+            "Group ID": self.group_id
+        }
+
+    @classmethod
+    def from_dict(cls, row: Dict[str, Any]) -> 'Booking':
+        return cls(
+            booking_id=row['ID'],
+            name=row['Name'],
+            phone=row['Phone'],
+            email=row['Email'],
+            campsite=row['Campsite'],
+            start_date=row['Start Date'],
+            end_date=row['End Date'],
+            people=row['People'],
+            status=row['Status'],
+            extras=row['Extras'],
+            extras_paid=row['Extras Paid'],
+            kayaks=row['Kayaks'],
+            kayaks_count=row['Kayaks Count'],
+            is_group_booking=row.get('Is Group Booking', False),
+            group_id=0 if pd.isna(row.get('Group ID', 0)) else int(row.get('Group ID', 0))
+        )
+
+
+class Alternative:
+    # A conflict-free option for a booking that clashed: the same stay
+    # length on `campsite`, `shift` days from the requested arrival.
+    def __init__(self, campsite: str, start_date: pd.Timestamp, end_date: pd.Timestamp, shift: int, capacity: int):
+        self.campsite = campsite
+        self.start_date = start_date
+        self.end_date = end_date
+        self.shift = shift
+        self.capacity = capacity
+
+
+class BookingEngine:
+    # Everything the booking screens do that doesn't need a display: the
+    # booking store, validation, conflict detection, pricing, search and
+    # reports. The Tk BookingManager is a client of this, and so can scripts be.
+    def __init__(self, repository: Optional[BookingRepository] = None, campsites: Optional[Dict[str, int]] = None,
+                 ledger: Optional[ExtrasLedger] = None, catalogue: Optional[PriceCatalogue] = None):
+        self.repository = repository if repository is not None else open_repository()
+        self.campsites: Dict[str, int] = campsites if campsites is not None else self.repository.campsites or CAMPSITES
+        # The ledger, price catalogue and rate tables are kept with the
+        # booking store's files.
+        data_dir = self.repository.data_dir()
+        self.ledger = ledger if ledger is not None else ExtrasLedger(os.path.join(data_dir, EXTRAS_SNAPSHOT),
+                                                                     os.path.join(data_dir, EXTRAS_JOURNAL))
+        self.catalogue = catalogue if catalogue is not None else PriceCatalogue.load(os.path.join(data_dir, PRICE_CATALOGUE))
+        self.pricing = PricingEngine.load(self.catalogue, os.path.join(data_dir, SITE_RATES), os.path.join(data_dir, SEASONAL_RATES))
+        self.next_booking_id: int = 1
+        self._rollups: Optional[DailyRollups] = None
+
+    @timed('load_all_bookings')
+    def load(self) -> None:
+        self.repository.load()
+        self.next_booking_id = self.repository.next_id()
+        if not self.ledger.load():
+            # First run with a line-item ledger: parse the Extras summaries once.
+            self.ledger.migrate(self.repository.all_bookings(), self.catalogue)
+        self._rollups = None
+
+    @timed('rollups')
+    def rollups(self) -> DailyRollups:
+        # Built from the full history on first use, then kept current by
+        # save, save_many and delete_booking.
+        if self._rollups is None:
+            self._rollups = DailyRollups.from_frame(self.repository.all_bookings(), self.campsites, self.ledger.all_items())
+        return self._rollups
+
+    def close(self) -> None:
+        self.repository.close()
+
+    @staticmethod
+    def month_bounds(year: int, month: int) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        start_date = pd.Timestamp(datetime(year, month, 1))
+        end_date = (start_date + pd.DateOffset(days=32)).replace(day=1) - pd.DateOffset(days=1)
+        return start_date, end_date
+
+    def month_view(self, year: int, month: int) -> BookingColumns:
+        start_date, end_date = self.month_bounds(year, month)
+        return self.repository.columns_between(start_date, end_date, self.campsites)
+
+    @timed('load_bookings')
+    def load_month(self, year: int, month: int) -> Tuple[BookingColumns, OccupancyMatrix]:
+        start_date, end_date = self.month_bounds(year, month)
+        bookings = self.repository.columns_between(start_date, end_date, self.campsites)
+        return bookings, OccupancyMatrix.from_columns(bookings, start_date, end_date.day)
+
+    def get_booking(self, booking_id: int) -> Optional[Booking]:
+        record = self.repository.get(booking_id)
+        return Booking.from_dict(record) if record else None
+
+    def validate_booking_data(self, booking_data: Dict[str, Any], whole_group: bool = False) -> None:
+        # whole_group: booking_data is a group's whole party, still to be
+        # split across campsites by allocate_group. Every record that is
+        # saved on a single campsite has to fit it, group member or not.
+        if not (booking_data['Name'] and booking_data['Phone'] and booking_data['Email'] and booking_data['Campsite'] and booking_data['Start Date'] and booking_data['End Date'] and booking_data['People']):
+            raise BookingValidationError("Input Error", "All fields are required.")
+
+        if booking_data['Start Date'] > booking_data['End Date']:
+            raise BookingValidationError("Date Error", "End date must be after start date.")
+
+        capacity = self.campsites.get(booking_data['Campsite'])
+        if not whole_group and capacity is not None and int(booking_data['People']) > capacity:
+            raise BookingValidationError("Capacity Error", f"Campsite {booking_data['Campsite']} holds up to {capacity} people. "
+                                                           "Make it a group booking to split the party across sites.")
+
+    def calculate_extras_cost(self, extras: Dict[str, int], booleans: Dict[str, bool], people: int) -> int:
+        return self.pricing.quote(None, None, None, people, extras, booleans).extras
+
+    def quote(self, booking_data: Dict[str, Any], extras: Dict[str, int], booleans: Dict[str, bool]) -> Quote:
+        return self.pricing.quote(booking_data.get('Campsite'), booking_data.get('Start Date'), booking_data.get('End Date'),
+                                  int(booking_data.get('People') or 0), extras, booleans)
+
+    @timed('price_bookings')
+    def price_bookings(self, start_date: Any, end_date: Any) -> pd.DataFrame:
+        # Every live booking starting in the range priced at today's rates,
+        # next to what its extras were charged when booked.
+        bookings = self.repository.bookings_between(start_date, end_date)
+        bookings = bookings[(bookings['Start Date'] >= pd.Timestamp(start_date)) & (bookings['Start Date'] <= pd.Timestamp(end_date))
+                            & (bookings['Status'] != 'Canceled')]
+        lines = self.ledger.frame()
+        prices = self.pricing.price(bookings, lines)
+        charged = lines.groupby('Booking ID')['Amount'].sum()
+        prices.insert(4, 'Extras Charged', prices['ID'].map(charged).fillna(0).astype(np.int64))
+        return prices
+
+    def extras_summary(self, extras: Dict[str, int], booleans: Dict[str, bool]) -> str:
+        return ', '.join([f"{key} ({value})" for key, value in extras.items() if value] + [f"{key} (Yes)" for key, value in booleans.items() if value])
+
+    @timed('is_site_booked')
+    def is_site_booked(self, campsite: str, start_date: pd.Timestamp, end_date: pd.Timestamp, exclude_id: Optional[int] = None) -> bool:
+        booked = self.repository.is_site_booked(campsite, start_date, end_date, exclude_id)
+        # Lazy %-args: with debug off this is one level check, no formatting.
+        logging.debug("Availability of %s from %s to %s: %s", campsite, start_date, end_date, 'booked' if booked else 'free')
+        return booked
+
+    @timed('suggest_alternatives')
+    def suggest_alternatives(self, campsite: str, start_date: Any, end_date: Any, people: int,
+                             exclude_id: Optional[int] = None, days: int = 7, limit: int = 10) -> List[Alternative]:
+        # Every campsite big enough for the party (and the one asked for) is
+        # tried for the same stay length up to `days` either side, from one
+        # availability matrix over the whole window. Best first: fewest days
+        # moved, the requested site, the snuggest fit, later before earlier.
+        start, end = pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+        nights = max((end - start).days, 0)
+        sites = [site for site, capacity in self.campsites.items() if site == campsite or capacity >= people]
+        first_day = start - pd.Timedelta(days=days)
+        bookings = self.repository.bookings_between(first_day, end + pd.Timedelta(days=days))
+        if exclude_id is not None:
+            bookings = bookings[bookings['ID'] != exclude_id]
+        matrix = AvailabilityMatrix.from_frame(bookings, first_day, 2 * days + nights, sites)
+        # Arrivals are not moved into the past unless the request already is.
+        today = pd.Timestamp.today().normalize()
+        earliest_shift = (today - start).days if start >= today else -days
+
+        ranked = []
+        for offset, code in zip(*np.nonzero(matrix.free(np.arange(2 * days + 1), nights))):
+            shift, site = int(offset) - days, sites[code]
+            if shift < earliest_shift or (shift == 0 and site == campsite):
+                continue
+            ranked.append((abs(shift), site != campsite, self.campsites[site] - people, shift < 0, int(code), shift))
+        ranked.sort()
+        return [Alternative(sites[code], start + pd.Timedelta(days=shift), start + pd.Timedelta(days=shift + nights),
+                            shift, self.campsites[sites[code]])
+                for _, _, _, _, code, shift in ranked[:limit]]
+
+    @timed('add_booking')
+    def add_booking(self, booking_data: Dict[str, Any], extras: Dict[str, int], booleans: Dict[str, bool],
+                    extras_paid: bool) -> Tuple[Booking, int]:
+        self.validate_booking_data(booking_data)
+
+        if self.is_site_booked(booking_data['Campsite'], booking_data['Start Date'], booking_data['End Date']):
+            raise BookingConflictError(booking_data['Campsite'], booking_data['Start Date'], booking_data['End Date'])
+
+        extras_cost = self.calculate_extras_cost(extras, booleans, booking_data['People'])
+        booking = Booking(
+            booking_id=self.next_booking_id,
+            name=booking_data['Name'],
+            phone=booking_data['Phone'],
+            email=booking_data['Email'],
+            campsite=booking_data['Campsite'],
+            start_date=booking_data['Start Date'],
+            end_date=booking_data['End Date'],
+            people=booking_data['People'],
+            status=booking_data['Status'],
+            extras=self.extras_summary(extras, booleans),
+            extras_paid=extras_paid,
+            kayaks=booking_data['Kayaks'],
+            kayaks_count=booking_data['Kayaks Count'],
+            is_group_booking=booking_data['Is Group Booking']
+        )
+        self.save(booking.to_dict(), self.catalogue.line_items(extras, booleans, booking_data['People']))
+        self.next_booking_id += 1
+        return booking, extras_cost
+
+    @timed('allocate_group')
+    def allocate_group(self, people: int, start_date: Any, end_date: Any, preferred: Optional[str] = None) -> List[Tuple[str, int]]:
+        # Free campsites for the whole stay, chosen by group_allocation: as
+        # close together as possible, then as few as possible, then the
+        # least empty space, then nearest the requested site.
+        start, end = pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+        nights = max((end - start).days, 0)
+        sites = list(self.campsites)
+        matrix = AvailabilityMatrix.from_frame(self.repository.bookings_between(start, end), start, nights, sites)
+        free = [code for code in np.flatnonzero(matrix.free([0], nights)[0]).tolist() if self.campsites[sites[code]] > 0]
+        capacities = [self.campsites[sites[code]] for code in free]
+        chosen = choose_sites(people, capacities, free, sites.index(preferred) if preferred in self.campsites else None)
+        if chosen is None:
+            raise BookingValidationError("Group Booking", f"There is room for {sum(capacities)} people on the free campsites "
+                                                          f"for these dates, not enough for a group of {people}.")
+        return list(zip([sites[free[i]] for i in chosen], split_people(people, [capacities[i] for i in chosen])))
+
+    @timed('add_group_booking')
+    def add_group_booking(self, booking_data: Dict[str, Any], extras: Dict[str, int], booleans: Dict[str, bool],
+                          extras_paid: bool, allocation: Optional[List[Tuple[str, int]]] = None) -> Tuple[List[Booking], int]:
+        # One booking per allocated campsite, all saved in a single write.
+        # Extras and kayaks go on the first one so they are charged once. An
+        # allocation from allocate_group is checked again before it is saved.
+        booking_data = dict(booking_data, **{'Is Group Booking': True})
+        self.validate_booking_data(booking_data, whole_group=True)
+        people = int(booking_data['People'])
+        if allocation is None:
+            allocation = self.allocate_group(people, booking_data['Start Date'], booking_data['End Date'], booking_data['Campsite'])
+        if sum(count for _, count in allocation) != people:
+            raise BookingValidationError("Group Booking", f"The allocation seats {sum(count for _, count in allocation)} people, not {people}.")
+        for campsite, count in allocation:
+            if count > self.campsites.get(campsite, 0):
+                raise BookingValidationError("Capacity Error", f"Campsite {campsite} holds up to {self.campsites.get(campsite, 0)} people.")
+            if self.is_site_booked(campsite, booking_data['Start Date'], booking_data['End Date']):
+                raise BookingConflictError(campsite, booking_data['Start Date'], booking_data['End Date'])
+
+        extras_cost = self.calculate_extras_cost(extras, booleans, people)
+        bookings = [
+            Booking(
+                booking_id=self.next_booking_id + i,
+                name=booking_data['Name'],
+                phone=booking_data['Phone'],
+                email=booking_data['Email'],
+                campsite=campsite,
+                start_date=booking_data['Start Date'],
+                end_date=booking_data['End Date'],
+                people=count,
+                status=booking_data['Status'],
+                extras=self.extras_summary(extras, booleans) if i == 0 else '',
+                extras_paid=extras_paid,
+                kayaks=booking_data['Kayaks'] if i == 0 else False,
+                kayaks_count=booking_data['Kayaks Count'] if i == 0 else 0,
+                is_group_booking=True,
+                group_id=self.next_booking_id
+            )
+            for i, (campsite, count) in enumerate(allocation)
+        ]
+        self.save_many([booking.to_dict() for booking in bookings],
+                       {bookings[0].booking_id: self.catalogue.line_items(extras, booleans, people)})
+        self.next_booking_id += len(bookings)
+        return bookings, extras_cost
+
+    @timed('update_booking')
+    def update_booking(self, booking_id: int, booking_data: Dict[str, Any], extras: Dict[str, int], booleans: Dict[str, bool],
+                       extras_paid: bool) -> Tuple[Booking, int]:
+        self.validate_booking_data(booking_data)
+
+        booking = self.get_booking(booking_id)
+        if booking is None:
+            raise BookingNotFoundError(booking_id)
+
+        if self.is_site_booked(booking_data['Campsite'], booking_data['Start Date'], booking_data['End Date'], exclude_id=booking_id):
+            raise BookingConflictError(booking_data['Campsite'], booking_data['Start Date'], booking_data['End Date'])
+
+        # A group's extras are priced for the whole party.
+        people = int(booking_data['People']) + self.party_size(booking) - int(booking.people)
+        extras_cost = self.calculate_extras_cost(extras, booleans, people)
+
+        booking.name = booking_data['Name']
+        booking.phone = booking_data['Phone']
+        booking.email = booking_data['Email']
+        booking.campsite = booking_data['Campsite']
+        booking.start_date = booking_data['Start Date']
+        booking.end_date = booking_data['End Date']
+        booking.people = booking_data['People']
+        booking.status = booking_data['Status']
+        booking.extras = self.extras_summary(extras, booleans)
+        booking.extras_paid = extras_paid
+        booking.kayaks = booking_data['Kayaks']
+        booking.kayaks_count = booking_data['Kayaks Count']
+
+        self.save(booking.to_dict(), self.catalogue.line_items(extras, booleans, people))
+        return booking, extras_cost
+
+    def party_size(self, booking: Booking) -> int:
+        # People across every campsite of the booking's group.
+        if not booking.group_id:
+            return int(booking.people)
+        parts = self.repository.bookings_between(booking.start_date, booking.end_date)
+        parts = parts[(parts['Group ID'] == booking.group_id) & (parts['ID'] != booking.booking_id)]
+        return int(booking.people) + int(pd.to_numeric(parts['People'], errors='coerce').fillna(0).sum())
+
+    def save(self, record: Dict[str, Any], items: Optional[List[LineItem]] = None) -> None:
+        # items are the booking's extras line items; without them they are
+        # read from the record's Extras summary.
+        self.save_many([record], {int(record['ID']): items} if items is not None else None)
+
+    def save_many(self, records: List[Dict[str, Any]], items: Optional[Dict[int, List[LineItem]]] = None) -> None:
+        # Bookings missing from `items` get line items parsed from their
+        # Extras summary (imports and other record-level callers).
+        try:
+            if len(records) == 1:
+                self.repository.upsert(records[0])
+            else:
+                self.repository.insert_many(records)
+        except ArchivedPartitionError as e:
+            raise BookingValidationError("Archived Season", str(e))
+        changes = []
+        for record in records:
+            booking_id = int(record['ID'])
+            lines = items.get(booking_id) if items else None
+            if lines is None:
+                lines = self.catalogue.items_from_summary(record.get('Extras', ''), int(record['People'] or 0))
+            self.ledger.replace(booking_id, lines)
+            changes.append((booking_id, lines))
+            if self._rollups is not None:
+                self._rollups.add(record, lines)
+        self.repository.persist(self.ledger.append, changes)
+
+    @timed('delete_booking')
+    def delete_booking(self, booking_id: int) -> None:
+        if self.repository.get(booking_id) is None:
+            raise BookingNotFoundError(booking_id)
+        try:
+            self.repository.delete(booking_id)
+        except ArchivedPartitionError as e:
+            raise BookingValidationError("Archived Season", str(e))
+        self.ledger.remove(booking_id)
+        self.repository.persist(self.ledger.append, [(booking_id, [])])
+        if self._rollups is not None:
+            self._rollups.remove(booking_id)
+
+    def bookings_on(self, day: Any) -> pd.DataFrame:
+        return self.repository.bookings_on(day)
+
+    def search_ids(self, text: str, limit: int = 50, offset: int = 0) -> Tuple[List[int], int]:
+        return self.repository.search_ids(text, limit, offset)
+
+    def ranked_ids(self, text: str) -> List[int]:
+        return self.repository.ranked_ids(text)
+
+    def bookings_by_ids(self, ids: List[int]) -> pd.DataFrame:
+        return self.repository.bookings_by_ids(ids)
+
+    def page_on_date(self, ranked: Optional[List[int]], date: Any, limit: int = 50, offset: int = 0) -> Tuple[List[int], int]:
+        # ranked: the text search's matches, best first; None for every
+        # booking on the date, newest first.
+        on_date = set(self.repository.bookings_on(date)['ID'].astype(int))
+        ids = sorted(on_date, reverse=True) if ranked is None else [booking_id for booking_id in ranked if booking_id in on_date]
+        return ids[offset:offset + limit], len(ids)
+
+    @timed('search')
+    def search_page(self, text: str = '', date: Any = None, limit: int = 50, offset: int = 0) -> Tuple[pd.DataFrame, int]:
+        if date is None:
+            ids, total = self.repository.search_ids(text, limit, offset)
+        else:
+            ids, total = self.page_on_date(self.repository.ranked_ids(text) if text else None, date, limit, offset)
+        return self.repository.bookings_by_ids(ids), total
+
+    @timed('search')
+    def search(self, name: str = '', date: Any = None) -> pd.DataFrame:
+        results = pd.DataFrame()
+        if name:
+            results = self.repository.search_text(name)
+
+        if date:
+            date_results = self.repository.bookings_on(date)
+            results = pd.concat([results, date_results]).drop_duplicates().reset_index(drop=True)
+        return results
+
+    def all_bookings_table(self) -> BookingTable:
+        return BookingTable(self.repository.all_columns(self.campsites))
+
+    def extras_needed(self, start_date: Any, end_date: Any, items: Optional[List[str]] = None) -> pd.DataFrame:
+        # Quantity of each extra per arrival day, from the line-item ledger.
+        bookings = self.repository.bookings_between(start_date, end_date)
+        return self.ledger.quantities_by_day(bookings, start_date, end_date, items)
+
+    @timed('report')
+    def report_table(self, start_date: Any, end_date: Any) -> BookingTable:
+        if start_date > end_date:
+            raise BookingValidationError("Date Error", "End date must be after start date.")
+        bookings = self.repository.columns_between(start_date, end_date, self.campsites)
+        return BookingTable(bookings, np.flatnonzero((bookings.starts >= to_day(start_date)) & (bookings.ends <= to_day(end_date))))
+
+    def report(self, start_date: Any, end_date: Any) -> pd.DataFrame:
+        return self.report_table(start_date, end_date).rows()
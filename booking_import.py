@@ -0,0 +1,259 @@
+import argparse
+import heapq
+import logging
+import os
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from app_logging import configure_logging, stop_logging
+from booking_engine import STATUSES, BookingEngine, BookingValidationError
+from instrumentation import timed
+from journal import BOOKING_COLUMNS
+
+# Spreadsheet headings we accept for each booking column (matched case-insensitively).
+IMPORT_ALIASES = {
+    'name': 'Name', 'guest': 'Name', 'guest name': 'Name',
+    'phone': 'Phone', 'mobile': 'Phone',
+    'email': 'Email', 'e-mail': 'Email',
+    'campsite': 'Campsite', 'site': 'Campsite',
+    'start date': 'Start Date', 'start': 'Start Date', 'arrival': 'Start Date',
+    'end date': 'End Date', 'end': 'End Date', 'departure': 'End Date',
+    'people': 'People', 'guests': 'People',
+    'status': 'Status',
+    'extras': 'Extras',
+    'extras paid': 'Extras Paid',
+    'kayaks': 'Kayaks',
+    'kayaks count': 'Kayaks Count',
+    'is group booking': 'Is Group Booking', 'group': 'Is Group Booking', 'group booking': 'Is Group Booking'
+}
+REQUIRED_COLUMNS = ['Name', 'Phone', 'Email', 'Campsite', 'Start Date', 'End Date', 'People']
+REJECTION_COLUMNS = ['Row', 'Name', 'Campsite', 'Start Date', 'End Date', 'Reason']
+TRUE_VALUES = {'true', 'yes', 'y', '1'}
+
+
+class ImportResult:
+    # imported: the bookings that were saved, with their new IDs.
+    # rejected: one line per refused spreadsheet row, numbered as the
+    # spreadsheet shows it (header is row 1).
+    def __init__(self, imported: pd.DataFrame, rejected: pd.DataFrame):
+        self.imported = imported
+        self.rejected = rejected
+
+    def write_rejections(self, path: str) -> None:
+        self.rejected.to_csv(path, index=False)
+
+
+def read_import_file(path: str) -> pd.DataFrame:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xlsm', '.xls'):
+        try:
+            return pd.read_excel(path, dtype={'Phone': str})
+        except ImportError:
+            raise BookingValidationError("Import Error", "Reading Excel files needs openpyxl installed (pip install openpyxl).")
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def rejection_report_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '_rejected.csv'
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    # ISO dates (and real dates from Excel) first, then the dd/mm/yyyy the
+    # booking form uses.
+    parsed = pd.to_datetime(values, format='ISO8601', errors='coerce')
+    return parsed.fillna(pd.to_datetime(values, format='%d/%m/%Y', errors='coerce')).dt.normalize()
+
+
+def parse_flags(values: pd.Series) -> pd.Series:
+    return values.map(lambda value: value is True or str(value).strip().lower() in TRUE_VALUES)
+
+
+def parse_counts(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(values, errors='coerce')
+
+
+def normalize_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.rename(columns=lambda col: IMPORT_ALIASES.get(str(col).strip().lower(), str(col).strip()))
+    missing = [col for col in REQUIRED_COLUMNS if col not in frame.columns]
+    if missing:
+        raise BookingValidationError("Import Error", f"The file is missing the column(s): {', '.join(missing)}.")
+
+    rows = pd.DataFrame(index=frame.index)
+    for col in ['Name', 'Phone', 'Email', 'Campsite', 'Extras']:
+        rows[col] = frame[col].fillna('').astype(str).str.strip() if col in frame.columns else ''
+    rows['Status'] = frame['Status'].fillna('').astype(str).str.strip().str.capitalize() if 'Status' in frame.columns else 'Pending'
+    rows['Status'] = rows['Status'].replace('', 'Pending')
+    for col in ['Start Date', 'End Date']:
+        rows[col] = parse_dates(frame[col])
+        rows[col + ' Text'] = frame[col].fillna('').astype(str)
+    for col in ['People', 'Kayaks Count']:
+        rows[col] = parse_counts(frame[col]) if col in frame.columns else 0
+    for col in ['Extras Paid', 'Kayaks', 'Is Group Booking']:
+        rows[col] = parse_flags(frame[col]) if col in frame.columns else False
+    return rows
+
+
+def row_problem(engine: BookingEngine, row: Dict[str, Any]) -> Optional[str]:
+    for col in ['Start Date', 'End Date']:
+        if pd.isna(row[col]) and row[col + ' Text'].strip():
+            return f"Unreadable {col.lower()} '{row[col + ' Text']}'."
+    people = row['People']
+    if pd.notna(people) and (people != int(people) or people < 0):
+        return f"People must be a whole number, not '{people}'."
+    booking_data = dict(row, People=0 if pd.isna(people) else int(people))
+    for col in ['Start Date', 'End Date']:
+        if pd.isna(booking_data[col]):
+            booking_data[col] = None
+    try:
+        engine.validate_booking_data(booking_data, whole_group=bool(row['Is Group Booking']))
+    except BookingValidationError as e:
+        return str(e)
+    if row['Campsite'] not in engine.campsites:
+        return f"Unknown campsite '{row['Campsite']}'."
+    if row['Status'] not in STATUSES:
+        return f"Unknown status '{row['Status']}'."
+    return None
+
+
+def overlapping_pairs(intervals: Iterable[Tuple[str, pd.Timestamp, pd.Timestamp, Hashable]]) -> List[Tuple[Hashable, Hashable]]:
+    # Sweep each campsite's stays in arrival order, keeping the ones still
+    # in progress on a heap keyed by departure; anything on the heap when a
+    # stay arrives is checked with the same rule as the single-booking
+    # conflict check (start < other end and end > other start).
+    by_site: Dict[str, List[Tuple[pd.Timestamp, pd.Timestamp, Hashable]]] = defaultdict(list)
+    for campsite, start, end, key in intervals:
+        by_site[campsite].append((start, end, key))
+    pairs = []
+    for stays in by_site.values():
+        stays.sort(key=lambda stay: stay[0])
+        active: List[Tuple[pd.Timestamp, int, pd.Timestamp, Hashable]] = []
+        for seq, (start, end, key) in enumerate(stays):
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for other_end, _, other_start, other in active:
+                if start < other_end and end > other_start:
+                    pairs.append((other, key))
+            heapq.heappush(active, (end, seq, start, key))
+    return pairs
+
+
+@timed('import_bookings')
+def import_bookings(engine: BookingEngine, source: Any) -> ImportResult:
+    # source is a file path or an already-read DataFrame. Rows are validated
+    # like the booking form, checked for conflicts against existing bookings
+    # and each other in one sweep (earlier rows in the file win), and the
+    # accepted ones are saved together with a single repository write.
+    # Group rows are then split across whatever campsites are still free,
+    # like a group booked on the form, one write per group.
+    frame = read_import_file(source) if isinstance(source, str) else source
+    rows = normalize_frame(frame.reset_index(drop=True)).to_dict('records')
+
+    rejected: Dict[int, str] = {}
+    valid, groups = [], []
+    for number, row in enumerate(rows):
+        problem = row_problem(engine, row)
+        if problem is not None:
+            rejected[number] = problem
+        elif row['Is Group Booking']:
+            groups.append(number)
+        else:
+            valid.append(number)
+
+    # Canceled rows are checked but don't block later ones.
+    intervals = [(rows[n]['Campsite'], rows[n]['Start Date'], rows[n]['End Date'], ('row', n)) for n in valid]
+    if valid:
+        existing = engine.repository.bookings_between(min(rows[n]['Start Date'] for n in valid),
+                                                      max(rows[n]['End Date'] for n in valid))
+        sites = {rows[n]['Campsite'] for n in valid}
+        existing = existing[(existing['Status'] != 'Canceled') & existing['Campsite'].isin(sites)]
+        intervals.extend(zip(existing['Campsite'], existing['Start Date'], existing['End Date'],
+                             (('booking', int(booking_id)) for booking_id in existing['ID'])))
+
+    overlaps: Dict[int, List[Tuple[str, int]]] = defaultdict(list)
+    for first, second in overlapping_pairs(intervals):
+        if first[0] == 'row':
+            overlaps[first[1]].append(second)
+        if second[0] == 'row':
+            overlaps[second[1]].append(first)
+
+    accepted: List[int] = []
+    blocking = set()
+    for number in valid:
+        blockers = sorted((kind, key) for kind, key in overlaps.get(number, ()) if kind == 'booking' or key in blocking)
+        if blockers:
+            kind, key = blockers[0]
+            rejected[number] = (f"Conflicts with booking #{key} on campsite {rows[number]['Campsite']}." if kind == 'booking'
+                                else f"Conflicts with row {key + 2} of this file on campsite {rows[number]['Campsite']}.")
+        else:
+            accepted.append(number)
+            if rows[number]['Status'] != 'Canceled':
+                blocking.add(number)
+
+    records = []
+    for booking_id, number in enumerate(accepted, start=engine.next_booking_id):
+        row = rows[number]
+        records.append({
+            'ID': booking_id, 'Name': row['Name'], 'Phone': row['Phone'], 'Email': row['Email'],
+            'Campsite': row['Campsite'], 'Start Date': row['Start Date'], 'End Date': row['End Date'],
+            'People': int(row['People']), 'Status': row['Status'], 'Extras': row['Extras'],
+            'Extras Paid': bool(row['Extras Paid']), 'Kayaks': bool(row['Kayaks']),
+            'Kayaks Count': 0 if pd.isna(row['Kayaks Count']) else int(row['Kayaks Count']),
+            'Is Group Booking': False,
+            'Group ID': 0
+        })
+    if records:
+        engine.save_many(records)
+        engine.next_booking_id += len(records)
+
+    for number in groups:
+        row = rows[number]
+        people = int(row['People'])
+        try:
+            allocation = engine.allocate_group(people, row['Start Date'], row['End Date'], row['Campsite'])
+        except BookingValidationError as e:
+            rejected[number] = str(e)
+            continue
+        # Extras and kayaks go on the first booking, priced for the whole party.
+        group_id = engine.next_booking_id
+        group = [{
+            'ID': group_id + i, 'Name': row['Name'], 'Phone': row['Phone'], 'Email': row['Email'],
+            'Campsite': campsite, 'Start Date': row['Start Date'], 'End Date': row['End Date'],
+            'People': count, 'Status': row['Status'], 'Extras': row['Extras'] if i == 0 else '',
+            'Extras Paid': bool(row['Extras Paid']), 'Kayaks': bool(row['Kayaks']) if i == 0 else False,
+            'Kayaks Count': (0 if pd.isna(row['Kayaks Count']) else int(row['Kayaks Count'])) if i == 0 else 0,
+            'Is Group Booking': True,
+            'Group ID': group_id
+        } for i, (campsite, count) in enumerate(allocation)]
+        engine.save_many(group, {group_id: engine.catalogue.items_from_summary(row['Extras'], people)})
+        engine.next_booking_id += len(group)
+        records.extend(group)
+    logging.info(f"Imported {len(records)} bookings, rejected {len(rejected)}")
+
+    report = pd.DataFrame([
+        {'Row': number + 2, 'Name': rows[number]['Name'], 'Campsite': rows[number]['Campsite'],
+         'Start Date': rows[number]['Start Date Text'], 'End Date': rows[number]['End Date Text'], 'Reason': reason}
+        for number, reason in sorted(rejected.items())
+    ], columns=REJECTION_COLUMNS)
+    return ImportResult(pd.DataFrame(records, columns=BOOKING_COLUMNS), report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import bookings from a CSV or Excel file, writing refused rows to a report.")
+    parser.add_argument('path')
+    parser.add_argument('--report', help="Where to write the rejected rows (default: <file>_rejected.csv).")
+    args = parser.parse_args()
+    configure_logging()
+    engine = BookingEngine()
+    engine.load()
+    try:
+        result = import_bookings(engine, args.path)
+    finally:
+        engine.close()
+        stop_logging()
+    print(f"Imported {len(result.imported)} bookings.")
+    if not result.rejected.empty:
+        report_path = args.report or rejection_report_path(args.path)
+        result.write_rejections(report_path)
+        print(f"Rejected {len(result.rejected)} rows; see {report_path}")
@@ -0,0 +1,162 @@
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from journal import empty_bookings_df
+
+
+def to_day(value: Any) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+class BookingRow(Mapping):
+    # Read-only row of a page: record['Name'] indexes the page's column
+    # arrays, so showing a page doesn't build a dict per booking.
+    __slots__ = ('_columns', '_index')
+
+    def __init__(self, columns: Dict[str, Any], index: int):
+        self._columns = columns
+        self._index = index
+
+    def __getitem__(self, column: str) -> Any:
+        return self._columns[column][self._index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
+def page_rows(frame: pd.DataFrame) -> List[BookingRow]:
+    columns = {col: frame[col].array for col in frame.columns}
+    return [BookingRow(columns, i) for i in range(len(frame))]
+
+
+class BookingColumns:
+    # Struct-of-arrays view over a bookings DataFrame. Calendar and month
+    # navigation work on the arrays; a full record is only pulled out of the
+    # backing frame when a single booking is opened.
+    def __init__(self, frame: pd.DataFrame, rows: np.ndarray, ids: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                 site_codes: np.ndarray, people: np.ndarray, names: np.ndarray, campsites: List[str]):
+        self._frame = frame
+        self._rows = rows
+        self.ids = ids
+        self.starts = starts
+        self.ends = ends
+        self.site_codes = site_codes
+        self.people = people
+        self.names = names
+        self.campsites = campsites
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, campsites: Iterable[str] = ()) -> 'BookingColumns':
+        table = list(campsites)
+        sites = frame['Campsite'].astype(str)
+        known = set(table)
+        table += [site for site in pd.unique(sites) if site not in known]
+        return cls(
+            frame=frame,
+            rows=np.arange(len(frame)),
+            ids=frame['ID'].to_numpy(dtype=np.int64),
+            starts=pd.to_datetime(frame['Start Date']).to_numpy(dtype='datetime64[D]'),
+            ends=pd.to_datetime(frame['End Date']).to_numpy(dtype='datetime64[D]'),
+            site_codes=pd.Categorical(sites, categories=table).codes.astype(np.int32),
+            people=pd.to_numeric(frame['People'], errors='coerce').fillna(0).to_numpy(dtype=np.int64),
+            names=frame['Name'].astype(str).to_numpy(dtype=object),
+            campsites=table
+        )
+
+    @classmethod
+    def empty(cls, campsites: Iterable[str] = ()) -> 'BookingColumns':
+        return cls.from_frame(empty_bookings_df(), campsites)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def take(self, positions: np.ndarray) -> 'BookingColumns':
+        return BookingColumns(
+            frame=self._frame,
+            rows=self._rows[positions],
+            ids=self.ids[positions],
+            starts=self.starts[positions],
+            ends=self.ends[positions],
+            site_codes=self.site_codes[positions],
+            people=self.people[positions],
+            names=self.names[positions],
+            campsites=self.campsites
+        )
+
+    def between(self, start_date: Any, end_date: Any) -> 'BookingColumns':
+        return self.take(np.flatnonzero((self.starts <= to_day(end_date)) & (self.ends >= to_day(start_date))))
+
+    def active_on(self, day: Any) -> np.ndarray:
+        day = to_day(day)
+        return np.flatnonzero((self.starts <= day) & (self.ends >= day))
+
+    def campsite(self, position: int) -> str:
+        return self.campsites[self.site_codes[position]]
+
+    def positions_for_campsite(self, campsite: str) -> np.ndarray:
+        if campsite not in self.campsites:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.site_codes == self.campsites.index(campsite))
+
+    def record(self, position: int) -> Dict[str, Any]:
+        return self._frame.iloc[self._rows[position]].to_dict()
+
+    def find(self, booking_id: int) -> Optional[Dict[str, Any]]:
+        positions = np.flatnonzero(self.ids == booking_id)
+        return self.record(positions[0]) if positions.size else None
+
+    def frame(self, positions: Optional[np.ndarray] = None) -> pd.DataFrame:
+        rows = self._rows if positions is None else self._rows[positions]
+        return self._frame.iloc[rows]
+
+
+class BookingTable:
+    # Display order over some positions of a BookingColumns view. Sorting
+    # only permutes an index array (one argsort per column, cached), and rows
+    # are pulled out of the backing frame a page at a time, so a table's cost
+    # doesn't depend on how many bookings it covers.
+    def __init__(self, bookings: BookingColumns, positions: Optional[np.ndarray] = None):
+        self.bookings = bookings
+        self.positions = np.arange(len(bookings)) if positions is None else np.asarray(positions)
+        self.order = self.positions
+        self.sort_column: Optional[str] = None
+        self.descending = False
+        self._orderings: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def sort(self, column: Optional[str], descending: bool = False) -> None:
+        self.sort_column, self.descending = column, descending
+        if column is None:
+            self.order = self.positions
+            return
+        if column not in self._orderings:
+            self._orderings[column] = self.positions[np.argsort(self._sort_key(column), kind='stable')]
+        self.order = self._orderings[column][::-1] if descending else self._orderings[column]
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        return self.bookings.frame(self.order[start:stop])
+
+    def page(self, start: int = 0, stop: Optional[int] = None) -> List[BookingRow]:
+        return page_rows(self.rows(start, stop))
+
+    def _sort_key(self, column: str) -> np.ndarray:
+        bookings, positions = self.bookings, self.positions
+        keys = {
+            'ID': lambda: bookings.ids[positions],
+            'Name': lambda: np.char.lower(bookings.names[positions].astype(str)),
+            'Campsite': lambda: np.array(bookings.campsites, dtype=str)[bookings.site_codes[positions]],
+            'Start Date': lambda: bookings.starts[positions],
+            'End Date': lambda: bookings.ends[positions],
+            'Nights': lambda: (bookings.ends[positions] - bookings.starts[positions]).astype(np.int64),
+            'People': lambda: bookings.people[positions]
+        }
+        if column in keys:
+            return keys[column]()
+        return self.bookings.frame(positions)[column].astype(str).str.lower().to_numpy(dtype=str)
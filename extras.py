@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+
+PRICE_CATALOGUE = 'extras_prices.csv'
+EXTRAS_SNAPSHOT = 'booking_extras.csv'
+EXTRAS_JOURNAL = 'booking_extras.journal'
+CATALOGUE_COLUMNS = ['Item', 'Unit Price', 'Free From People']
+EXTRAS_COLUMNS = ['Booking ID', 'Item', 'Quantity', 'Unit Price', 'Amount']
+# Default unit prices, used until extras_prices.csv is written. Kayaks are
+# free to guests.
+EXTRAS_PRICES = {
+    'Fire Wood': 15,
+    'Bag of Ice': 5,
+    '1 Dozen Eggs': 8,
+    'Honey': 13,
+    'Breakfast Special': 20,
+    'Meat Tray': 60,
+    'Portable Toilet': 70,
+    'Kayaks': 0,
+    'Kayaks Count': 0
+}
+# Parties this size or bigger get the portable toilet without charge.
+PORTABLE_TOILET_FREE_FROM = 10
+
+# (item, quantity, unit price, amount); amount is 0 for a free item.
+LineItem = Tuple[str, int, int, int]
+
+_SUMMARY_ITEM = re.compile(r'\s*(.+?)\s*\((\d+|Yes)\)\s*$')
+
+
+def parse_extras_summary(summary: str) -> Tuple[Dict[str, int], Dict[str, bool]]:
+    # The inverse of BookingEngine.extras_summary: "Fire Wood (2), Kayaks (Yes)"
+    # gives ({'Fire Wood': 2}, {'Kayaks': True}). Anything unreadable is skipped.
+    extras: Dict[str, int] = {}
+    booleans: Dict[str, bool] = {}
+    if not isinstance(summary, str):
+        return extras, booleans
+    for part in summary.split(','):
+        match = _SUMMARY_ITEM.match(part)
+        if match is None:
+            continue
+        item, value = match.groups()
+        if value == 'Yes':
+            booleans[item] = True
+        else:
+            extras[item] = extras.get(item, 0) + int(value)
+    return extras, booleans
+
+
+class PriceCatalogue:
+    # Unit price per extra, and the party size from which an item is free
+    # (the portable toilet). Read from extras_prices.csv when it exists.
+    def __init__(self, prices: Optional[Dict[str, int]] = None, free_from: Optional[Dict[str, int]] = None):
+        self.prices = dict(EXTRAS_PRICES if prices is None else prices)
+        self.free_from = dict({'Portable Toilet': PORTABLE_TOILET_FREE_FROM} if free_from is None else free_from)
+
+    @classmethod
+    def load(cls, path: str = PRICE_CATALOGUE) -> 'PriceCatalogue':
+        if not os.path.exists(path):
+            return cls()
+        try:
+            df = pd.read_csv(path)
+            prices = dict(zip(df['Item'].astype(str), pd.to_numeric(df['Unit Price']).astype(int)))
+            free = df.dropna(subset=['Free From People'])
+            return cls(prices, dict(zip(free['Item'].astype(str), free['Free From People'].astype(int))))
+        except Exception as e:
+            logging.error(f"Error reading {path}, using the default prices: {e}")
+            return cls()
+
+    def save(self, path: str = PRICE_CATALOGUE) -> None:
+        pd.DataFrame([{'Item': item, 'Unit Price': price, 'Free From People': self.free_from.get(item)}
+                      for item, price in self.prices.items()], columns=CATALOGUE_COLUMNS).to_csv(path, index=False)
+
+    def amounts(self, items: Sequence[str], quantities: Any, people: Any) -> np.ndarray:
+        # The one extras pricing rule, over whole arrays of line items:
+        # quantity x unit price, or nothing once the party (people, per line)
+        # is big enough for the item to be free. Unknown items cost nothing.
+        names = list(self.prices)
+        never = np.iinfo(np.int64).max
+        # Unknown items get code -1, which picks the trailing entry.
+        codes = pd.Categorical(list(items), categories=names).codes
+        units = np.array([self.prices[name] for name in names] + [0], dtype=np.int64)[codes]
+        free_from = np.array([self.free_from.get(name, never) for name in names] + [never], dtype=np.int64)[codes]
+        return np.where(np.asarray(people) >= free_from, 0, np.asarray(quantities, dtype=np.int64) * units)
+
+    def line_items(self, extras: Dict[str, int], booleans: Dict[str, bool], people: int) -> List[LineItem]:
+        # Quantities come from `extras`, ticked options from `booleans` (one
+        # each).
+        taken = [(item, int(quantity)) for item, quantity in extras.items() if quantity]
+        taken += [(item, 1) for item, ticked in booleans.items() if ticked]
+        if not taken:
+            return []
+        amounts = self.amounts([item for item, _ in taken], [quantity for _, quantity in taken], people)
+        return [(item, quantity, self.prices.get(item, 0), int(amount)) for (item, quantity), amount in zip(taken, amounts)]
+
+    def items_from_summary(self, summary: str, people: int) -> List[LineItem]:
+        extras, booleans = parse_extras_summary(summary)
+        return self.line_items(extras, booleans, people)
+
+
+class ExtrasLedger:
+    # Extras as typed line items keyed by booking ID, with the unit price at
+    # the time of booking so repricing the catalogue doesn't rewrite
+    # history. booking_extras.csv is the snapshot; each change is a JSON
+    # line in booking_extras.journal, folded into the snapshot every
+    # compact_every changes. Writes happen through the repository's writer.
+    def __init__(self, snapshot_path: str = EXTRAS_SNAPSHOT, journal_path: str = EXTRAS_JOURNAL, compact_every: int = 500):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self._items: Dict[int, List[LineItem]] = {}
+        self._frame: Optional[pd.DataFrame] = None
+        self._lock = threading.Lock()
+        self._entries = 0
+
+    def load(self) -> bool:
+        # False when there is no ledger on disk yet (see migrate).
+        if not os.path.exists(self.snapshot_path) and not os.path.exists(self.journal_path):
+            self._items, self._frame = {}, None
+            return False
+        self._items = self._read_snapshot()
+        entries = self._read_entries()
+        self._entries = len(entries)
+        self._replay(self._items, entries)
+        self._frame = None
+        return True
+
+    @timed('migrate_extras')
+    def migrate(self, bookings: pd.DataFrame, catalogue: PriceCatalogue) -> int:
+        # One-off: parse every booking's legacy Extras summary into line items
+        # and write the first snapshot.
+        self._items = {}
+        parsed: Dict[Tuple[str, int], List[LineItem]] = {}
+        people = pd.to_numeric(bookings['People'], errors='coerce').fillna(0).astype(int)
+        for booking_id, summary, count in zip(bookings['ID'], bookings['Extras'], people):
+            if not isinstance(summary, str) or not summary.strip():
+                continue
+            if (summary, count) not in parsed:
+                parsed[(summary, count)] = catalogue.items_from_summary(summary, count)
+            if parsed[(summary, count)]:
+                self._items[int(booking_id)] = parsed[(summary, count)]
+        self._frame = None
+        self._write_snapshot(self._items)
+        logging.info(f"Migrated the extras of {len(self._items)} bookings into {self.snapshot_path}")
+        return len(self._items)
+
+    def items(self, booking_id: int) -> List[LineItem]:
+        return list(self._items.get(int(booking_id), []))
+
+    def all_items(self) -> Mapping[int, List[LineItem]]:
+        return self._items
+
+    def replace(self, booking_id: int, items: Sequence[LineItem]) -> None:
+        # In memory only; write the same change with append().
+        if items:
+            self._items[int(booking_id)] = list(items)
+        else:
+            self._items.pop(int(booking_id), None)
+        self._frame = None
+
+    def remove(self, booking_id: int) -> None:
+        self.replace(booking_id, [])
+
+    def frame(self) -> pd.DataFrame:
+        # Every line item as one table, rebuilt only after a change.
+        if self._frame is None:
+            self._frame = pd.DataFrame([(booking_id,) + item for booking_id, items in self._items.items() for item in items],
+                                       columns=EXTRAS_COLUMNS)
+        return self._frame
+
+    @timed('save_extras')
+    def append(self, changes: List[Tuple[int, List[LineItem]]]) -> None:
+        # One JSON line per booking (an empty list deletes), one fsync.
+        lines = ''.join(json.dumps({'id': int(booking_id), 'items': [list(item) for item in items]}) + '\n'
+                        for booking_id, items in changes)
+        with self._lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self._entries += len(changes)
+            if self._entries >= self.compact_every:
+                self._compact()
+
+    def quantities_by_day(self, bookings: pd.DataFrame, start_date: Any, end_date: Any,
+                          items: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        # Quantity of each item needed per arrival day (firewood bags to cut,
+        # breakfasts to prep...), one row per day and one column per item.
+        # Canceled bookings are left out.
+        days = pd.date_range(pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize(), freq='D')
+        lines = self.frame()
+        if items is not None:
+            lines = lines[lines['Item'].isin(list(items))]
+        live = bookings[bookings['Status'] != 'Canceled']
+        arrivals = pd.Series(pd.to_datetime(live['Start Date']).dt.normalize().to_numpy(), index=live['ID'].astype(int).to_numpy())
+        lines = lines.assign(Date=lines['Booking ID'].map(arrivals)).dropna(subset=['Date'])
+        lines = lines[(lines['Date'] >= days[0]) & (lines['Date'] <= days[-1])] if len(days) else lines.iloc[:0]
+        table = lines.pivot_table(index='Date', columns='Item', values='Quantity', aggfunc='sum', fill_value=0)
+        table = table.reindex(index=days, columns=list(items) if items is not None else table.columns, fill_value=0)
+        table.index.name = 'Date'
+        table.columns.name = None
+        return table.astype(int)
+
+    def _compact(self) -> None:
+        items = self._read_snapshot()
+        self._replay(items, self._read_entries())
+        self._write_snapshot(items)
+        os.remove(self.journal_path)
+        self._entries = 0
+
+    def _write_snapshot(self, items: Dict[int, List[LineItem]]) -> None:
+        tmp_path = self.snapshot_path + '.tmp'
+        rows = [(booking_id,) + tuple(item) for booking_id, lines in sorted(items.items()) for item in lines]
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            pd.DataFrame(rows, columns=EXTRAS_COLUMNS).to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _read_snapshot(self) -> Dict[int, List[LineItem]]:
+        items: Dict[int, List[LineItem]] = {}
+        if not os.path.exists(self.snapshot_path):
+            return items
+        df = pd.read_csv(self.snapshot_path, dtype={'Booking ID': 'int64', 'Item': str, 'Quantity': 'int64',
+                                                    'Unit Price': 'int64', 'Amount': 'int64'})
+        for booking_id, item, quantity, unit, amount in zip(*(df[col].tolist() for col in EXTRAS_COLUMNS)):
+            items.setdefault(booking_id, []).append((item, quantity, unit, amount))
+        return items
+
+    def _read_entries(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.journal_path):
+            return []
+        entries = []
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping unreadable line in {self.journal_path}")
+        return entries
+
+    @staticmethod
+    def _replay(items: Dict[int, List[LineItem]], entries: List[Dict[str, Any]]) -> None:
+        for entry in entries:
+            if entry['items']:
+                items[int(entry['id'])] = [tuple(item) for item in entry['items']]
+            else:
+                items.pop(int(entry['id']), None)
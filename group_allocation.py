@@ -0,0 +1,91 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Up to this many free campsites every combination is tried (2^16 subsets
+# is a few milliseconds with numpy); beyond it the window heuristic is used.
+EXACT_SITES = 16
+
+
+def split_people(people: int, capacities: Sequence[int]) -> List[int]:
+    # Share the group out in proportion to each site's capacity, handing the
+    # remainder to the sites with the most room left.
+    total = sum(capacities)
+    shares = [people * capacity // total for capacity in capacities]
+    for i in sorted(range(len(capacities)), key=lambda i: shares[i] - capacities[i]):
+        if sum(shares) == people:
+            break
+        shares[i] += min(capacities[i] - shares[i], people - sum(shares))
+    return shares
+
+
+def allocation_key(people: int, capacities: Sequence[int], positions: Sequence[int], chosen: Sequence[int],
+                   preferred: Optional[int]) -> Tuple[int, int, int, int]:
+    # Best first: the tightest run of sites, then the fewest sites, then the
+    # fewest empty places, then the closest to the site asked for.
+    spots = [positions[i] for i in chosen]
+    distance = min(abs(spot - preferred) for spot in spots) if preferred is not None else 0
+    return max(spots) - min(spots), len(chosen), sum(capacities[i] for i in chosen) - people, distance
+
+
+def choose_sites(people: int, capacities: Sequence[int], positions: Sequence[int], preferred: Optional[int] = None,
+                 exact_limit: int = EXACT_SITES) -> Optional[List[int]]:
+    # capacities[i] and positions[i] describe the i-th free campsite, in
+    # campsite order; positions are places in the full campsite list, so a
+    # booked site between two free ones counts as a gap. Returns indices
+    # into capacities, or None when the free sites can't hold the group.
+    if people <= 0 or sum(capacities) < people:
+        return None
+    if len(capacities) <= exact_limit:
+        return exact_allocation(people, capacities, positions, preferred)
+    return window_allocation(people, capacities, positions, preferred)
+
+
+def window_allocation(people: int, capacities: Sequence[int], positions: Sequence[int],
+                      preferred: Optional[int] = None) -> Optional[List[int]]:
+    # Two pointers over the free sites: for each left edge, the shortest run
+    # that fits the group, with interior sites dropped (smallest first)
+    # while the rest still fit.
+    best, best_key = None, None
+    right, held = 0, 0
+    for left in range(len(capacities)):
+        while right < len(capacities) and held < people:
+            held += capacities[right]
+            right += 1
+        if held < people:
+            break
+        chosen = list(range(left, right))
+        room = held - people
+        for i in sorted(chosen[1:-1], key=lambda i: capacities[i]):
+            if capacities[i] <= room:
+                chosen.remove(i)
+                room -= capacities[i]
+        key = allocation_key(people, capacities, positions, chosen, preferred)
+        if best_key is None or key < best_key:
+            best, best_key = chosen, key
+        held -= capacities[left]
+    return best
+
+
+def exact_allocation(people: int, capacities: Sequence[int], positions: Sequence[int],
+                     preferred: Optional[int] = None) -> Optional[List[int]]:
+    count = len(capacities)
+    caps = np.asarray(capacities, dtype=np.int64)
+    spots = np.asarray(positions, dtype=np.int64)
+    masks = np.arange(1, 1 << count, dtype=np.int64)
+    bits = ((masks[:, None] >> np.arange(count)) & 1).astype(bool)
+    held = bits @ caps
+    feasible = np.flatnonzero(held >= people)
+    if not len(feasible):
+        return None
+    bits, held = bits[feasible], held[feasible]
+
+    first = bits.argmax(axis=1)
+    last = count - 1 - bits[:, ::-1].argmax(axis=1)
+    span = spots[last] - spots[first]
+    if preferred is not None:
+        distance = np.where(bits, np.abs(spots - preferred), np.iinfo(np.int64).max).min(axis=1)
+    else:
+        distance = np.zeros(len(bits), dtype=np.int64)
+    best = np.lexsort((distance, held - people, bits.sum(axis=1), span))[0]
+    return np.flatnonzero(bits[best]).tolist()
@@ -0,0 +1,121 @@
+import cProfile
+import functools
+import io
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+PERCENTILES = [50, 90, 99]
+WINDOW = 1024
+
+
+class LatencyHistogram:
+    # The last WINDOW timings of one operation in a ring buffer (percentiles
+    # are over those), plus lifetime count, total and worst case.
+    def __init__(self, window: int = WINDOW):
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+        self.total += seconds
+        self.worst = max(self.worst, seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        recent = self.samples[:min(self.count, len(self.samples))] * 1000
+        summary = {'count': self.count, 'mean_ms': self.total * 1000 / self.count if self.count else 0.0,
+                   'max_ms': self.worst * 1000}
+        for p, value in zip(PERCENTILES, np.percentile(recent, PERCENTILES) if len(recent) else [0.0] * len(PERCENTILES)):
+            summary[f"p{p}_ms"] = float(value)
+        return summary
+
+
+class Instrumentation:
+    # Process-wide timings keyed by operation name. Recording is a lock and a
+    # ring-buffer write, so the hot paths can stay instrumented in
+    # production; cProfile only runs between start_profile and stop_profile.
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._profile: Optional[cProfile.Profile] = None
+        self.started = time.time()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram(self.window)
+            histogram.record(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def timed(self, name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self._histograms.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def dump(self, path: str) -> None:
+        report = {'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                  'written': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                  'operations': self.snapshot()}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    @property
+    def profiling(self) -> bool:
+        return self._profile is not None
+
+    def start_profile(self) -> None:
+        # Profiles the calling thread (the Tk thread in the GUI).
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop_profile(self, path: Optional[str] = None, top: int = 25) -> str:
+        # Writes the raw stats to path (for snakeviz/pstats) when given and
+        # returns the top entries by cumulative time as text.
+        profile, self._profile = self._profile, None
+        if profile is None:
+            return ''
+        profile.disable()
+        if path:
+            profile.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(top)
+        return out.getvalue()
+
+
+metrics = Instrumentation()
+timed = metrics.timed
+timer = metrics.timer
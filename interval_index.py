@@ -0,0 +1,91 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+
+def to_ordinal(value: Any) -> int:
+    return pd.Timestamp(value).toordinal()
+
+
+def is_blocking(status: str) -> bool:
+    # Group bookings are allocated to sites within capacity and hold them
+    # like any other stay; only canceled bookings free their site.
+    return status != 'Canceled'
+
+
+class CampsiteIntervalIndex:
+    # Per-campsite list of (start, end, booking_id) sorted by start, plus the
+    # longest stay seen on that site. Any interval overlapping [start, end)
+    # must begin inside (start - longest_stay, end), so a lookup is two
+    # bisects plus a scan of the handful of stays inside that window.
+    def __init__(self) -> None:
+        self._starts: Dict[str, List[int]] = {}
+        self._entries: Dict[str, List[Tuple[int, int, int]]] = {}
+        self._max_span: Dict[str, int] = {}
+        self._by_id: Dict[int, Tuple[str, int, int]] = {}
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'CampsiteIntervalIndex':
+        index = cls()
+        if df.empty:
+            return index
+        blocking = df[df['Status'] != 'Canceled']
+        for booking_id, campsite, start, end in zip(blocking['ID'], blocking['Campsite'], blocking['Start Date'], blocking['End Date']):
+            index._insert(int(booking_id), campsite, to_ordinal(start), to_ordinal(end), keep_sorted=False)
+        for campsite, entries in index._entries.items():
+            entries.sort()
+            index._starts[campsite] = [entry[0] for entry in entries]
+        return index
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, booking_id: int) -> bool:
+        return booking_id in self._by_id
+
+    def add(self, booking: Any) -> None:
+        self.add_interval(booking.booking_id, booking.campsite, booking.start_date, booking.end_date, booking.status)
+
+    def add_interval(self, booking_id: int, campsite: str, start_date: Any, end_date: Any, status: str) -> None:
+        self.remove(booking_id)
+        if is_blocking(status):
+            self._insert(booking_id, campsite, to_ordinal(start_date), to_ordinal(end_date))
+
+    def remove(self, booking_id: int) -> None:
+        located = self._by_id.pop(booking_id, None)
+        if located is None:
+            return
+        campsite, start, end = located
+        entries = self._entries[campsite]
+        i = bisect_left(entries, (start, end, booking_id))
+        del entries[i]
+        del self._starts[campsite][i]
+
+    def conflicting_ids(self, campsite: str, start_date: Any, end_date: Any, exclude_id: Optional[int] = None) -> List[int]:
+        starts = self._starts.get(campsite)
+        if not starts:
+            return []
+        start, end = to_ordinal(start_date), to_ordinal(end_date)
+        lo = bisect_right(starts, start - self._max_span[campsite])
+        hi = bisect_left(starts, end)
+        return [
+            booking_id for _, booking_end, booking_id in self._entries[campsite][lo:hi]
+            if booking_end > start and booking_id != exclude_id
+        ]
+
+    def overlaps(self, campsite: str, start_date: Any, end_date: Any, exclude_id: Optional[int] = None) -> bool:
+        return bool(self.conflicting_ids(campsite, start_date, end_date, exclude_id))
+
+    def _insert(self, booking_id: int, campsite: str, start: int, end: int, keep_sorted: bool = True) -> None:
+        entries = self._entries.setdefault(campsite, [])
+        starts = self._starts.setdefault(campsite, [])
+        entry = (start, end, booking_id)
+        if keep_sorted:
+            i = bisect_left(entries, entry)
+            entries.insert(i, entry)
+            starts.insert(i, start)
+        else:
+            entries.append(entry)
+        self._max_span[campsite] = max(self._max_span.get(campsite, 0), end - start)
+        self._by_id[booking_id] = (campsite, start, end)
@@ -0,0 +1,63 @@
+import logging
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+
+class IOWorker:
+    # One writer thread draining a FIFO of jobs, so disk writes happen in the
+    # order they were submitted. Completion callbacks are not run on the
+    # worker; they are queued and run by whichever thread calls dispatch()
+    # (the Tk thread, via master.after).
+    def __init__(self, name: str = 'booking-io', on_error: Optional[Callable[[Exception], None]] = None):
+        self.on_error = on_error
+        self._jobs: queue.Queue = queue.Queue()
+        self._results: queue.Queue = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, on_done: Optional[Callable[[Any], None]] = None) -> None:
+        with self._lock:
+            self._pending += 1
+        self._jobs.put((fn, args, on_done))
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def dispatch(self) -> None:
+        while True:
+            try:
+                callback, value = self._results.get_nowait()
+            except queue.Empty:
+                return
+            callback(value)
+
+    def flush(self) -> None:
+        self._jobs.join()
+
+    def close(self) -> None:
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                self._jobs.task_done()
+                return
+            fn, args, on_done = job
+            try:
+                result = fn(*args)
+                if on_done is not None:
+                    self._results.put((on_done, result))
+            except Exception as e:
+                logging.error(f"Error in background I/O job {getattr(fn, '__name__', fn)}: {e}")
+                if self.on_error is not None:
+                    self._results.put((self.on_error, e))
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                self._jobs.task_done()
@@ -0,0 +1,275 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+
+from instrumentation import timed
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+BOOKING_COLUMNS = [
+    'ID', 'Name', 'Phone', 'Email', 'Campsite', 'Start Date', 'End Date',
+    'People', 'Status', 'Extras', 'Extras Paid', 'Kayaks', 'Kayaks Count', 'Is Group Booking', 'Group ID'
+]
+DATE_COLUMNS = ['Start Date', 'End Date']
+CATEGORY_COLUMNS = ['Campsite', 'Status']
+
+
+def empty_bookings_df() -> pd.DataFrame:
+    return pd.DataFrame(columns=BOOKING_COLUMNS)
+
+
+def index_by_id(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.set_index(df['ID'].astype(int), drop=False)
+    df.index.name = None
+    return df
+
+
+def rows_by_ids(df: pd.DataFrame, ids: List[int]) -> pd.DataFrame:
+    # The rows for ids, in that order, leaving out any that have since been
+    # deleted.
+    wanted = pd.Index(ids, dtype='int64')
+    return df.loc[wanted[wanted.isin(df.index)]]
+
+
+def read_snapshot(path: str) -> pd.DataFrame:
+    try:
+        if not os.path.exists(path):
+            return empty_bookings_df()
+        df = pd.read_csv(path, parse_dates=DATE_COLUMNS, dtype={'Phone': str})
+    except pd.errors.EmptyDataError:
+        return empty_bookings_df()
+    for col in ['Phone', 'Email', 'Is Group Booking']:
+        if col not in df.columns:
+            df[col] = False if col == 'Is Group Booking' else ''
+    return with_group_ids(df)
+
+
+def with_group_ids(df: pd.DataFrame) -> pd.DataFrame:
+    # Group ID is the ID of the first booking of a group booking, on every
+    # booking of the group, and 0 otherwise (and for bookings saved before
+    # groups were recorded).
+    if 'Group ID' not in df.columns:
+        df['Group ID'] = 0
+    elif df['Group ID'].dtype != np.int64:
+        df['Group ID'] = pd.to_numeric(df['Group ID'], errors='coerce').fillna(0).astype('int64')
+    return df
+
+
+def write_arrow_snapshot(df: pd.DataFrame, path: str) -> None:
+    # Arrow IPC file: dates as native timestamps, Campsite and Status
+    # dictionary-encoded, everything else in its natural type.
+    frame = df.reset_index(drop=True).reindex(columns=BOOKING_COLUMNS)
+    for col in DATE_COLUMNS:
+        frame[col] = pd.to_datetime(frame[col])
+    for col in CATEGORY_COLUMNS:
+        frame[col] = frame[col].astype(str).astype('category')
+    for col in ['Name', 'Phone', 'Email', 'Extras']:
+        frame[col] = frame[col].map(lambda value: None if value is None or value != value else str(value))
+    for col in ['Extras Paid', 'Kayaks', 'Is Group Booking']:
+        frame[col] = frame[col].fillna(False).astype(bool)
+    for col in ['ID', 'People', 'Kayaks Count', 'Group ID']:
+        frame[col] = pd.to_numeric(frame[col], errors='coerce').fillna(0).astype('int64')
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        with pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_arrow_snapshot(path: str) -> pd.DataFrame:
+    # Zero-copy where Arrow allows it: with split_blocks every column stays
+    # its own block, so the int and timestamp columns are read-only numpy
+    # views of the mapped file and the strings stay Arrow arrays over it.
+    # Only the bools and the two dictionary columns are materialized.
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    # Categoricals are a storage format only: the in-memory frame takes new
+    # campsites and statuses on upsert like any other column. Arrow decodes
+    # them far faster than astype(str) would.
+    for col in CATEGORY_COLUMNS:
+        table = table.set_column(table.schema.get_field_index(col), col, table.column(col).cast(pa.large_string()))
+    return with_group_ids(table.to_pandas(split_blocks=True, self_destruct=True))
+
+
+def encode_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    encoded = {}
+    for key, value in record.items():
+        if isinstance(value, pd.Timestamp):
+            value = value.isoformat()
+        elif isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, float) and value != value:
+            value = None
+        encoded[key] = value
+    return encoded
+
+
+def replay(df: pd.DataFrame, entries: List[Tuple[str, Dict[str, Any]]]) -> pd.DataFrame:
+    # Entries are idempotent upserts/deletes keyed by ID, so only the last
+    # entry per booking matters and replaying a journal twice is harmless.
+    latest: Dict[int, Optional[Dict[str, Any]]] = {}
+    for op, record in entries:
+        latest[int(record['ID'])] = record if op == 'upsert' else None
+    if not latest:
+        return df
+    df = df.drop(index=list(latest), errors='ignore')
+    upserts = [record for record in latest.values() if record is not None]
+    if upserts:
+        new_rows = pd.DataFrame(upserts, columns=BOOKING_COLUMNS)
+        for col in DATE_COLUMNS:
+            new_rows[col] = pd.to_datetime(new_rows[col])
+        new_rows = with_group_ids(new_rows)
+        df = pd.concat([df, index_by_id(new_rows)]) if not df.empty else index_by_id(new_rows)
+    return df
+
+
+class BookingJournal:
+    # bookings.csv is the snapshot; every mutation is one fsync'd JSON line in
+    # bookings.journal. Compaction rotates the journal to
+    # bookings.journal.compacting and folds it into a fresh snapshot on a
+    # background thread, replacing the snapshot atomically. With pyarrow
+    # installed a columnar bookings.arrow is written next to the CSV and
+    # memory-mapped on load, unless the CSV has been replaced since (CSV
+    # stays the import/export format).
+    def __init__(self, snapshot_path: str = 'bookings.csv', journal_path: str = 'bookings.journal',
+                 formatted_path: str = 'bookings_formatted.txt', compact_every: int = 500, columnar: bool = True):
+        self.snapshot_path = snapshot_path
+        self.arrow_path = os.path.splitext(snapshot_path)[0] + '.arrow' if columnar and pa is not None else None
+        self.journal_path = journal_path
+        self.pending_path = journal_path + '.compacting'
+        self.formatted_path = formatted_path
+        self.compact_every = compact_every
+        self.mapped = False
+        self._lock = threading.Lock()
+        self._file = None
+        self._entries_since_compaction = 0
+        self._compaction: Optional[threading.Thread] = None
+
+    def load(self) -> pd.DataFrame:
+        self.wait_for_compaction()
+        # mapped: the frame was read from bookings.arrow and its columns are
+        # read-only until copied.
+        self.mapped = self._arrow_is_current()
+        df = index_by_id(read_arrow_snapshot(self.arrow_path) if self.mapped else read_snapshot(self.snapshot_path))
+        pending = self._read_entries(self.pending_path)
+        current = self._read_entries(self.journal_path)
+        self._entries_since_compaction = len(pending) + len(current)
+        return replay(df, pending + current)
+
+    def append(self, op: str, record: Dict[str, Any]) -> None:
+        self.append_many(op, [record])
+
+    @timed('save_bookings')
+    def append_many(self, op: str, records: List[Dict[str, Any]]) -> None:
+        # One write and one fsync for the whole batch.
+        lines = ''.join(json.dumps({'op': op, 'booking': encode_record(record)}) + '\n' for record in records)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.journal_path, 'a', encoding='utf-8')
+            self._file.write(lines)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._entries_since_compaction += len(records)
+            should_compact = self._entries_since_compaction >= self.compact_every
+        if should_compact:
+            self.compact()
+
+    def compact(self) -> None:
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            self._rotate()
+            self._entries_since_compaction = 0
+            self._compaction = threading.Thread(target=self._fold, name='journal-compaction', daemon=True)
+            self._compaction.start()
+
+    def wait_for_compaction(self) -> None:
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def close(self) -> None:
+        self.wait_for_compaction()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if not os.path.exists(self.journal_path):
+            return
+        if os.path.exists(self.pending_path):
+            # A previous compaction never finished; keep its entries ahead of ours.
+            with open(self.journal_path, 'r', encoding='utf-8') as src, open(self.pending_path, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.pending_path)
+
+    @timed('save_snapshot')
+    def _fold(self) -> None:
+        try:
+            df = replay(index_by_id(self._read_snapshot()), self._read_entries(self.pending_path))
+            df = df.sort_values('ID')
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                df.to_csv(f, index=False, columns=BOOKING_COLUMNS)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            # Written after the CSV so it is only ever newer than it when the
+            # two agree.
+            if self.arrow_path is not None:
+                write_arrow_snapshot(df, self.arrow_path)
+            if os.path.exists(self.pending_path):
+                os.remove(self.pending_path)
+            logging.info(f"Compacted journal into {self.snapshot_path}")
+
+            with open(self.formatted_path, 'w') as f:
+                f.write(tabulate(df[BOOKING_COLUMNS], headers='keys', tablefmt='grid', showindex=False))
+            logging.info(f"Formatted bookings saved to {self.formatted_path}")
+        except Exception as e:
+            logging.error(f"Error while compacting booking journal: {e}")
+
+    def _arrow_is_current(self) -> bool:
+        if self.arrow_path is None or not os.path.exists(self.arrow_path):
+            return False
+        return not os.path.exists(self.snapshot_path) or os.path.getmtime(self.arrow_path) >= os.path.getmtime(self.snapshot_path)
+
+    def _read_snapshot(self) -> pd.DataFrame:
+        if self._arrow_is_current():
+            return read_arrow_snapshot(self.arrow_path)
+        return read_snapshot(self.snapshot_path)
+
+    @staticmethod
+    def _read_entries(path: str) -> List[Tuple[str, Dict[str, Any]]]:
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-append is dropped.
+                    logging.warning(f"Skipping unreadable journal line in {path}")
+                    continue
+                entries.append((entry['op'], entry['booking']))
+        return entries
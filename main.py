@@ -1,66 +1,34 @@
 import tkinter as tk
 import pandas as pd
-import os
 import logging
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from tkcalendar import DateEntry
-from datetime import datetime, timedelta
+from datetime import datetime
 from PIL import Image, ImageTk
-from typing import List, Dict, Any, Tuple
-from tabulate import tabulate
+from typing import List, Dict, Any, Tuple, Callable, Mapping
 import random
+from app_logging import configure_logging, debug_enabled, set_level, stop_logging
+from booking_engine import (STATUSES, BookingEngine, BookingError, BookingConflictError,
+                            BookingNotFoundError)
+from booking_import import import_bookings, rejection_report_path
+from booking_view import BookingColumns, BookingTable
+from occupancy import OccupancyMatrix
+from reports import REPORT_COLUMNS, REPORT_FORMATTERS, report_sink, report_title, write_report
+from instrumentation import metrics, timed
+from io_worker import IOWorker
 
 # Constants
 DATE_PATTERN = 'dd/MM/yyyy'
 FORM_LABELS = ["Name", "Phone", "Email", "Campsite", "Start Date", "End Date", "People", "Status"]
-CAMPSITES = {
-    '1a': 25, '1b': 25, '1c': 25, '1d': 25,
-    '2a': 25, '2b': 25, '2c': 25, '2d': 25,
-    '3': 15, '4': 15, '5': 15,
-    '6a': 15, '6b': 15,
-    'Sandys': 15,
-    'Jerrys': 20,
-    'Gidgea Flats': 15
-}
-
-# Set up logging
-logging.basicConfig(filename='app.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
-
-class Booking:
-    def __init__(self, booking_id: int, name: str, phone: str, email: str, campsite: str, start_date: str, end_date: str,
-                 people: int, status: str, extras: str, extras_paid: bool, kayaks: bool, kayaks_count: int, is_group_booking: bool):
-        self.booking_id = booking_id
-        self.name = name
-        self.phone = phone
-        self.email = email
-        self.campsite = campsite
-        self.start_date = pd.Timestamp(start_date)
-        self.end_date = pd.Timestamp(end_date)
-        self.people = people
-        self.status = status
-        self.extras = extras
-        self.extras_paid = extras_paid
-        self.kayaks = kayaks
-        self.kayaks_count = kayaks_count
-        self.is_group_booking = is_group_booking
-
-    def to_dict(self) -> Dict[str, Any]:
-        return {
-            "ID": self.booking_id,
-            "Name": self.name,
-            "Phone": self.phone,
-            "Email": self.email,
-            "Campsite": self.campsite,
-            "Start Date": self.start_date,
-            "End Date": self.end_date,
-            "People": self.people,
-            "Status": self.status,
-            "Extras": self.extras,
-            "Extras Paid": self.extras_paid,
-            "Kayaks": self.kayaks,
-            "Kayaks Count": self.kayaks_count,
-            "Is Group Booking": self.is_group_booking
-        }
+SEARCH_COLUMNS = ["ID", "Name", "Phone", "Email", "Campsite", "Start Date", "End Date", "People", "Status"]
+TABLE_COLUMNS = ["ID", "Name", "Phone", "Email", "Campsite", "Start Date", "End Date", "People", "Status", "Extras", "Extras Paid"]
+SEARCH_DEBOUNCE_MS = 250
+SEARCH_PAGE_SIZE = 25
+ALTERNATIVE_COLUMNS = ["Campsite", "Arrive", "Depart", "Moved", "Capacity"]
+ALTERNATIVE_DAYS = 7
+PERFORMANCE_COLUMNS = ["Operation", "Count", "p50 ms", "p90 ms", "p99 ms", "Max ms"]
+PERFORMANCE_DUMP = 'performance.json'
+PROFILE_DUMP = 'profile.prof'
 
 class BookingManager:
     def __init__(self, master: tk.Tk):
@@ -69,89 +37,72 @@ class BookingManager:
         self.master.geometry("800x600")
         self.master.resizable(True, True)
 
-        self.bookings: List[Booking] = []
-        self.next_booking_id: int = 1
-        self.campsites: Dict[str, int] = CAMPSITES
+        self.engine = BookingEngine()
+        self.campsites: Dict[str, int] = self.engine.campsites
+        self.bookings = BookingColumns.empty(self.campsites)
+        self.occupancy = OccupancyMatrix(datetime.now(), 0, list(self.campsites))
         self.color_map = {}
-        self.load_all_bookings()
+        self.io = IOWorker(on_error=self.on_io_error)
+        self.engine.repository.writer = self.io
+        self.search_worker = IOWorker(name='booking-search', on_error=self.on_search_error)
+        self.report_worker = IOWorker(name='booking-report', on_error=self.on_report_error)
+        self.search_generation = 0
+        self.search_after_id = None
         self.create_widgets()
+        # Hidden: Ctrl+Shift+P opens the Performance window.
+        self.master.bind("<Control-P>", lambda e: self.show_performance())
+        self.load_all_bookings()
+        self.poll_io()
 
     def load_all_bookings(self) -> None:
-        try:
-            if os.path.exists('bookings.csv'):
-                self.bookings_df = pd.read_csv('bookings.csv', parse_dates=['Start Date', 'End Date'])
-                self._ensure_columns_exist()
-                self.next_booking_id = self.bookings_df['ID'].max() + 1
-            else:
-                self.bookings_df = self.create_empty_bookings_df()
-        except pd.errors.EmptyDataError:
-            self.bookings_df = self.create_empty_bookings_df()
-
-    def _ensure_columns_exist(self) -> None:
-        for col in ['Phone', 'Email', 'Is Group Booking']:
-            if col not in self.bookings_df.columns:
-                if col == 'Is Group Booking':
-                    self.bookings_df[col] = False
-                else:
-                    self.bookings_df[col] = ''
+        self.bookings_loaded = False
+        self.set_controls_enabled(False)
+        self.io.submit(self.engine.load, on_done=self.on_bookings_loaded)
 
-    def create_empty_bookings_df(self) -> pd.DataFrame:
-        return pd.DataFrame(columns=[
-            'ID', 'Name', 'Phone', 'Email', 'Campsite', 'Start Date', 'End Date',
-            'People', 'Status', 'Extras', 'Extras Paid', 'Kayaks', 'Kayaks Count', 'Is Group Booking'
-        ])
-
-    def load_bookings(self, year: int, month: int) -> None:
-        start_date = pd.Timestamp(datetime(year, month, 1))
-        end_date = (start_date + pd.DateOffset(days=32)).replace(day=1) - pd.DateOffset(days=1)
-        bookings = self.bookings_df[
-            (self.bookings_df['Start Date'] <= end_date) &
-            (self.bookings_df['End Date'] >= start_date)
-        ]
-        self.bookings = [
-            Booking(
-                booking_id=row['ID'],
-                name=row['Name'],
-                phone=row['Phone'],
-                email=row['Email'],
-                campsite=row['Campsite'],
-                start_date=row['Start Date'],
-                end_date=row['End Date'],
-                people=row['People'],
-                status=row['Status'],
-                extras=row['Extras'],
-                extras_paid=row['Extras Paid'],
-                kayaks=row['Kayaks'],
-                kayaks_count=row['Kayaks Count'],
-                is_group_booking=row.get('Is Group Booking', False)
-            )
-            for _, row in bookings.iterrows()
-        ]
-
-    def save_bookings(self) -> None:
+    def on_bookings_loaded(self, _: Any = None) -> None:
+        self.load_bookings(self.current_year, self.current_month)
+        self.display_calendar(self.current_year, self.current_month)
+        self.bookings_loaded = True
+        self.set_controls_enabled(True)
+
+    def on_io_error(self, error: Exception) -> None:
+        messagebox.showerror("Error", "An error occurred while reading or writing the bookings. Recent changes may not have been saved.")
+
+    def poll_io(self) -> None:
+        self.io.dispatch()
+        self.search_worker.dispatch()
+        self.report_worker.dispatch()
+        pending = self.io.pending()
+        if not self.bookings_loaded:
+            self.io_status_label.config(text="Loading bookings...")
+        elif pending:
+            self.io_status_label.config(text=f"Saving... ({pending} pending)")
+        else:
+            self.io_status_label.config(text="All changes saved")
+        self.master.after(100, self.poll_io)
+
+    def set_controls_enabled(self, enabled: bool) -> None:
+        # Everything that reads or writes the bookings waits for the load, so
+        # the Tk thread never touches the repository while the IO thread is
+        # still filling it.
+        state = tk.NORMAL if enabled else tk.DISABLED
+        for button in (self.prev_button, self.next_button, self.add_booking_button, self.edit_booking_button,
+                       self.detail_button, self.delete_booking_button, self.view_all_button, self.search_button,
+                       self.report_button, self.import_button):
+            button.config(state=state)
+
+    def close(self) -> None:
+        self.search_worker.close()
+        self.report_worker.close()
+        self.io.close()
+        self.engine.close()
         try:
-            if not self.bookings:
-                logging.warning("No bookings available to save.")
-                messagebox.showwarning("Warning", "No bookings available to save.")
-                return
-
-            df = pd.DataFrame([b.to_dict() for b in self.bookings])
-            df.to_csv('bookings.csv', index=False)
-            logging.info("Bookings saved to bookings.csv")
-
-            table_str = tabulate(df, headers='keys', tablefmt='grid')
-            with open('bookings_formatted.txt', 'w') as f:
-                f.write(table_str)
-            logging.info("Formatted bookings saved to bookings_formatted.txt")
-
-            self.load_all_bookings()
+            metrics.dump(PERFORMANCE_DUMP)
+        except OSError as e:
+            logging.error(f"Error writing {PERFORMANCE_DUMP}: {e}")
 
-        except (pd.errors.EmptyDataError, FileNotFoundError) as e:
-            logging.error(f"Error while saving bookings: {e}")
-            messagebox.showerror("Error", "An error occurred while saving the bookings. Please try again.")
-        except Exception as e:
-            logging.error(f"Unexpected error while saving bookings: {e}")
-            messagebox.showerror("Error", "An unexpected error occurred while saving the bookings. Please try again.")
+    def load_bookings(self, year: int, month: int) -> None:
+        self.bookings, self.occupancy = self.engine.load_month(year, month)
 
     def create_widgets(self) -> None:
         main_frame = tk.Frame(self.master, padx=10, pady=10)
@@ -209,10 +160,30 @@ class BookingManager:
         self.next_button = tk.Button(self.month_year_nav_frame, text="Next >>", command=self.next_month)
         self.next_button.pack(side=tk.LEFT)
 
+        self.io_status_label = tk.Label(self.month_year_nav_frame, text="", fg="grey")
+        self.io_status_label.pack(side=tk.LEFT, padx=20)
+
+        self.create_calendar_cells()
+
+        # The days are filled in by on_bookings_loaded.
         self.current_month = datetime.now().month
         self.current_year = datetime.now().year
-        self.load_bookings(self.current_year, self.current_month)
-        self.display_calendar(self.current_year, self.current_month)
+        self.month_year_label.config(text=datetime.now().strftime('%B %Y'))
+
+    def create_calendar_cells(self) -> None:
+        days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+        for i, day in enumerate(days):
+            tk.Label(self.calendar_frame, text=day).grid(row=1, column=i, sticky="ew")
+
+        self.day_cells: List[tk.Button] = []
+        for i in range(6 * 7):
+            cell = tk.Button(self.calendar_frame, width=12, height=5, anchor='n')
+            cell.grid(row=2 + i // 7, column=i % 7, sticky="nsew")
+            cell.day = None
+            self.day_cells.append(cell)
+
+        for i in range(7):
+            self.calendar_frame.grid_columnconfigure(i, weight=1)
 
     def create_booking_frame(self, main_frame: tk.Frame) -> None:
         self.booking_frame = tk.Frame(main_frame)
@@ -253,7 +224,7 @@ class BookingManager:
         if label in ["Campsite", "Status"]:
             self.form_vars[label] = tk.StringVar()
             entry = ttk.Combobox(self.scrollable_frame, textvariable=self.form_vars[label])
-            entry['values'] = list(self.campsites.keys()) if label == "Campsite" else ['Pending', 'Confirmed', 'Canceled']
+            entry['values'] = list(self.campsites.keys()) if label == "Campsite" else STATUSES
         elif label in ["Start Date", "End Date"]:
             entry = DateEntry(self.scrollable_frame, date_pattern=DATE_PATTERN)
             self.form_vars[label] = entry
@@ -291,27 +262,61 @@ class BookingManager:
             'Kayaks Count': tk.StringVar()
         }
 
-        self.create_extras_option(extras_frame, "Portable Toilet ($70 for <10 people or Free for >10 people)", 'Portable Toilet', 0, True)
+        self.create_extras_option(extras_frame, "Portable Toilet ($70 for <10 people or Free for >10 people)", 'Portable Toilet', 0)
         self.create_extras_entry(extras_frame, "Fire Wood ($15 per 20 kg bag)", 'Fire Wood', 1)
         self.create_extras_entry(extras_frame, "Bag of Ice ($5 each)", 'Bag of Ice', 2)
         self.create_extras_entry(extras_frame, "1 Dozen Eggs ($8)", '1 Dozen Eggs', 3)
         self.create_extras_entry(extras_frame, "Honey ($13)", 'Honey', 4)
         self.create_extras_entry(extras_frame, "Breakfast Special ($20)", 'Breakfast Special', 5)
         self.create_extras_entry(extras_frame, "Meat Tray ($60)", 'Meat Tray', 6)
-        self.create_extras_option(extras_frame, "Use of Kayaks", 'Kayaks', 7, True)
+        self.create_extras_option(extras_frame, "Use of Kayaks", 'Kayaks', 7)
         self.create_extras_entry(extras_frame, "Number of Kayaks", 'Kayaks Count', 8)
 
         self.extras_paid_var = tk.BooleanVar()
         tk.Checkbutton(extras_frame, text="Extras Paid?", variable=self.extras_paid_var).grid(row=9, column=0, columnspan=2, sticky="w")
+        self.watch_quote_inputs()
+
+    def watch_quote_inputs(self) -> None:
+        # The quote keeps its own copy of the form's inputs; each change
+        # re-reads only the field that changed before re-pricing.
+        self.quote_extras: Dict[str, int] = {}
+        self.quote_booleans: Dict[str, bool] = {}
+        self.quote_booking: Dict[str, Any] = {'Campsite': None, 'People': 0}
+        self.quote_booking.update({key: pd.Timestamp(self.form_vars[key].get_date()) for key in ('Start Date', 'End Date')})
+        for key, var in self.extras_vars.items():
+            var.trace_add('write', lambda *_, key=key: self.on_quote_input(key))
+        for key in ('Campsite', 'People'):
+            self.form_vars[key].trace_add('write', lambda *_, key=key: self.on_quote_input(key))
+        for key in ('Start Date', 'End Date'):
+            for sequence in ("<<DateEntrySelected>>", "<FocusOut>"):
+                self.form_vars[key].bind(sequence, lambda _, key=key: self.on_quote_input(key), add='+')
+
+    def on_quote_input(self, key: str) -> None:
+        try:
+            if key in self.extras_vars:
+                var = self.extras_vars[key]
+                if isinstance(var, tk.BooleanVar):
+                    self.quote_booleans[key] = var.get()
+                else:
+                    self.quote_extras[key] = int(var.get()) if var.get().isdigit() else 0
+            elif key == 'People':
+                value = self.form_vars['People'].get()
+                self.quote_booking['People'] = int(value) if value.isdigit() else 0
+            elif key == 'Campsite':
+                self.quote_booking['Campsite'] = self.form_vars['Campsite'].get() or None
+            else:
+                self.quote_booking[key] = pd.Timestamp(self.form_vars[key].get_date())
+        except (tk.TclError, ValueError):
+            return
+        self.update_extras_cost()
 
-    def create_extras_option(self, frame: tk.Frame, label_text: str, var_key: str, row: int, has_callback: bool = False) -> None:
-        tk.Checkbutton(frame, text=label_text, variable=self.extras_vars[var_key], command=self.update_extras_cost if has_callback else None).grid(row=row, column=0, sticky="w")
+    def create_extras_option(self, frame: tk.Frame, label_text: str, var_key: str, row: int) -> None:
+        tk.Checkbutton(frame, text=label_text, variable=self.extras_vars[var_key]).grid(row=row, column=0, sticky="w")
 
     def create_extras_entry(self, frame: tk.Frame, label_text: str, var_key: str, row: int) -> None:
         tk.Label(frame, text=label_text).grid(row=row, column=0, sticky="e")
         entry = tk.Entry(frame, textvariable=self.extras_vars[var_key])
         entry.grid(row=row, column=1, pady=5, sticky="ew")
-        entry.bind("<KeyRelease>", self.update_extras_cost)
         self.add_tooltip(entry, f"Enter quantity for {label_text.split(' ')[0].lower()}")
 
     def create_form_buttons(self) -> None:
@@ -337,44 +342,39 @@ class BookingManager:
         self.search_button.grid(row=1, column=2, padx=5, pady=5)
 
         self.report_button = tk.Button(button_frame, text="Generate Report", command=self.generate_report)
-        self.report_button.grid(row=2, column=0, columnspan=3, pady=5)
+        self.report_button.grid(row=2, column=0, columnspan=2, pady=5)
+
+        self.import_button = tk.Button(button_frame, text="Import Bookings", command=self.import_bookings)
+        self.import_button.grid(row=2, column=2, padx=5, pady=5)
 
         self.extras_cost_label = tk.Label(self.scrollable_frame, text="Extras Cost: $0")
         self.extras_cost_label.grid(row=12, column=0, columnspan=2, pady=10)
 
+    @timed('display_calendar')
     def display_calendar(self, year: int, month: int) -> None:
-        for widget in self.calendar_frame.winfo_children():
-            if widget != self.month_year_nav_frame:
-                widget.destroy()
-
         self.month_year_label.config(text=f"{datetime(year, month, 1).strftime('%B %Y')}")
 
-        days_in_month = (datetime(year, month + 1, 1) - timedelta(days=1)).day if month < 12 else 31
+        days_in_month = self.engine.month_bounds(year, month)[1].day
         first_day = datetime(year, month, 1).weekday()
 
-        days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        for i, day in enumerate(days):
-            tk.Label(self.calendar_frame, text=day).grid(row=1, column=i, sticky="ew")
-
-        row = 2
-        col = first_day
-        for day in range(1, days_in_month + 1):
-            day_str = f"{day:02d}/{month:02d}/{year}"
-            day_btn = tk.Button(self.calendar_frame, text=str(day), width=12, height=5, command=lambda d=day_str: self.show_day_bookings(d))
-            day_btn.grid(row=row, column=col, sticky="nsew")
-            bookings, colors = self.get_booking_text_for_date(day_str)
-            if bookings:
-                day_btn.config(text=f"{day}\n{bookings}", anchor='n')
-                day_btn.config(background=colors[0] if colors else 'red')
+        for i, cell in enumerate(self.day_cells):
+            day = i - first_day + 1
+            if 1 <= day <= days_in_month:
+                day_str = f"{day:02d}/{month:02d}/{year}"
+                cell.day = day
+                cell.config(command=lambda d=day_str: self.show_day_bookings(d))
+                self.render_day_cell(cell)
+                cell.grid()
             else:
-                day_btn.config(background='green')
-            col += 1
-            if col > 6:
-                col = 0
-                row += 1
+                cell.day = None
+                cell.grid_remove()
 
-        for i in range(7):
-            self.calendar_frame.grid_columnconfigure(i, weight=1)
+    def render_day_cell(self, cell: tk.Button) -> None:
+        bookings, colors = self.get_booking_text_for_day(cell.day)
+        if bookings:
+            cell.config(text=f"{cell.day}\n{bookings}", background=colors[0] if colors else 'red')
+        else:
+            cell.config(text=str(cell.day), background='green')
 
     def prev_month(self) -> None:
         if self.current_month == 1:
@@ -395,23 +395,19 @@ class BookingManager:
         self.display_calendar(self.current_year, self.current_month)
 
     def get_booking_text_for_date(self, date: str) -> Tuple[str, List[str]]:
-        date = pd.Timestamp(datetime.strptime(date, '%d/%m/%Y'))
+        index = self.occupancy.day_index(datetime.strptime(date, '%d/%m/%Y'))
+        if index is None:
+            return '', []
+        return self.get_booking_text_for_day(index + 1)
+
+    def get_booking_text_for_day(self, day: int) -> Tuple[str, List[str]]:
         bookings_text = []
         colors = []
-        for booking in self.bookings:
-            if booking.start_date <= date <= booking.end_date:
-                if booking.campsite not in self.color_map:
-                    self.color_map[booking.campsite] = self.generate_random_color()
-                color = self.color_map[booking.campsite]
-                colors.append(color)
-                if booking.start_date == date and booking.end_date == date:
-                    bookings_text.append(f"{booking.campsite} {booking.name} (in/out)")
-                elif booking.start_date == date:
-                    bookings_text.append(f"{booking.campsite} {booking.name} (in)")
-                elif booking.end_date == date:
-                    bookings_text.append(f"{booking.campsite} {booking.name} (out)")
-                else:
-                    bookings_text.append(f"{booking.campsite} {booking.name}")
+        for campsite, text in self.occupancy.day_labels(day - 1):
+            if campsite not in self.color_map:
+                self.color_map[campsite] = self.generate_random_color()
+            colors.append(self.color_map[campsite])
+            bookings_text.append(text)
         return '\n'.join(bookings_text), colors
 
     def generate_random_color(self) -> str:
@@ -422,36 +418,20 @@ class BookingManager:
             booking_data = self.get_form_data()
             extras_data, extras_booleans, extras_paid = self.get_extras_data()
 
-            if not self.validate_booking_data(booking_data):
+            if booking_data['Is Group Booking']:
+                self.add_group_booking(booking_data, extras_data, extras_booleans, extras_paid)
                 return
 
-            if not booking_data['Is Group Booking'] and self.is_site_booked(booking_data['Campsite'], booking_data['Start Date'], booking_data['End Date']):
+            try:
+                new_booking, extras_cost = self.engine.add_booking(booking_data, extras_data, extras_booleans, extras_paid)
+            except BookingConflictError:
                 self.suggest_alternatives(booking_data)
                 return
+            except BookingError as e:
+                messagebox.showerror(e.title, str(e))
+                return
 
-            extras_cost = self.calculate_extras_cost(extras_data, extras_booleans, booking_data['People'])
-            extras_summary = ', '.join([f"{key} ({value})" for key, value in extras_data.items() if value] + [f"{key} (Yes)" for key, value in extras_booleans.items() if value])
-
-            new_booking = Booking(
-                booking_id=self.next_booking_id,
-                name=booking_data['Name'],
-                phone=booking_data['Phone'],
-                email=booking_data['Email'],
-                campsite=booking_data['Campsite'],
-                start_date=booking_data['Start Date'],
-                end_date=booking_data['End Date'],
-                people=booking_data['People'],
-                status=booking_data['Status'],
-                extras=extras_summary,
-                extras_paid=extras_paid,
-                kayaks=booking_data['Kayaks'],
-                kayaks_count=booking_data['Kayaks Count'],
-                is_group_booking=booking_data['Is Group Booking']
-            )
-            self.bookings.append(new_booking)
-            self.next_booking_id += 1
-
-            self.save_bookings()
+            self.occupancy.add(new_booking.booking_id, new_booking.campsite, new_booking.start_date, new_booking.end_date, new_booking.name)
             self.update_calendar()
             messagebox.showinfo("Success", f"Booking added successfully. Extras cost: ${extras_cost}")
             self.extras_cost_label.config(text=f"Extras Cost: ${extras_cost}")
@@ -460,6 +440,32 @@ class BookingManager:
             logging.error(f"Error in add_booking: {e}")
             messagebox.showerror("Error", "An error occurred while adding the booking. Please try again.")
 
+    def add_group_booking(self, booking_data: Dict[str, Any], extras_data: Dict[str, int], extras_booleans: Dict[str, bool],
+                          extras_paid: bool) -> None:
+        try:
+            self.engine.validate_booking_data(booking_data, whole_group=True)
+            allocation = self.engine.allocate_group(booking_data['People'], booking_data['Start Date'], booking_data['End Date'],
+                                                    booking_data['Campsite'])
+        except BookingError as e:
+            messagebox.showerror(e.title, str(e))
+            return
+
+        sites = ', '.join(f"{campsite} ({count})" for campsite, count in allocation)
+        if not messagebox.askyesno("Group Booking", f"Book {booking_data['People']} people across {len(allocation)} campsite(s): {sites}?"):
+            return
+        try:
+            bookings, extras_cost = self.engine.add_group_booking(booking_data, extras_data, extras_booleans, extras_paid, allocation)
+        except BookingError as e:
+            messagebox.showerror(e.title, str(e))
+            return
+
+        for booking in bookings:
+            self.occupancy.add(booking.booking_id, booking.campsite, booking.start_date, booking.end_date, booking.name)
+        self.update_calendar()
+        messagebox.showinfo("Success", f"Group booked as IDs {', '.join(str(booking.booking_id) for booking in bookings)}. Extras cost: ${extras_cost}")
+        self.extras_cost_label.config(text=f"Extras Cost: ${extras_cost}")
+        self.clear_form_fields()
+
     def get_form_data(self) -> Dict[str, Any]:
         booking_data = {label: var.get() for label, var in self.form_vars.items()}
         booking_data['Start Date'] = pd.Timestamp(self.form_vars['Start Date'].get_date())
@@ -476,38 +482,6 @@ class BookingManager:
         extras_paid = self.extras_paid_var.get()
         return extras_data, extras_booleans, extras_paid
 
-    def validate_booking_data(self, booking_data: Dict[str, Any]) -> bool:
-        if not (booking_data['Name'] and booking_data['Phone'] and booking_data['Email'] and booking_data['Campsite'] and booking_data['Start Date'] and booking_data['End Date'] and booking_data['People']):
-            messagebox.showerror("Input Error", "All fields are required.")
-            return False
-
-        if booking_data['Start Date'] > booking_data['End Date']:
-            messagebox.showerror("Date Error", "End date must be after start date.")
-            return False
-
-        return True
-
-    def calculate_extras_cost(self, extras: Dict[str, int], booleans: Dict[str, bool], people: int) -> int:
-        cost = 0
-        if booleans['Portable Toilet'] and people < 10:
-            cost += 70
-        cost += extras['Fire Wood'] * 15
-        cost += extras['Bag of Ice'] * 5
-        cost += extras['1 Dozen Eggs'] * 8
-        cost += extras['Honey'] * 13
-        cost += extras['Breakfast Special'] * 20
-        cost += extras['Meat Tray'] * 60
-        return cost
-
-    def is_site_booked(self, campsite: str, start_date: pd.Timestamp, end_date: pd.Timestamp) -> bool:
-        logging.debug(f"Checking availability for {campsite} from {start_date} to {end_date}")
-        for booking in self.bookings:
-            if booking.campsite == campsite and booking.status != 'Canceled' and not booking.is_group_booking:
-                if start_date < booking.end_date and end_date > booking.start_date:
-                    return True
-        logging.debug(f"Campsite {campsite} is available for the selected dates.")
-        return False
-
     def edit_booking(self) -> None:
         edit_window = tk.Toplevel(self.master)
         edit_window.title("Edit Booking")
@@ -539,7 +513,7 @@ class BookingManager:
         if label in ["New Campsite", "New Status"]:
             self.edit_vars[label] = tk.StringVar()
             entry = ttk.Combobox(window, textvariable=self.edit_vars[label])
-            entry['values'] = list(self.campsites.keys()) if label == "New Campsite" else ['Pending', 'Confirmed', 'Canceled']
+            entry['values'] = list(self.campsites.keys()) if label == "New Campsite" else STATUSES
         elif label in ["New Start Date", "New End Date"]:
             entry = DateEntry(window, date_pattern=DATE_PATTERN)
             self.edit_vars[label] = entry
@@ -598,41 +572,23 @@ class BookingManager:
             new_extras_booleans = {key: var.get() for key, var in self.new_extras_vars.items() if isinstance(var, tk.BooleanVar)}
             new_extras_paid = self.new_extras_paid_var.get()
 
-            if not self.validate_updated_data(updated_data):
-                return
-
             try:
                 booking_id = int(booking_id)
             except ValueError:
                 messagebox.showerror("ID Error", "Booking ID must be a number.")
                 return
 
-            booking = next((b for b in self.bookings if b.booking_id == booking_id), None)
-            if not booking:
-                messagebox.showerror("ID Error", "Booking ID does not exist.")
-                return
-
-            if self.is_site_booked(updated_data['New Campsite'], updated_data['New Start Date'], updated_data['New End Date']):
+            booking_data = {label[len('New '):]: value for label, value in updated_data.items()}
+            try:
+                booking, new_extras_cost = self.engine.update_booking(booking_id, booking_data, new_extras_data, new_extras_booleans, new_extras_paid)
+            except BookingConflictError:
                 self.suggest_alternatives(updated_data, edit=True)
                 return
+            except BookingError as e:
+                messagebox.showerror(e.title, str(e))
+                return
 
-            new_extras_cost = self.calculate_extras_cost(new_extras_data, new_extras_booleans, updated_data['New People'])
-            new_extras_summary = ', '.join([f"{key} ({value})" for key, value in new_extras_data.items() if value] + [f"{key} (Yes)" for key, value in new_extras_booleans.items() if value])
-
-            booking.name = updated_data['New Name']
-            booking.phone = updated_data['New Phone']
-            booking.email = updated_data['New Email']
-            booking.campsite = updated_data['New Campsite']
-            booking.start_date = updated_data['New Start Date']
-            booking.end_date = updated_data['New End Date']
-            booking.people = updated_data['New People']
-            booking.status = updated_data['New Status']
-            booking.extras = new_extras_summary
-            booking.extras_paid = new_extras_paid
-            booking.kayaks = updated_data['New Kayaks']
-            booking.kayaks_count = updated_data['New Kayaks Count']
-
-            self.save_bookings()
+            self.occupancy.add(booking.booking_id, booking.campsite, booking.start_date, booking.end_date, booking.name)
             self.update_calendar()
             messagebox.showinfo("Success", f"Booking updated successfully. New extras cost: ${new_extras_cost}")
             self.extras_cost_label.config(text=f"Extras Cost: ${new_extras_cost}")
@@ -641,16 +597,47 @@ class BookingManager:
             logging.error(f"Error in update_booking: {e}")
             messagebox.showerror("Error", "An error occurred while updating the booking. Please try again.")
 
-    def validate_updated_data(self, updated_data: Dict[str, Any]) -> bool:
-        if not (updated_data['New Name'] and updated_data['New Phone'] and updated_data['New Email'] and updated_data['New Campsite'] and updated_data['New Start Date'] and updated_data['New End Date'] and updated_data['New People']):
-            messagebox.showerror("Input Error", "All fields are required.")
-            return False
-
-        if updated_data['New Start Date'] > updated_data['New End Date']:
-            messagebox.showerror("Date Error", "End date must be after start date.")
-            return False
+    def suggest_alternatives(self, booking_data: Dict[str, Any], edit: bool = False) -> None:
+        # Called when a save clashes: offer the nearest free campsites and
+        # dates, and copy the chosen one back into the form that was saved.
+        prefix = 'New ' if edit else ''
+        form = self.edit_vars if edit else self.form_vars
+        campsite = booking_data[prefix + 'Campsite']
+        start_date, end_date = booking_data[prefix + 'Start Date'], booking_data[prefix + 'End Date']
+        exclude_id = int(self.booking_id_var.get()) if edit else None
+        options = self.engine.suggest_alternatives(campsite, start_date, end_date, booking_data[prefix + 'People'],
+                                                   exclude_id=exclude_id, days=ALTERNATIVE_DAYS)
+        if not options:
+            messagebox.showerror("Booking Conflict", f"Campsite {campsite} is already booked for the selected dates, "
+                                                     f"and no other campsite is free within {ALTERNATIVE_DAYS} days.")
+            return
 
-        return True
+        window = tk.Toplevel(self.master)
+        window.title("Booking Conflict")
+        tk.Label(window, text=f"Campsite {campsite} is already booked for the selected dates. Available instead:").grid(row=0, column=0, columnspan=2, padx=10, pady=5)
+        tree = ttk.Treeview(window, columns=ALTERNATIVE_COLUMNS, show='headings', height=len(options), selectmode='browse')
+        for column in ALTERNATIVE_COLUMNS:
+            tree.heading(column, text=column)
+            tree.column(column, width=100, stretch=True)
+        for i, option in enumerate(options):
+            moved = "Same dates" if option.shift == 0 else f"{abs(option.shift)} day{'s' if abs(option.shift) != 1 else ''} {'later' if option.shift > 0 else 'earlier'}"
+            tree.insert('', tk.END, iid=str(i), values=(option.campsite, option.start_date.strftime('%d/%m/%Y'),
+                                                        option.end_date.strftime('%d/%m/%Y'), moved, option.capacity))
+        tree.selection_set('0')
+        tree.grid(row=1, column=0, columnspan=2, padx=10, sticky="nsew")
+
+        def use_selected() -> None:
+            option = options[int(tree.selection()[0])]
+            form[prefix + 'Campsite'].set(option.campsite)
+            form[prefix + 'Start Date'].set_date(option.start_date.date())
+            form[prefix + 'End Date'].set_date(option.end_date.date())
+            window.destroy()
+
+        tree.bind("<Double-1>", lambda e: use_selected())
+        tk.Button(window, text="Use Selected", command=use_selected).grid(row=2, column=0, pady=10)
+        tk.Button(window, text="Cancel", command=window.destroy).grid(row=2, column=1, pady=10)
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(1, weight=1)
 
     def delete_booking(self) -> None:
         delete_window = tk.Toplevel(self.master)
@@ -677,15 +664,18 @@ class BookingManager:
                 messagebox.showerror("ID Error", "Booking ID must be a number.")
                 return
 
-            booking = next((b for b in self.bookings if b.booking_id == booking_id), None)
-            if not booking:
+            if not self.engine.get_booking(booking_id):
                 messagebox.showerror("ID Error", "Booking ID does not exist.")
                 return
 
             confirmation = messagebox.askyesno("Delete Confirmation", "Are you sure you want to delete this booking?")
             if confirmation:
-                self.bookings.remove(booking)
-                self.save_bookings()
+                try:
+                    self.engine.delete_booking(booking_id)
+                except BookingNotFoundError as e:
+                    messagebox.showerror(e.title, str(e))
+                    return
+                self.occupancy.remove(booking_id)
                 self.update_calendar()
                 messagebox.showinfo("Success", "Booking deleted successfully.")
                 self.clear_form_fields()
@@ -707,10 +697,11 @@ class BookingManager:
         self.show_details_button = tk.Button(details_window, text="Show Bookings", command=self.display_details)
         self.show_details_button.grid(row=1, column=0, columnspan=2, pady=10)
 
-        self.details_text = tk.Text(details_window, width=50, height=20)
-        self.details_text.grid(row=2, column=0, columnspan=2)
+        self.details_table_frame = tk.Frame(details_window)
+        self.details_table_frame.grid(row=2, column=0, columnspan=2, sticky="nsew")
 
         details_window.columnconfigure(1, weight=1)
+        details_window.rowconfigure(2, weight=1)
 
     def display_details(self) -> None:
         campsite = self.details_campsite_var.get()
@@ -718,24 +709,26 @@ class BookingManager:
             messagebox.showerror("Input Error", "Campsite is required.")
             return
 
-        details = pd.DataFrame([b.to_dict() for b in self.bookings if b.campsite == campsite])
-        self.details_text.delete(1.0, tk.END)
-        self.details_text.insert(tk.END, details.to_string(index=False))
+        for child in self.details_table_frame.winfo_children():
+            child.destroy()
+        table = BookingTable(self.bookings, self.bookings.positions_for_campsite(campsite))
+        self.show_booking_table(self.details_table_frame, table, TABLE_COLUMNS, "No bookings for this campsite.")
 
     def show_day_bookings(self, date: str) -> None:
         day_window = tk.Toplevel(self.master)
         day_window.title(f"Bookings on {date}")
         day_window.geometry("500x400")
 
-        day_text = tk.Text(day_window, width=50, height=20)
-        day_text.pack(pady=10)
-
+        # A day on screen reads who is on site from its occupancy row and
+        # fetches just those bookings.
         day_date = pd.Timestamp(datetime.strptime(date, '%d/%m/%Y'))
-        day_bookings = pd.DataFrame([b.to_dict() for b in self.bookings if b.start_date <= day_date and b.end_date >= day_date])
-        if day_bookings.empty:
-            day_text.insert(tk.END, "No bookings for this day.")
+        index = self.occupancy.day_index(day_date)
+        if index is not None:
+            bookings = self.engine.bookings_by_ids(self.occupancy.booking_ids(index))
         else:
-            day_text.insert(tk.END, day_bookings.to_string(index=False))
+            bookings = self.engine.bookings_on(day_date)
+        table = BookingTable(BookingColumns.from_frame(bookings, self.campsites))
+        self.show_booking_table(day_window, table, TABLE_COLUMNS, "No bookings for this day.")
 
     def view_all_bookings(self) -> None:
         try:
@@ -743,14 +736,7 @@ class BookingManager:
             all_window.title("All Bookings")
             all_window.geometry("800x600")
 
-            all_text = tk.Text(all_window, width=80, height=20)
-            all_text.pack(pady=10)
-
-            all_bookings = pd.DataFrame([b.to_dict() for b in self.bookings])
-            if all_bookings.empty:
-                all_text.insert(tk.END, "No bookings available.")
-            else:
-                all_text.insert(tk.END, all_bookings.to_string(index=False))
+            self.show_booking_table(all_window, self.engine.all_bookings_table(), TABLE_COLUMNS, "No bookings available.")
         except Exception as e:
             logging.error(f"Error in view_all_bookings: {e}")
             messagebox.showerror("Error", "An error occurred while viewing all bookings. Please try again.")
@@ -759,52 +745,136 @@ class BookingManager:
         try:
             search_window = tk.Toplevel(self.master)
             search_window.title("Search Bookings")
-            search_window.geometry("300x200")
+            search_window.geometry("900x600")
 
-            tk.Label(search_window, text="Search by Name").grid(row=0, column=0, sticky="e")
+            tk.Label(search_window, text="Name, Phone or Email").grid(row=0, column=0, sticky="e")
             self.search_name_var = tk.StringVar()
             self.search_name_entry = tk.Entry(search_window, textvariable=self.search_name_var)
             self.search_name_entry.grid(row=0, column=1, pady=5, sticky="ew")
+            self.search_name_entry.focus_set()
 
-            tk.Label(search_window, text="Search by Date").grid(row=1, column=0, sticky="e")
+            self.search_date_var = tk.BooleanVar()
+            tk.Checkbutton(search_window, text="On Date", variable=self.search_date_var, command=self.schedule_search).grid(row=1, column=0, sticky="e")
             self.search_date_entry = DateEntry(search_window, date_pattern=DATE_PATTERN)
-            self.search_date_entry.grid(row=1, column=1, pady=5, sticky="ew")
-
-            self.search_button = tk.Button(search_window, text="Search", command=self.perform_search)
-            self.search_button.grid(row=2, column=0, columnspan=2, pady=10)
+            self.search_date_entry.grid(row=1, column=1, pady=5, sticky="w")
+            self.search_date_entry.bind("<<DateEntrySelected>>", lambda e: self.schedule_search())
+
+            self.search_tree = ttk.Treeview(search_window, columns=SEARCH_COLUMNS, show='headings', height=SEARCH_PAGE_SIZE)
+            for column in SEARCH_COLUMNS:
+                self.search_tree.heading(column, text=column)
+                self.search_tree.column(column, width=60 if column in ("ID", "People") else 110, stretch=True)
+            self.search_tree.grid(row=2, column=0, columnspan=2, sticky="nsew")
+
+            nav_frame = tk.Frame(search_window)
+            nav_frame.grid(row=3, column=0, columnspan=2, pady=5)
+            self.search_prev_button = tk.Button(nav_frame, text="<", command=lambda: self.change_search_page(-1))
+            self.search_prev_button.pack(side=tk.LEFT)
+            self.search_status_label = tk.Label(nav_frame, width=40)
+            self.search_status_label.pack(side=tk.LEFT, padx=10)
+            self.search_next_button = tk.Button(nav_frame, text=">", command=lambda: self.change_search_page(1))
+            self.search_next_button.pack(side=tk.LEFT)
 
             search_window.columnconfigure(1, weight=1)
+            search_window.rowconfigure(2, weight=1)
+
+            self.search_offset = 0
+            self.search_name_var.trace_add('write', lambda *args: self.schedule_search())
+            self.perform_search()
         except Exception as e:
             logging.error(f"Error in search_bookings: {e}")
             messagebox.showerror("Error", "An error occurred while opening the search bookings window. Please try again.")
 
+    def schedule_search(self) -> None:
+        # Each keystroke restarts the debounce timer; only the last one runs.
+        if self.search_after_id is not None:
+            self.master.after_cancel(self.search_after_id)
+        self.search_offset = 0
+        self.search_after_id = self.master.after(SEARCH_DEBOUNCE_MS, self.perform_search)
+
+    def change_search_page(self, step: int) -> None:
+        self.search_offset = max(0, self.search_offset + step * SEARCH_PAGE_SIZE)
+        self.perform_search()
+
     def perform_search(self) -> None:
         try:
-            name = self.search_name_var.get()
-            date = self.search_date_entry.get_date()
-
-            results = pd.DataFrame()
-            if name:
-                results = pd.DataFrame([b.to_dict() for b in self.bookings if name.lower() in b.name.lower()])
+            self.search_after_id = None
+            self.search_generation += 1
+            text = self.search_name_var.get().strip()
+            date = self.search_date_entry.get_date() if self.search_date_var.get() else None
+
+            if not text and date is None:
+                self.show_search_results((self.search_generation, [], 0, 0, None))
+                self.search_status_label.config(text="Type a name, phone number or email.")
+                return
 
-            if date:
-                date_results = pd.DataFrame([b.to_dict() for b in self.bookings if b.start_date.date() <= date and b.end_date.date() >= date])
-                results = pd.concat([results, date_results]).drop_duplicates().reset_index(drop=True)
+            self.search_status_label.config(text="Searching...")
+            self.search_worker.submit(self.run_search, self.search_generation, text, date, self.search_offset,
+                                      on_done=self.show_search_results)
+        except Exception as e:
+            logging.error(f"Error in perform_search: {e}")
+            messagebox.showerror("Error", "An error occurred while performing the search. Please try again.")
 
-            if results.empty:
-                messagebox.showinfo("Search Results", "No bookings found.")
-            else:
-                search_results_window = tk.Toplevel(self.master)
-                search_results_window.title("Search Results")
-                search_results_window.geometry("800x600")
+    def run_search(self, generation: int, text: str, date: Any, offset: int) -> Any:
+        # Runs on the search worker, which only queries the (locked) search
+        # index; the bookings themselves are read on the Tk thread. A query
+        # that a newer keystroke has already superseded is dropped before it
+        # starts.
+        if generation != self.search_generation:
+            return None
+        if date is not None:
+            return generation, self.engine.ranked_ids(text) if text else None, None, offset, date
+        ids, total = self.engine.search_ids(text, SEARCH_PAGE_SIZE, offset)
+        return generation, ids, total, offset, None
+
+    def on_search_error(self, error: Exception) -> None:
+        # The worker has logged it; the next keystroke searches again.
+        if self.search_tree.winfo_exists():
+            self.search_status_label.config(text="Search failed. Please try again.")
+
+    @timed('show_search_results')
+    def show_search_results(self, result: Any) -> None:
+        if result is None or result[0] != self.search_generation or not self.search_tree.winfo_exists():
+            return
+        _, ids, total, offset, date = result
+        if date is not None:
+            ids, total = self.engine.page_on_date(ids, date, SEARCH_PAGE_SIZE, offset)
+        # Bookings deleted since the index was queried are left out.
+        results = self.engine.bookings_by_ids(ids)
+        self.search_tree.delete(*self.search_tree.get_children())
+        for record in results.to_dict('records'):
+            values = [record[column].strftime('%d/%m/%Y') if column in ("Start Date", "End Date") else record[column]
+                      for column in SEARCH_COLUMNS]
+            self.search_tree.insert('', tk.END, values=values)
+
+        if total:
+            self.search_status_label.config(text=f"Showing {offset + 1}-{offset + len(results)} of {total}")
+        else:
+            self.search_status_label.config(text="No bookings found.")
+        self.search_prev_button.config(state=tk.NORMAL if offset > 0 else tk.DISABLED)
+        self.search_next_button.config(state=tk.NORMAL if offset + len(results) < total else tk.DISABLED)
 
-                results_text = tk.Text(search_results_window, width=80, height=20)
-                results_text.pack(pady=10)
+    def import_bookings(self) -> None:
+        path = filedialog.askopenfilename(title="Import Bookings", filetypes=[("Spreadsheets", "*.csv *.xlsx *.xls"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            try:
+                result = import_bookings(self.engine, path)
+            except BookingError as e:
+                messagebox.showerror(e.title, str(e))
+                return
 
-                results_text.insert(tk.END, results.to_string(index=False))
+            self.load_bookings(self.current_year, self.current_month)
+            self.update_calendar()
+            message = f"Imported {len(result.imported)} bookings."
+            if not result.rejected.empty:
+                report_path = rejection_report_path(path)
+                result.write_rejections(report_path)
+                message += f"\n{len(result.rejected)} rows were rejected; see {report_path}"
+            messagebox.showinfo("Import Bookings", message)
         except Exception as e:
-            logging.error(f"Error in perform_search: {e}")
-            messagebox.showerror("Error", "An error occurred while performing the search. Please try again.")
+            logging.error(f"Error in import_bookings: {e}")
+            messagebox.showerror("Error", "An error occurred while importing bookings. Please try again.")
 
     def generate_report(self) -> None:
         try:
@@ -833,67 +903,138 @@ class BookingManager:
             start_date = self.report_start_date_entry.get_date()
             end_date = self.report_end_date_entry.get_date()
 
-            if start_date > end_date:
-                messagebox.showerror("Date Error", "End date must be after start date.")
+            try:
+                report_results = self.engine.report_table(start_date, end_date)
+            except BookingError as e:
+                messagebox.showerror(e.title, str(e))
                 return
 
-            report_results = pd.DataFrame([b.to_dict() for b in self.bookings if b.start_date.date() >= start_date and b.end_date.date() <= end_date])
-
-            if report_results.empty:
+            if not len(report_results):
                 messagebox.showinfo("Report Results", "No bookings found for the selected period.")
             else:
-                self.display_report(report_results)
+                self.display_report(report_results, start_date, end_date)
         except Exception as e:
             logging.error(f"Error in perform_generate_report: {e}")
             messagebox.showerror("Error", "An error occurred while generating the report. Please try again.")
 
-    def display_report(self, data: pd.DataFrame) -> None:
+    @timed('display_report')
+    def display_report(self, data: BookingTable, start_date: Any, end_date: Any) -> None:
         report_window = tk.Toplevel(self.master)
         report_window.title("Booking Report")
         report_window.geometry("900x700")
 
-        report_text = tk.Text(report_window, width=700, height=500)
-        report_text.pack(pady=10)
+        data.sort('Start Date')
+        export_frame = tk.Frame(report_window)
+        export_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        status_label = tk.Label(export_frame, text=f"{len(data)} bookings")
+        status_label.pack(side=tk.LEFT)
+        for text, extension in [("Export PDF", '.pdf'), ("Export CSV", '.csv')]:
+            tk.Button(export_frame, text=text,
+                      command=lambda ext=extension: self.export_report(data, start_date, end_date, ext, status_label)).pack(side=tk.RIGHT, padx=5)
+        self.show_booking_table(report_window, data, REPORT_COLUMNS, "No bookings found for the selected period.",
+                                date_format='%d/%m/%y', formatters=REPORT_FORMATTERS)
+
+    def export_report(self, data: BookingTable, start_date: Any, end_date: Any, extension: str, status_label: tk.Label) -> None:
+        # The file is written on the report worker a batch of rows at a time,
+        # in the order the table is showing when the export starts.
+        path = filedialog.asksaveasfilename(title="Export Report", defaultextension=extension,
+                                            initialfile=f"report_{start_date:%Y%m%d}_{end_date:%Y%m%d}{extension}")
+        if not path:
+            return
+        try:
+            sink = report_sink(path, report_title(start_date, end_date))
+        except BookingError as e:
+            messagebox.showerror(e.title, str(e))
+            return
+        snapshot = BookingTable(data.bookings, data.order)
+        status_label.config(text=f"Exporting {len(snapshot)} bookings...")
+
+        def done(count: int) -> None:
+            if status_label.winfo_exists():
+                status_label.config(text=f"{len(data)} bookings")
+            messagebox.showinfo("Export Report", f"Wrote {count} bookings to {path}")
 
-        for _, row in data.iterrows():
-            booking_date = row['Start Date'].strftime('%d/%m/%y')
-            campsite = row['Campsite']
-            name = row['Name']
-            phone = row['Phone']
-            email = row['Email']
-            people = row['People']
-            nights = (row['End Date'] - row['Start Date']).days
-            extras_str = row['Extras']
-            extras_paid = 'y' if row['Extras Paid'] else 'n'
+        self.report_worker.submit(write_report, snapshot, sink, on_done=done)
 
-            line = f"{booking_date} - {campsite}, {name}, {phone}, {email}, {people} {'person' if people == 1 else 'people'}, {nights} {'night' if nights == 1 else 'nights'}, {extras_str}, Extras paid? {extras_paid}"
+    def on_report_error(self, error: Exception) -> None:
+        if isinstance(error, BookingError):
+            messagebox.showerror(error.title, str(error))
+        else:
+            messagebox.showerror("Error", "An error occurred while exporting the report. Please try again.")
+
+    def show_booking_table(self, parent: tk.Widget, table: BookingTable, columns: List[str], empty_text: str, **options: Any) -> None:
+        if not len(table):
+            tk.Label(parent, text=empty_text).pack(pady=10)
+            return
+        BookingTableView(parent, table, columns, **options).pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    def show_performance(self) -> None:
+        window = tk.Toplevel(self.master)
+        window.title("Performance")
+        window.geometry("640x400")
 
-            report_text.insert(tk.END, line + "\n")
+        tree = ttk.Treeview(window, columns=PERFORMANCE_COLUMNS, show='headings')
+        for column in PERFORMANCE_COLUMNS:
+            tree.heading(column, text=column)
+            tree.column(column, width=160 if column == "Operation" else 80, anchor=tk.W if column == "Operation" else tk.E)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        def refresh() -> None:
+            if not window.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for name, summary in metrics.snapshot().items():
+                tree.insert('', tk.END, values=(name, summary['count'], f"{summary['p50_ms']:.2f}", f"{summary['p90_ms']:.2f}",
+                                                f"{summary['p99_ms']:.2f}", f"{summary['max_ms']:.2f}"))
+            window.after(1000, refresh)
+
+        def toggle_profile() -> None:
+            if not metrics.profiling:
+                metrics.start_profile()
+                profile_button.config(text="Stop Profiling")
+                return
+            profile_button.config(text="Start Profiling")
+            stats = metrics.stop_profile(PROFILE_DUMP)
+            stats_window = tk.Toplevel(window)
+            stats_window.title(f"Profile (saved to {PROFILE_DUMP})")
+            text = tk.Text(stats_window, wrap=tk.NONE, width=120, height=40)
+            text.insert(tk.END, stats)
+            text.config(state=tk.DISABLED)
+            text.pack(fill=tk.BOTH, expand=True)
+
+        def save_json() -> None:
+            path = filedialog.asksaveasfilename(title="Save Timings", defaultextension=".json", initialfile=PERFORMANCE_DUMP)
+            if path:
+                metrics.dump(path)
+
+        button_frame = tk.Frame(window)
+        button_frame.pack(pady=5)
+        profile_button = tk.Button(button_frame, text="Stop Profiling" if metrics.profiling else "Start Profiling", command=toggle_profile)
+        profile_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Save JSON", command=save_json).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Reset", command=metrics.reset).pack(side=tk.LEFT, padx=5)
+        debug_var = tk.BooleanVar(value=debug_enabled())
+        tk.Checkbutton(button_frame, text="Debug logging", variable=debug_var,
+                       command=lambda: set_level(logging.DEBUG if debug_var.get() else logging.INFO)).pack(side=tk.LEFT, padx=5)
+        refresh()
 
     def update_calendar(self) -> None:
         try:
-            self.load_bookings(self.current_year, self.current_month)
-            for widget in self.calendar_frame.winfo_children():
-                if isinstance(widget, tk.Button):
-                    date = widget.cget("text").split("\n")[0]
-                    day_str = f"{int(date):02d}/{self.current_month:02d}/{self.current_year}"
-                    bookings, colors = self.get_booking_text_for_date(day_str)
-                    if bookings:
-                        widget.config(text=f"{date}\n{bookings}", anchor='n')
-                        widget.config(background=colors[0] if colors else 'red')
-                    else:
-                        widget.config(background='green')
+            self.bookings = self.engine.month_view(self.current_year, self.current_month)
+            for cell in self.day_cells:
+                if cell.day is not None:
+                    self.render_day_cell(cell)
         except Exception as e:
             logging.error(f"Error in update_calendar: {e}")
             messagebox.showerror("Error", "An error occurred while updating the calendar. Please try again.")
 
     def is_date_booked(self, date: str) -> bool:
         try:
-            date = pd.Timestamp(datetime.strptime(date, '%d/%m/%Y'))
-            for booking in self.bookings:
-                if booking.start_date <= date <= booking.end_date:
-                    return True
-            return False
+            day = datetime.strptime(date, '%d/%m/%Y')
+            index = self.occupancy.day_index(day)
+            if index is None:
+                return not self.engine.bookings_on(day).empty
+            return self.occupancy.is_booked(index)
         except Exception as e:
             logging.error(f"Error in is_date_booked: {e}")
             messagebox.showerror("Error", "An error occurred while checking date availability. Please try again.")
@@ -928,11 +1069,11 @@ class BookingManager:
 
     def update_extras_cost(self, event: tk.Event = None) -> None:
         try:
-            extras_data = {key: (int(var.get()) if var.get().isdigit() else 0) for key, var in self.extras_vars.items() if isinstance(var, tk.StringVar)}
-            extras_booleans = {key: var.get() for key, var in self.extras_vars.items() if isinstance(var, tk.BooleanVar)}
-            people = int(self.form_vars['People'].get() or 0)
-            extras_cost = self.calculate_extras_cost(extras_data, extras_booleans, people)
-            self.extras_cost_label.config(text=f"Extras Cost: ${extras_cost}")
+            quote = self.engine.quote(self.quote_booking, self.quote_extras, self.quote_booleans)
+            text = f"Extras Cost: ${quote.extras}"
+            if quote.site_fees:
+                text += f"   Site Fees ({quote.nights} nights): ${quote.site_fees:.2f}   Total: ${quote.total:.2f}"
+            self.extras_cost_label.config(text=text)
         except Exception as e:
             logging.error(f"Error in update_extras_cost: {e}")
             messagebox.showerror("Error", "An error occurred while updating extras cost. Please try again.")
@@ -943,6 +1084,8 @@ class BookingManager:
                 var.set("")
             elif isinstance(var, DateEntry):
                 var.set_date(datetime.now())
+        for key in ('Start Date', 'End Date'):
+            self.on_quote_input(key)
         for var in self.extras_vars.values():
             if isinstance(var, tk.StringVar):
                 var.set("")
@@ -951,6 +1094,82 @@ class BookingManager:
         self.extras_paid_var.set(False)
         self.group_booking_var.set(False)
 
+class BookingTableView(tk.Frame):
+    # A Treeview with a fixed pool of row items over a BookingTable. The
+    # scrollbar moves an offset into the table and only the rows in view are
+    # fetched and written into the pool, so opening and scrolling cost the
+    # same for 100 or 100,000 bookings. Clicking a heading sorts by it.
+    def __init__(self, master: tk.Widget, table: BookingTable, columns: List[str], height: int = 25,
+                 date_format: str = '%d/%m/%Y', formatters: Dict[str, Callable[[Mapping[str, Any]], Any]] = None):
+        super().__init__(master)
+        self.table = table
+        self.columns = columns
+        self.height = height
+        self.date_format = date_format
+        self.formatters = formatters or {}
+        self.top = 0
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=height, selectmode='browse')
+        for column in columns:
+            self.tree.heading(column, text=column, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=60 if column in ("ID", "People", "Nights") else 110, stretch=True)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.items = [self.tree.insert('', tk.END) for _ in range(height)]
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self.on_wheel)
+        self.tree.bind('<Prior>', lambda e: self.scroll_to(self.top - self.height))
+        self.tree.bind('<Next>', lambda e: self.scroll_to(self.top + self.height))
+        self.tree.bind('<Home>', lambda e: self.scroll_to(0))
+        self.tree.bind('<End>', lambda e: self.scroll_to(len(self.table)))
+        self.refresh()
+
+    def on_scroll(self, action: str, amount: str, unit: str = None) -> None:
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * len(self.table)))
+        elif action == 'scroll':
+            self.scroll_to(self.top + int(amount) * (self.height if unit == 'pages' else 1))
+
+    def on_wheel(self, event: tk.Event) -> str:
+        self.scroll_to(self.top + (-3 if event.num == 4 or event.delta > 0 else 3))
+        return 'break'
+
+    def scroll_to(self, top: int) -> None:
+        self.top = max(0, min(top, len(self.table) - self.height))
+        self.refresh()
+
+    def sort_by(self, column: str) -> None:
+        self.table.sort(column, descending=self.table.sort_column == column and not self.table.descending)
+        for name in self.columns:
+            arrow = (' ▼' if self.table.descending else ' ▲') if name == column else ''
+            self.tree.heading(name, text=name + arrow)
+        self.scroll_to(0)
+
+    def refresh(self) -> None:
+        records = self.table.page(self.top, self.top + self.height)
+        for item, record in zip(self.items, records):
+            self.tree.item(item, values=[self.format_cell(record, column) for column in self.columns])
+        for item in self.items[len(records):]:
+            self.tree.item(item, values=())
+        total = len(self.table)
+        if total:
+            self.scrollbar.set(self.top / total, min(self.top + self.height, total) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def format_cell(self, record: Mapping[str, Any], column: str) -> Any:
+        if column in self.formatters:
+            return self.formatters[column](record)
+        value = record[column]
+        if isinstance(value, (pd.Timestamp, datetime)):
+            return value.strftime(self.date_format)
+        return value
+
+
 class Tooltip:
     def __init__(self, widget: tk.Widget, text: str):
         self.widget = widget
@@ -976,6 +1195,11 @@ class Tooltip:
             tw.destroy()
 
 if __name__ == "__main__":
+    configure_logging()
     root = tk.Tk()
     app = BookingManager(master=root)
-    root.mainloop()
+    try:
+        root.mainloop()
+        app.close()
+    finally:
+        stop_logging()
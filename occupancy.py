@@ -0,0 +1,145 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from booking_view import BookingColumns, to_day
+
+
+class OccupancyMatrix:
+    # counts[day, site] is the number of bookings on each campsite for each
+    # day of a window (normally the month on screen). It is filled with a
+    # difference array and one cumulative sum, then patched in place as
+    # bookings are added or removed. labels[day] caches the calendar text for
+    # that day keyed by booking ID.
+    def __init__(self, first_day: Any, days: int, campsites: List[str]):
+        self.first_day = to_day(first_day)
+        self.days = days
+        self.campsites = list(campsites)
+        self.counts = np.zeros((days, len(self.campsites)), dtype=np.int32)
+        self.day_totals = np.zeros(days, dtype=np.int32)
+        self.labels: List[Dict[int, Tuple[str, str]]] = [{} for _ in range(days)]
+        self._spans: Dict[int, Tuple[int, int, int]] = {}
+
+    @classmethod
+    def from_columns(cls, bookings: BookingColumns, first_day: Any, days: int) -> 'OccupancyMatrix':
+        matrix = cls(first_day, days, bookings.campsites)
+        lo = np.clip((bookings.starts - matrix.first_day).astype(np.int64), 0, days)
+        hi = np.clip((bookings.ends - matrix.first_day).astype(np.int64) + 1, 0, days)
+        inside = np.flatnonzero(lo < hi)
+
+        diff = np.zeros((days + 1, len(matrix.campsites)), dtype=np.int32)
+        np.add.at(diff, (lo[inside], bookings.site_codes[inside]), 1)
+        np.add.at(diff, (hi[inside], bookings.site_codes[inside]), -1)
+        matrix.counts = np.cumsum(diff, axis=0, dtype=np.int32)[:days]
+        matrix.day_totals = matrix.counts.sum(axis=1, dtype=np.int32)
+
+        for i in inside:
+            booking_id = int(bookings.ids[i])
+            code = int(bookings.site_codes[i])
+            matrix._spans[booking_id] = (code, int(lo[i]), int(hi[i]))
+            matrix._label(booking_id, bookings.campsites[code], bookings.names[i], bookings.starts[i], bookings.ends[i], int(lo[i]), int(hi[i]))
+        return matrix
+
+    def day_index(self, day: Any) -> Optional[int]:
+        index = int((to_day(day) - self.first_day).astype(np.int64))
+        return index if 0 <= index < self.days else None
+
+    def is_booked(self, index: int) -> bool:
+        return self.day_totals[index] > 0
+
+    def day_labels(self, index: int) -> List[Tuple[str, str]]:
+        return list(self.labels[index].values())
+
+    def booking_ids(self, index: int) -> List[int]:
+        return list(self.labels[index])
+
+    def add(self, booking_id: int, campsite: str, start_date: Any, end_date: Any, name: str) -> None:
+        self.remove(booking_id)
+        start, end = to_day(start_date), to_day(end_date)
+        lo = max(int((start - self.first_day).astype(np.int64)), 0)
+        hi = min(int((end - self.first_day).astype(np.int64)) + 1, self.days)
+        if lo >= hi:
+            return
+        if campsite not in self.campsites:
+            self.campsites.append(campsite)
+            self.counts = np.hstack([self.counts, np.zeros((self.days, 1), dtype=np.int32)])
+        code = self.campsites.index(campsite)
+        self.counts[lo:hi, code] += 1
+        self.day_totals[lo:hi] += 1
+        self._spans[booking_id] = (code, lo, hi)
+        self._label(booking_id, campsite, name, start, end, lo, hi)
+
+    def remove(self, booking_id: int) -> None:
+        span = self._spans.pop(booking_id, None)
+        if span is None:
+            return
+        code, lo, hi = span
+        self.counts[lo:hi, code] -= 1
+        self.day_totals[lo:hi] -= 1
+        for index in range(lo, hi):
+            self.labels[index].pop(booking_id, None)
+
+    def _label(self, booking_id: int, campsite: str, name: str, start: np.datetime64, end: np.datetime64, lo: int, hi: int) -> None:
+        for index in range(lo, hi):
+            day = self.first_day + index
+            if start == day and end == day:
+                text = f"{campsite} {name} (in/out)"
+            elif start == day:
+                text = f"{campsite} {name} (in)"
+            elif end == day:
+                text = f"{campsite} {name} (out)"
+            else:
+                text = f"{campsite} {name}"
+            self.labels[index][booking_id] = (campsite, text)
+
+
+class AvailabilityMatrix:
+    # Night-by-night view of the bookings that block a campsite (everything
+    # but canceled ones) over a window. nights[d, site] counts stays covering
+    # the night of day d, arrivals[d, site] the stays that start on day d and
+    # points[d, site] zero-night (in/out) stays, so a stay of any length can
+    # be tested against the conflict rule (start < other end and end > other
+    # start) with prefix sums, for every campsite and date shift at once.
+    def __init__(self, first_day: Any, days: int, campsites: List[str]):
+        self.first_day = to_day(first_day)
+        self.days = days
+        self.campsites = list(campsites)
+        shape = (days + 1, len(self.campsites))
+        self.nights = np.zeros(shape, dtype=np.int32)
+        self.arrivals = np.zeros(shape, dtype=np.int32)
+        self.points = np.zeros(shape, dtype=np.int32)
+
+    @classmethod
+    def from_frame(cls, bookings: Any, first_day: Any, days: int, campsites: List[str]) -> 'AvailabilityMatrix':
+        matrix = cls(first_day, days, campsites)
+        blocking = bookings[(bookings['Status'] != 'Canceled') & bookings['Campsite'].isin(matrix.campsites)]
+        if blocking.empty:
+            return matrix
+        codes = np.array([matrix.campsites.index(site) for site in blocking['Campsite']], dtype=np.int64)
+        starts = (blocking['Start Date'].to_numpy(dtype='datetime64[D]') - matrix.first_day).astype(np.int64)
+        ends = (blocking['End Date'].to_numpy(dtype='datetime64[D]') - matrix.first_day).astype(np.int64)
+        lo, hi = np.clip(starts, 0, days + 1), np.clip(ends, 0, days + 1)
+
+        diff = np.zeros((days + 2, len(matrix.campsites)), dtype=np.int32)
+        np.add.at(diff, (lo, codes), 1)
+        np.add.at(diff, (hi, codes), -1)
+        matrix.nights = np.cumsum(diff, axis=0, dtype=np.int32)[:days + 1]
+        for counts, keep in ((matrix.arrivals, ends > starts), (matrix.points, ends == starts)):
+            keep &= (starts >= 0) & (starts <= days)
+            np.add.at(counts, (starts[keep], codes[keep]), 1)
+        return matrix
+
+    def free(self, offsets: np.ndarray, nights: int) -> np.ndarray:
+        # free[i, site] is True when a stay of `nights` arriving on day
+        # offsets[i] of the window clashes with nothing on that campsite.
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if nights == 0:
+            # Only a stay running through the arrival day blocks an in/out visit.
+            return self.nights[offsets] - self.arrivals[offsets] == 0
+        zero = np.zeros((1, len(self.campsites)), dtype=np.int64)
+        night_sums = np.concatenate([zero, np.cumsum(self.nights, axis=0, dtype=np.int64)])
+        point_sums = np.concatenate([zero, np.cumsum(self.points, axis=0, dtype=np.int64)])
+        busy = night_sums[offsets + nights] - night_sums[offsets]
+        # In/out visits strictly inside the stay.
+        busy += point_sums[offsets + nights] - point_sums[offsets + 1]
+        return busy == 0
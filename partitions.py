@@ -0,0 +1,469 @@
+import argparse
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from journal import BookingJournal, empty_bookings_df, rows_by_ids
+from repository import BookingRepository, CsvBookingRepository
+from search_index import BookingSearchIndex, page_tiers, rank_tiers
+
+PARTITIONS_DIR = 'bookings'
+MANIFEST_NAME = 'manifest.json'
+# Bookings on their way to another partition, one JSON line per move.
+MOVES_NAME = 'moves.journal'
+DEFAULT_PROPERTY = 'warrago'
+
+
+class ArchivedPartitionError(Exception):
+    def __init__(self, key: str):
+        super().__init__(f"Bookings in {key} are archived and can no longer be changed.")
+        self.key = key
+
+
+def partition_key(property_name: str, season: int) -> str:
+    return f"{property_name}/{season}"
+
+
+def season_of(day: Any) -> int:
+    return pd.Timestamp(day).year
+
+
+class PartitionManifest:
+    # manifest.json lists each property with its campsites, and every
+    # partition (one per property and season). A partition's ID range, last
+    # departure and size are recorded when it is archived, so queries can
+    # skip it without opening the file.
+    def __init__(self, root: str = PARTITIONS_DIR):
+        self.root = root
+        self.path = os.path.join(root, MANIFEST_NAME)
+        self.properties: Dict[str, Dict[str, int]] = {}
+        self.partitions: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, root: str = PARTITIONS_DIR) -> 'PartitionManifest':
+        manifest = cls(root)
+        with open(manifest.path, encoding='utf-8') as f:
+            data = json.load(f)
+        manifest.properties = data['properties']
+        manifest.partitions = data['partitions']
+        return manifest
+
+    def save(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'properties': self.properties, 'partitions': self.partitions}, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def property_of(self, campsite: str) -> str:
+        for property_name, campsites in self.properties.items():
+            if campsite in campsites:
+                return property_name
+        return next(iter(self.properties), DEFAULT_PROPERTY)
+
+    def add_partition(self, property_name: str, season: int) -> str:
+        key = partition_key(property_name, season)
+        if key not in self.partitions:
+            os.makedirs(os.path.join(self.root, property_name), exist_ok=True)
+            self.partitions[key] = {'property': property_name, 'season': season, 'archived': False}
+            self.save()
+        return key
+
+    def paths(self, key: str) -> Dict[str, str]:
+        base = os.path.join(self.root, key)
+        return {
+            'snapshot': base + '.csv',
+            'journal': base + '.journal',
+            'formatted': base + '_formatted.txt',
+            'archive': base + '.csv.gz'
+        }
+
+
+class PartitionedBookingRepository(BookingRepository):
+    # One CsvBookingRepository per property and season under root/, listed in
+    # manifest.json. A booking lives in the partition of its campsite's
+    # property and its arrival year. Active partitions are loaded at startup;
+    # archived ones are compressed read-only snapshots that are opened only
+    # when a month, lookup or overlap check reaches back into them. Search
+    # covers every partition: an archive that isn't open is searched through
+    # an index of just its names, phones and emails, built the first time a
+    # search needs it and kept.
+    #
+    # A booking that changes property or season is noted in moves.journal,
+    # written to its new partition and only then deleted from the old one, so
+    # a crash part way leaves two copies rather than none; load keeps the one
+    # in the partition it was moving to.
+    def __init__(self, root: str = PARTITIONS_DIR):
+        self.root = root
+        self.moves_path = os.path.join(root, MOVES_NAME)
+        self.manifest = PartitionManifest(root)
+        self.campsites: Dict[str, int] = {}
+        if os.path.exists(self.manifest.path):
+            self._read_manifest()
+        self._writer: Optional[Any] = None
+        self._open: Dict[str, CsvBookingRepository] = {}
+        self._id_partition: Dict[int, str] = {}
+        self._max_end: Dict[str, pd.Timestamp] = {}
+        self._max_id = 0
+        self._moves: Dict[int, str] = {}
+        self._archive_indexes: Dict[str, BookingSearchIndex] = {}
+
+    @property
+    def writer(self) -> Optional[Any]:
+        return self._writer
+
+    @writer.setter
+    def writer(self, writer: Optional[Any]) -> None:
+        self._writer = writer
+        for partition in self._open.values():
+            partition.writer = writer
+
+    def load(self) -> None:
+        self.close()
+        self._read_manifest()
+        self._open, self._id_partition, self._max_end = {}, {}, {}
+        self._archive_indexes = {}
+        self._max_id = max((info['max_id'] for info in self.manifest.partitions.values() if info['archived']), default=0)
+        self._moves = self._read_moves()
+        for key, info in self.manifest.partitions.items():
+            if not info['archived']:
+                self._partition(key)
+        if self._moves:
+            # Every interrupted move has been settled (the deletes are queued
+            # ahead of this).
+            self._moves = {}
+            self.persist(self._clear_moves)
+
+    def next_id(self) -> int:
+        return self._max_id + 1
+
+    def data_dir(self) -> str:
+        return self.root
+
+    def get(self, booking_id: int) -> Optional[Dict[str, Any]]:
+        key = self._locate(booking_id)
+        return self._open[key].get(booking_id) if key is not None else None
+
+    def all_bookings(self) -> pd.DataFrame:
+        return self._concat([self._partition(key).all_bookings() for key in self.manifest.partitions])
+
+    def bookings_between(self, start_date: Any, end_date: Any) -> pd.DataFrame:
+        return self._concat([self._partition(key).bookings_between(start_date, end_date)
+                             for key in self._overlapping_keys(start_date, end_date)])
+
+    def overlapping_ids(self, campsite: str, start_date: Any, end_date: Any, exclude_id: Optional[int] = None) -> List[int]:
+        ids = []
+        for key in self._overlapping_keys(start_date, end_date, self.manifest.property_of(campsite)):
+            ids.extend(self._partition(key).overlapping_ids(campsite, start_date, end_date, exclude_id))
+        return ids
+
+    def bookings_by_ids(self, ids: List[int]) -> pd.DataFrame:
+        by_partition: Dict[str, List[int]] = {}
+        for booking_id in ids:
+            key = self._locate(booking_id)
+            if key is not None:
+                by_partition.setdefault(key, []).append(booking_id)
+        if not by_partition:
+            return empty_bookings_df()
+        return rows_by_ids(self._concat([self._open[key].bookings_by_ids(keyed) for key, keyed in by_partition.items()]), ids)
+
+    def search_ids(self, text: str, limit: int = 50, offset: int = 0) -> Tuple[List[int], int]:
+        return page_tiers(self._search_tiers(text), limit, offset)
+
+    def ranked_ids(self, text: str) -> List[int]:
+        return rank_tiers(self._search_tiers(text))
+
+    def upsert(self, record: Dict[str, Any]) -> None:
+        booking_id = int(record['ID'])
+        key = self.manifest.add_partition(self.manifest.property_of(record['Campsite']), season_of(record['Start Date']))
+        self._check_writable(key)
+        previous = self._locate(booking_id)
+        moving = previous is not None and previous != key
+        if moving:
+            self._check_writable(previous)
+            self.persist(self._record_moves, {booking_id: key})
+
+        self._partition(key).upsert(record)
+        self._id_partition[booking_id] = key
+        end_date = pd.Timestamp(record['End Date'])
+        self._max_end[key] = max(self._max_end.get(key, end_date), end_date)
+        self._max_id = max(self._max_id, booking_id)
+        if moving:
+            self._open[previous].delete(booking_id)
+
+    def insert_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        # Every target partition is checked before anything is written, then
+        # each one takes its share of the batch as a single insert_many.
+        # Bookings changing partition are deleted from the old one last.
+        batches: Dict[str, List[Dict[str, Any]]] = {}
+        moves: Dict[int, Tuple[str, str]] = {}
+        for record in records:
+            key = self.manifest.add_partition(self.manifest.property_of(record['Campsite']), season_of(record['Start Date']))
+            self._check_writable(key)
+            batches.setdefault(key, []).append(record)
+            previous = self._locate(int(record['ID']))
+            if previous is not None and previous != key:
+                self._check_writable(previous)
+                moves[int(record['ID'])] = (previous, key)
+        if moves:
+            self.persist(self._record_moves, {booking_id: key for booking_id, (_, key) in moves.items()})
+        for key, batch in batches.items():
+            self._partition(key).insert_many(batch)
+            self._id_partition.update(dict.fromkeys((int(record['ID']) for record in batch), key))
+            end_date = max(pd.Timestamp(record['End Date']) for record in batch)
+            self._max_end[key] = max(self._max_end.get(key, end_date), end_date)
+            self._max_id = max(self._max_id, max(int(record['ID']) for record in batch))
+        for booking_id, (previous, _) in moves.items():
+            self._open[previous].delete(booking_id)
+        return sum(len(batch) for batch in batches.values())
+
+    def delete(self, booking_id: int) -> None:
+        key = self._locate(booking_id)
+        if key is None:
+            return
+        self._check_writable(key)
+        self._open[key].delete(booking_id)
+        del self._id_partition[booking_id]
+
+    def archive(self, property_name: str, season: int) -> int:
+        # Folds a closed season into one gzip CSV snapshot and drops its
+        # journal. From then on the season is read-only and costs nothing
+        # until something asks for it.
+        key = partition_key(property_name, season)
+        info = self.manifest.partitions[key]
+        if info['archived']:
+            return info['bookings']
+        partition = self._partition(key)
+        if self._writer is not None:
+            self._writer.flush()
+        df = partition.all_bookings()
+        paths = self.manifest.paths(key)
+
+        tmp_path = paths['archive'] + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            df.to_csv(f, index=False, compression='gzip', date_format='%Y-%m-%d')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, paths['archive'])
+
+        info.update(
+            archived=True,
+            bookings=len(df),
+            min_id=int(df['ID'].min()) if not df.empty else 0,
+            max_id=int(df['ID'].max()) if not df.empty else 0,
+            max_end=df['End Date'].max().strftime('%Y-%m-%d') if not df.empty else None
+        )
+        self.manifest.save()
+        partition.close()
+        for path in (paths['snapshot'], paths['journal'], paths['journal'] + '.compacting', paths['formatted']):
+            if os.path.exists(path):
+                os.remove(path)
+        self._close_partition(key)
+        logging.info(f"Archived {len(df)} bookings in {key}")
+        return len(df)
+
+    def close(self) -> None:
+        for partition in self._open.values():
+            partition.close()
+
+    def _read_manifest(self) -> None:
+        self.manifest = PartitionManifest.load(self.root)
+        self.campsites = {site: capacity for campsites in self.manifest.properties.values() for site, capacity in campsites.items()}
+
+    def _partition(self, key: str) -> CsvBookingRepository:
+        partition = self._open.get(key)
+        if partition is None:
+            paths = self.manifest.paths(key)
+            snapshot_path = paths['archive'] if self.manifest.partitions[key]['archived'] else paths['snapshot']
+            partition = CsvBookingRepository(BookingJournal(snapshot_path, paths['journal'], paths['formatted']))
+            partition.writer = self._writer
+            partition.load()
+            self._open[key] = partition
+            df = partition.bookings_df
+            ids = df['ID'].astype(int).tolist()
+            clashes = {booking_id: self._id_partition[booking_id] for booking_id in ids
+                       if booking_id in self._moves and self._id_partition.get(booking_id, key) != key}
+            self._id_partition.update(dict.fromkeys(ids, key))
+            for booking_id, other in clashes.items():
+                self._settle_move(booking_id, other, key)
+            if not df.empty:
+                self._max_end[key] = df['End Date'].max()
+                self._max_id = max(self._max_id, int(df['ID'].max()))
+        return partition
+
+    def _settle_move(self, booking_id: int, first: str, second: str) -> None:
+        # A move interrupted by a crash left the booking in both partitions;
+        # keep the copy in the one it was moving to.
+        keep, drop = (first, second) if self._moves[booking_id] == first else (second, first)
+        logging.warning(f"Booking {booking_id} was found in {first} and {second}; keeping the copy in {keep}")
+        self._id_partition[booking_id] = keep
+        if not self.manifest.partitions[drop]['archived']:
+            self._open[drop].delete(booking_id)
+
+    def _record_moves(self, moves: Dict[int, str]) -> None:
+        lines = ''.join(json.dumps({'id': booking_id, 'to': key}) + '\n' for booking_id, key in moves.items())
+        with open(self.moves_path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_moves(self) -> Dict[int, str]:
+        moves: Dict[int, str] = {}
+        if not os.path.exists(self.moves_path):
+            return moves
+        with open(self.moves_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    move = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping unreadable line in {self.moves_path}")
+                    continue
+                moves[int(move['id'])] = move['to']
+        return moves
+
+    def _clear_moves(self) -> None:
+        if os.path.exists(self.moves_path):
+            os.remove(self.moves_path)
+
+    def _close_partition(self, key: str) -> None:
+        self._open.pop(key, None)
+        self._max_end.pop(key, None)
+        self._id_partition = {booking_id: owner for booking_id, owner in self._id_partition.items() if owner != key}
+
+    def _locate(self, booking_id: int) -> Optional[str]:
+        key = self._id_partition.get(booking_id)
+        if key is not None:
+            return key
+        for key, info in self.manifest.partitions.items():
+            if key not in self._open and info['archived'] and info['min_id'] <= booking_id <= info['max_id']:
+                self._partition(key)
+                if booking_id in self._id_partition:
+                    return key
+        return None
+
+    def _overlapping_keys(self, start_date: Any, end_date: Any, property_name: Optional[str] = None) -> List[str]:
+        # A partition holds arrivals in its season, so it can only overlap a
+        # window that ends on or after 1 January of that season and starts no
+        # later than its last departure.
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        keys = []
+        for key, info in self.manifest.partitions.items():
+            if property_name is not None and info['property'] != property_name:
+                continue
+            if pd.Timestamp(year=info['season'], month=1, day=1) > end:
+                continue
+            if key in self._open:
+                max_end = self._max_end.get(key)
+            else:
+                max_end = pd.Timestamp(info['max_end']) if info.get('max_end') else None
+            if max_end is not None and max_end >= start:
+                keys.append(key)
+        return keys
+
+    def _search_index(self, key: str) -> BookingSearchIndex:
+        partition = self._open.get(key)
+        if partition is not None:
+            return partition.search_index
+        index = self._archive_indexes.get(key)
+        if index is None:
+            # Archives never change, so the index is built once from the
+            # columns it needs rather than by opening the whole season.
+            df = pd.read_csv(self.manifest.paths(key)['archive'], usecols=['ID', 'Name', 'Phone', 'Email'], dtype={'Phone': str})
+            index = self._archive_indexes[key] = BookingSearchIndex.from_dataframe(df)
+        return index
+
+    def _search_tiers(self, text: str) -> List[Set[int]]:
+        tiers: List[Set[int]] = []
+        for key, info in list(self.manifest.partitions.items()):
+            if key not in self._open and not info['archived']:
+                continue
+            for rank, tier in enumerate(self._search_index(key).tiers(text)):
+                if rank < len(tiers):
+                    tiers[rank] |= tier
+                else:
+                    tiers.append(set(tier))
+        return tiers
+
+    def _check_writable(self, key: str) -> None:
+        if self.manifest.partitions[key]['archived']:
+            raise ArchivedPartitionError(key)
+
+    @staticmethod
+    def _concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return empty_bookings_df()
+        return frames[0] if len(frames) == 1 else pd.concat(frames)
+
+
+def partition_csv(campsites: Dict[str, int], csv_path: str = 'bookings.csv', root: str = PARTITIONS_DIR,
+                  property_name: str = DEFAULT_PROPERTY, archive_before: Optional[int] = None) -> int:
+    # Splits a single bookings.csv (plus its journal) into per-season
+    # partitions of one property, then archives every season before
+    # archive_before.
+    source = CsvBookingRepository(BookingJournal(snapshot_path=csv_path, journal_path=os.path.splitext(csv_path)[0] + '.journal'))
+    source.load()
+    df = source.all_bookings()
+    source.close()
+
+    manifest = PartitionManifest(root)
+    manifest.properties[property_name] = dict(campsites)
+    for season, season_df in df.groupby(df['Start Date'].dt.year):
+        key = manifest.add_partition(property_name, int(season))
+        season_df.to_csv(manifest.paths(key)['snapshot'], index=False, date_format='%Y-%m-%d')
+    manifest.save()
+
+    if archive_before is not None:
+        target = PartitionedBookingRepository(root)
+        target.load()
+        for key, info in list(target.manifest.partitions.items()):
+            if info['season'] < archive_before:
+                target.archive(info['property'], info['season'])
+        target.close()
+    logging.info(f"Partitioned {len(df)} bookings from {csv_path} into {root}")
+    return len(df)
+
+
+def add_property(name: str, campsites: Dict[str, int], root: str = PARTITIONS_DIR) -> None:
+    manifest = PartitionManifest.load(root) if os.path.exists(os.path.join(root, MANIFEST_NAME)) else PartitionManifest(root)
+    taken = {site for property_name, sites in manifest.properties.items() if property_name != name for site in sites}
+    if taken & set(campsites):
+        raise ValueError(f"Campsites already belong to another property: {', '.join(sorted(taken & set(campsites)))}")
+    manifest.properties[name] = dict(campsites)
+    manifest.save()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the partitioned (per property and season) booking store.")
+    parser.add_argument('--root', default=PARTITIONS_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    split = commands.add_parser('split', help="Partition bookings.csv by season.")
+    split.add_argument('csv_path', nargs='?', default='bookings.csv')
+    split.add_argument('--property', default=DEFAULT_PROPERTY)
+    split.add_argument('--archive-before', type=int, help="Archive every season before this year.")
+    archive = commands.add_parser('archive', help="Archive one closed season.")
+    archive.add_argument('season', type=int)
+    archive.add_argument('--property', default=DEFAULT_PROPERTY)
+    add = commands.add_parser('add-property', help="Add a property from a CSV of campsite,capacity rows.")
+    add.add_argument('name')
+    add.add_argument('campsites_csv')
+    args = parser.parse_args()
+
+    if args.command == 'split':
+        from booking_engine import CAMPSITES
+        count = partition_csv(CAMPSITES, args.csv_path, args.root, args.property, args.archive_before)
+        print(f"Partitioned {count} bookings into {args.root}")
+    elif args.command == 'archive':
+        repository = PartitionedBookingRepository(args.root)
+        repository.load()
+        print(f"Archived {repository.archive(args.property, args.season)} bookings")
+        repository.close()
+    else:
+        sites = pd.read_csv(args.campsites_csv, header=None, names=['campsite', 'capacity'])
+        add_property(args.name, dict(zip(sites['campsite'].astype(str), sites['capacity'].astype(int))), args.root)
+        print(f"Added property {args.name} with {len(sites)} campsites")
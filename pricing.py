@@ -0,0 +1,142 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from extras import PriceCatalogue
+
+SITE_RATES = 'site_rates.csv'
+SEASONAL_RATES = 'seasonal_rates.csv'
+SITE_RATE_COLUMNS = ['Campsite', 'Nightly Fee']
+SEASON_COLUMNS = ['Season', 'From', 'To', 'Multiplier']
+PRICE_COLUMNS = ['ID', 'Nights', 'Site Fees', 'Extras', 'Total']
+
+# (name, first day 'MM-DD', last day 'MM-DD', multiplier). A season may wrap
+# the new year ('12-20' to '01-31'); days in no season are charged at 1x.
+Season = Tuple[str, str, str, float]
+
+
+class Quote:
+    def __init__(self, nights: int, site_fees: float, extras: int):
+        self.nights = nights
+        self.site_fees = site_fees
+        self.extras = extras
+        self.total = site_fees + extras
+
+
+def _month_days(days: np.ndarray) -> np.ndarray:
+    # month * 32 + day for each datetime64[D], the key of the seasonal table.
+    months = days.astype('datetime64[M]')
+    return (months.astype(np.int64) % 12 + 1) * 32 + (days - months.astype('datetime64[D]')).astype(np.int64) + 1
+
+
+class PricingEngine:
+    # Prices whole arrays of bookings in one pass: site fees are each site's
+    # nightly fee times the seasonal multiplier of every night stayed (a
+    # prefix sum over the nightly multipliers, so a stay costs two lookups),
+    # and extras go through PriceCatalogue.amounts with a bincount per
+    # booking. Quoting one booking is the same code on arrays of one.
+    def __init__(self, catalogue: Optional[PriceCatalogue] = None, site_fees: Optional[Dict[str, float]] = None,
+                 seasons: Optional[List[Season]] = None):
+        self.catalogue = catalogue if catalogue is not None else PriceCatalogue()
+        self.site_fees = dict(site_fees or {})
+        self.seasons = list(seasons or [])
+        self._rates = np.ones(13 * 32)
+        for _, first, last, multiplier in self.seasons:
+            self._rates[self._season_keys(first, last)] = multiplier
+
+    @classmethod
+    def load(cls, catalogue: Optional[PriceCatalogue] = None, sites_path: str = SITE_RATES,
+             seasons_path: str = SEASONAL_RATES) -> 'PricingEngine':
+        site_fees: Dict[str, float] = {}
+        seasons: List[Season] = []
+        try:
+            if os.path.exists(sites_path):
+                df = pd.read_csv(sites_path, dtype={'Campsite': str})
+                site_fees = dict(zip(df['Campsite'], df['Nightly Fee'].astype(float)))
+            if os.path.exists(seasons_path):
+                df = pd.read_csv(seasons_path, dtype=str)
+                seasons = [(name, first, last, float(multiplier)) for name, first, last, multiplier in df[SEASON_COLUMNS].itertuples(index=False)]
+        except Exception as e:
+            logging.error(f"Error reading the rate tables, charging no site fees: {e}")
+            site_fees, seasons = {}, []
+        return cls(catalogue, site_fees, seasons)
+
+    def save(self, sites_path: str = SITE_RATES, seasons_path: str = SEASONAL_RATES) -> None:
+        pd.DataFrame(list(self.site_fees.items()), columns=SITE_RATE_COLUMNS).to_csv(sites_path, index=False)
+        pd.DataFrame(self.seasons, columns=SEASON_COLUMNS).to_csv(seasons_path, index=False)
+
+    @staticmethod
+    def _season_keys(first: str, last: str) -> np.ndarray:
+        # Every month*32+day key from first to last inclusive, through a leap
+        # year so 29 February belongs to whichever season spans it.
+        start, end = pd.Timestamp(f"2000-{first}"), pd.Timestamp(f"2000-{last}")
+        if end < start:
+            start -= pd.DateOffset(years=1)
+        return _month_days(np.arange(start.to_datetime64().astype('datetime64[D]'), end.to_datetime64().astype('datetime64[D]') + 1))
+
+    def nightly_rates(self, first_day: Any, days: int) -> np.ndarray:
+        start = np.datetime64(pd.Timestamp(first_day).date(), 'D')
+        return self._rates[_month_days(start + np.arange(days))]
+
+    def site_fees_for(self, campsites: Sequence[str], starts: Any, ends: Any) -> np.ndarray:
+        starts = pd.to_datetime(pd.Series(starts)).to_numpy(dtype='datetime64[D]')
+        ends = np.maximum(pd.to_datetime(pd.Series(ends)).to_numpy(dtype='datetime64[D]'), starts)
+        fees = np.array([self.site_fees.get(str(site), 0.0) for site in campsites], dtype=np.float64)
+        if not len(starts) or not fees.any():
+            return np.zeros(len(starts))
+        first = starts.min()
+        prefix = np.concatenate([[0.0], np.cumsum(self.nightly_rates(first, int((ends.max() - first).astype(np.int64))))])
+        nights = prefix[(ends - first).astype(np.int64)] - prefix[(starts - first).astype(np.int64)]
+        return np.round(fees * nights, 2)
+
+    def extras_for(self, count: int, people: Any, booking_index: Any, items: Sequence[str], quantities: Any) -> np.ndarray:
+        # Total extras per booking; line i belongs to booking booking_index[i].
+        booking_index = np.asarray(booking_index, dtype=np.int64)
+        if not len(booking_index):
+            return np.zeros(count, dtype=np.int64)
+        amounts = self.catalogue.amounts(items, quantities, np.asarray(people, dtype=np.int64)[booking_index])
+        return np.bincount(booking_index, weights=amounts, minlength=count).astype(np.int64)
+
+    def price(self, bookings: pd.DataFrame, lines: pd.DataFrame) -> pd.DataFrame:
+        # bookings has the booking columns; lines has the extras ledger
+        # columns (Booking ID, Item, Quantity, ...). Extras are charged at
+        # today's catalogue prices, whatever the ledger recorded.
+        ids = bookings['ID'].astype(np.int64).to_numpy()
+        people = pd.to_numeric(bookings['People'], errors='coerce').fillna(0).to_numpy(dtype=np.int64, copy=True)
+        starts = pd.to_datetime(bookings['Start Date']).to_numpy(dtype='datetime64[D]')
+        ends = pd.to_datetime(bookings['End Date']).to_numpy(dtype='datetime64[D]')
+        # A group's extras sit on its first booking but are priced for the
+        # whole party (every booking with its Group ID), as when it was booked.
+        groups = pd.to_numeric(bookings['Group ID'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+        grouped = groups > 0
+        if grouped.any():
+            people[grouped] = pd.Series(people[grouped]).groupby(groups[grouped]).transform('sum').to_numpy()
+        position = pd.Series(np.arange(len(ids)), index=ids)
+        lines = lines[lines['Booking ID'].isin(position.index)]
+        extras = self.extras_for(len(ids), people, position[lines['Booking ID']].to_numpy(), lines['Item'].tolist(),
+                                 lines['Quantity'].to_numpy())
+        site_fees = self.site_fees_for(bookings['Campsite'].astype(str).tolist(), starts, ends)
+        return pd.DataFrame({
+            'ID': ids,
+            'Nights': np.maximum((ends - starts).astype(np.int64), 0),
+            'Site Fees': site_fees,
+            'Extras': extras,
+            'Total': site_fees + extras
+        }, columns=PRICE_COLUMNS)
+
+    def quote(self, campsite: Optional[str], start_date: Any, end_date: Any, people: int,
+              extras: Dict[str, int], booleans: Dict[str, bool]) -> Quote:
+        # The booking form's quote. Without a campsite and dates only the
+        # extras are priced.
+        lines = [(item, int(quantity)) for item, quantity in extras.items() if quantity]
+        lines += [(item, 1) for item, ticked in booleans.items() if ticked]
+        extras_cost = int(self.extras_for(1, [people], [0] * len(lines), [item for item, _ in lines],
+                                          [quantity for _, quantity in lines])[0])
+        if not campsite or start_date is None or end_date is None:
+            return Quote(0, 0.0, extras_cost)
+        nights = max((pd.Timestamp(end_date).normalize() - pd.Timestamp(start_date).normalize()).days, 0)
+        site_fees = float(self.site_fees_for([campsite], [start_date], [end_date])[0])
+        return Quote(nights, site_fees, extras_cost)
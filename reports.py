@@ -0,0 +1,201 @@
+import argparse
+import csv
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+import pandas as pd
+
+from app_logging import configure_logging, stop_logging
+from booking_engine import BookingEngine, BookingValidationError
+from booking_view import BookingTable
+from instrumentation import timed
+
+REPORT_COLUMNS = ["Start Date", "Campsite", "Name", "Phone", "Email", "People", "Nights", "Extras", "Extras Paid"]
+REPORT_FORMATTERS: Dict[str, Callable[[Mapping[str, Any]], Any]] = {
+    'Nights': lambda row: (row['End Date'] - row['Start Date']).days,
+    'Extras Paid': lambda row: 'y' if row['Extras Paid'] else 'n'
+}
+# Rows pulled out of the bookings per step; the most a report holds at once.
+REPORT_BATCH = 500
+# Relative widths of the PDF columns, in REPORT_COLUMNS order.
+PDF_WIDTHS = [7, 5, 14, 10, 18, 4, 4, 30, 4]
+PDF_FONT_SIZE = 8
+# Widest Helvetica glyph ('@'), as a fraction of the font size.
+PDF_MAX_GLYPH_WIDTH = 1.015
+
+
+def report_rows(table: BookingTable, batch: int = REPORT_BATCH) -> Iterator[Mapping[str, Any]]:
+    # The table's rows in its current order, read from the backing frame a
+    # batch at a time.
+    for start in range(0, len(table), batch):
+        yield from table.page(start, start + batch)
+
+
+def report_values(row: Mapping[str, Any], columns: List[str], date_format: str) -> List[Any]:
+    values = []
+    for column in columns:
+        value = REPORT_FORMATTERS[column](row) if column in REPORT_FORMATTERS else row[column]
+        if isinstance(value, (pd.Timestamp, datetime)):
+            value = value.strftime(date_format)
+        values.append(value)
+    return values
+
+
+class ReportSink:
+    # Where report rows go: open() with the headings, write() once per row,
+    # close() to finish. Sinks write as they go and keep no rows.
+    date_format = '%d/%m/%y'
+
+    def open(self, columns: List[str]) -> None:
+        ...
+
+    def write(self, values: List[Any]) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class CsvReportSink(ReportSink):
+    date_format = '%Y-%m-%d'
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._writer = None
+
+    def open(self, columns: List[str]) -> None:
+        self._file = open(self.path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, values: List[Any]) -> None:
+        self._writer.writerow(values)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PdfReportSink(ReportSink):
+    # Landscape A4 drawn line by line on a reportlab canvas; each page is
+    # finished (showPage) as soon as it's full. The canvas keeps finished
+    # pages, compressed, until save(), so unlike CSV a PDF's memory grows
+    # with its page count (about 1 MB per 1,000 rows).
+    def __init__(self, path: str, title: str = "Booking Report"):
+        self.path = path
+        self.title = title
+        self._canvas = None
+
+    def open(self, columns: List[str]) -> None:
+        try:
+            from reportlab.lib.pagesizes import A4, landscape
+            from reportlab.pdfbase.pdfmetrics import stringWidth
+            from reportlab.pdfgen.canvas import Canvas
+        except ImportError:
+            raise BookingValidationError("Report Error", "Writing PDF reports needs reportlab installed (pip install reportlab).")
+        self._string_width = stringWidth
+        self.page_width, self.page_height = landscape(A4)
+        self.margin = 36
+        self.line_height = PDF_FONT_SIZE * 1.5
+        usable = self.page_width - 2 * self.margin
+        widths = PDF_WIDTHS if len(PDF_WIDTHS) == len(columns) else [1] * len(columns)
+        self.widths = [usable * width / sum(widths) for width in widths]
+        self.columns = columns
+        self.page = 0
+        self._canvas = Canvas(self.path, pagesize=(self.page_width, self.page_height))
+        self._canvas.setTitle(self.title)
+        self._start_page()
+
+    def _start_page(self) -> None:
+        self.page += 1
+        self.y = self.page_height - self.margin
+        self._canvas.setFont('Helvetica-Bold', PDF_FONT_SIZE + 4)
+        self._canvas.drawString(self.margin, self.y, self.title)
+        self._canvas.setFont('Helvetica', PDF_FONT_SIZE)
+        self._canvas.drawRightString(self.page_width - self.margin, self.y, f"Page {self.page}")
+        self.y -= self.line_height * 2
+        self._line(self.columns, 'Helvetica-Bold')
+        self._canvas.line(self.margin, self.y + self.line_height - 2, self.page_width - self.margin, self.y + self.line_height - 2)
+
+    def _line(self, values: List[Any], font: str = 'Helvetica') -> None:
+        self._canvas.setFont(font, PDF_FONT_SIZE)
+        x = self.margin
+        for value, width in zip(values, self.widths):
+            self._canvas.drawString(x, self.y, self._fit(str(value), width - 4, font))
+            x += width
+        self.y -= self.line_height
+
+    def _fit(self, text: str, width: float, font: str) -> str:
+        # No Helvetica glyph is wider than PDF_MAX_GLYPH_WIDTH of the font
+        # size, so short text skips the measuring.
+        if len(text) * PDF_FONT_SIZE * PDF_MAX_GLYPH_WIDTH <= width or self._string_width(text, font, PDF_FONT_SIZE) <= width:
+            return text
+        while text and self._string_width(text + '…', font, PDF_FONT_SIZE) > width:
+            text = text[:-1]
+        return text + '…'
+
+    def write(self, values: List[Any]) -> None:
+        if self.y < self.margin:
+            self._canvas.showPage()
+            self._start_page()
+        self._line(values)
+
+    def close(self) -> None:
+        if self._canvas is not None:
+            self._canvas.save()
+            self._canvas = None
+
+
+def report_sink(path: str, title: str = "Booking Report") -> ReportSink:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        return PdfReportSink(path, title)
+    if extension == '.csv':
+        return CsvReportSink(path)
+    raise BookingValidationError("Report Error", "Reports can be saved as .csv or .pdf files.")
+
+
+@timed('write_report')
+def write_report(table: BookingTable, sink: ReportSink, columns: Optional[List[str]] = None) -> int:
+    # Streams the table through the sink and returns the number of rows
+    # written.
+    columns = columns or REPORT_COLUMNS
+    written = 0
+    sink.open(columns)
+    try:
+        for row in report_rows(table):
+            sink.write(report_values(row, columns, sink.date_format))
+            written += 1
+    finally:
+        sink.close()
+    return written
+
+
+def report_title(start_date: Any, end_date: Any) -> str:
+    return f"Booking Report {pd.Timestamp(start_date):%d/%m/%Y} - {pd.Timestamp(end_date):%d/%m/%Y}"
+
+
+def export_report(engine: BookingEngine, start_date: Any, end_date: Any, path: str) -> int:
+    table = engine.report_table(start_date, end_date)
+    table.sort('Start Date')
+    return write_report(table, report_sink(path, report_title(start_date, end_date)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the bookings report for a date range to a CSV or PDF file.")
+    parser.add_argument('start', help="First day (YYYY-MM-DD).")
+    parser.add_argument('end', help="Last day (YYYY-MM-DD).")
+    parser.add_argument('path', help="Output file, .csv or .pdf.")
+    args = parser.parse_args()
+    configure_logging()
+    engine = BookingEngine()
+    engine.load()
+    try:
+        count = export_report(engine, pd.Timestamp(args.start), pd.Timestamp(args.end), args.path)
+    finally:
+        engine.close()
+        stop_logging()
+    print(f"Wrote {count} bookings to {args.path}")
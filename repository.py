@@ -0,0 +1,399 @@
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from booking_view import BookingColumns
+from interval_index import CampsiteIntervalIndex
+from instrumentation import timed
+from journal import BOOKING_COLUMNS, DATE_COLUMNS, BookingJournal, empty_bookings_df, encode_record, index_by_id, replay, rows_by_ids
+from search_index import BookingSearchIndex
+
+BOOKINGS_DB = 'bookings.db'
+
+
+class BookingRepository(ABC):
+    # Optional IOWorker. Mutations are applied to what readers see straight
+    # away; making them durable is queued on the writer in submission order.
+    writer: Optional[Any] = None
+    search_index: BookingSearchIndex
+    # Campsites (and capacities) the store itself defines, if any.
+    campsites: Optional[Dict[str, int]] = None
+
+    @abstractmethod
+    def load(self) -> None:
+        ...
+
+    @abstractmethod
+    def next_id(self) -> int:
+        ...
+
+    @abstractmethod
+    def get(self, booking_id: int) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def all_bookings(self) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def bookings_between(self, start_date: Any, end_date: Any) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def overlapping_ids(self, campsite: str, start_date: Any, end_date: Any, exclude_id: Optional[int] = None) -> List[int]:
+        ...
+
+    @abstractmethod
+    def bookings_by_ids(self, ids: List[int]) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def upsert(self, record: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, booking_id: int) -> None:
+        ...
+
+    def insert_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        for record in records:
+            self.upsert(record)
+            count += 1
+        return count
+
+    def bookings_on(self, day: Any) -> pd.DataFrame:
+        return self.bookings_between(day, day)
+
+    def search_ids(self, text: str, limit: int = 50, offset: int = 0) -> Tuple[List[int], int]:
+        return self.search_index.search(text, limit, offset)
+
+    def ranked_ids(self, text: str) -> List[int]:
+        return self.search_index.ranked_ids(text)
+
+    def search_text(self, text: str) -> pd.DataFrame:
+        return self.bookings_by_ids(self.ranked_ids(text))
+
+    def columns_between(self, start_date: Any, end_date: Any, campsites: Iterable[str] = ()) -> BookingColumns:
+        return BookingColumns.from_frame(self.bookings_between(start_date, end_date), campsites)
+
+    def all_columns(self, campsites: Iterable[str] = ()) -> BookingColumns:
+        return BookingColumns.from_frame(self.all_bookings(), campsites)
+
+    def is_site_booked(self, campsite: str, start_date: Any, end_date: Any, exclude_id: Optional[int] = None) -> bool:
+        return bool(self.overlapping_ids(campsite, start_date, end_date, exclude_id))
+
+    def data_dir(self) -> str:
+        # Where the store keeps its files; the extras ledger and price tables
+        # are kept alongside.
+        return '.'
+
+    def persist(self, fn: Any, *args: Any) -> None:
+        if self.writer is None:
+            fn(*args)
+        else:
+            self.writer.submit(fn, *args)
+
+    def close(self) -> None:
+        pass
+
+
+class CsvBookingRepository(BookingRepository):
+    # bookings.csv snapshot plus journal, held in memory as one DataFrame
+    # indexed by ID with a CampsiteIntervalIndex for overlap checks.
+    def __init__(self, journal: Optional[BookingJournal] = None):
+        self.journal = journal or BookingJournal()
+        self.bookings_df = empty_bookings_df()
+        self.site_index = CampsiteIntervalIndex()
+        self.search_index = BookingSearchIndex()
+        self._columns: Optional[BookingColumns] = None
+        self._read_only = False
+
+    def load(self) -> None:
+        self.bookings_df = self.journal.load()
+        self._read_only = self.journal.mapped
+        self.site_index = CampsiteIntervalIndex.from_dataframe(self.bookings_df)
+        self.search_index = BookingSearchIndex.from_dataframe(self.bookings_df)
+        self._columns = None
+
+    def next_id(self) -> int:
+        return int(self.bookings_df['ID'].max()) + 1 if not self.bookings_df.empty else 1
+
+    def data_dir(self) -> str:
+        return os.path.dirname(self.journal.snapshot_path) or '.'
+
+    def get(self, booking_id: int) -> Optional[Dict[str, Any]]:
+        if booking_id not in self.bookings_df.index:
+            return None
+        return self.bookings_df.loc[booking_id].to_dict()
+
+    def all_bookings(self) -> pd.DataFrame:
+        return self.bookings_df
+
+    def bookings_between(self, start_date: Any, end_date: Any) -> pd.DataFrame:
+        df = self.bookings_df
+        return df[(df['Start Date'] <= pd.Timestamp(end_date)) & (df['End Date'] >= pd.Timestamp(start_date))]
+
+    def columns_between(self, start_date: Any, end_date: Any, campsites: Iterable[str] = ()) -> BookingColumns:
+        return self.all_columns(campsites).between(start_date, end_date)
+
+    def all_columns(self, campsites: Iterable[str] = ()) -> BookingColumns:
+        # The full-history arrays are rebuilt only after a mutation; month
+        # navigation and the All Bookings table in between just slice them.
+        campsites = list(campsites)
+        if self._columns is None or self._columns.campsites[:len(campsites)] != campsites:
+            self._columns = BookingColumns.from_frame(self.bookings_df, campsites)
+        return self._columns
+
+    def overlapping_ids(self, campsite: str, start_date: Any, end_date: Any, exclude_id: Optional[int] = None) -> List[int]:
+        return self.site_index.conflicting_ids(campsite, start_date, end_date, exclude_id)
+
+    def bookings_by_ids(self, ids: List[int]) -> pd.DataFrame:
+        return rows_by_ids(self.bookings_df, ids) if ids else empty_bookings_df()
+
+    def upsert(self, record: Dict[str, Any]) -> None:
+        if self._read_only:
+            # Loaded zero-copy from bookings.arrow: the first in-place
+            # change takes a private copy of the columns.
+            self.bookings_df = self.bookings_df.copy()
+            self._read_only = False
+        self.bookings_df.loc[int(record['ID'])] = pd.Series(record)
+        self._columns = None
+        self.site_index.add_interval(int(record['ID']), record['Campsite'], record['Start Date'], record['End Date'], record['Status'])
+        self.search_index.add(record)
+        self.persist(self.journal.append, 'upsert', record)
+
+    def insert_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        # A batch is one DataFrame concat and one journal write.
+        records = list(records)
+        if not records:
+            return 0
+        self.bookings_df = replay(self.bookings_df, [('upsert', record) for record in records])
+        self._columns = None
+        for record in records:
+            self.site_index.add_interval(int(record['ID']), record['Campsite'], record['Start Date'], record['End Date'], record['Status'])
+        self.search_index.add_many(records)
+        self.persist(self.journal.append_many, 'upsert', records)
+        return len(records)
+
+    def delete(self, booking_id: int) -> None:
+        self.bookings_df = self.bookings_df.drop(index=booking_id, errors='ignore')
+        self._columns = None
+        self.site_index.remove(booking_id)
+        self.search_index.remove(booking_id)
+        self.persist(self.journal.append, 'delete', {'ID': booking_id})
+
+    def close(self) -> None:
+        self.journal.close()
+
+
+class SqliteBookingRepository(BookingRepository):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bookings (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            phone TEXT,
+            email TEXT,
+            campsite TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            people INTEGER,
+            status TEXT,
+            extras TEXT,
+            extras_paid INTEGER,
+            kayaks INTEGER,
+            kayaks_count INTEGER,
+            is_group_booking INTEGER,
+            group_id INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_bookings_site_dates ON bookings (campsite, start_date, end_date);
+        CREATE INDEX IF NOT EXISTS idx_bookings_dates ON bookings (start_date, end_date);
+        DROP INDEX IF EXISTS idx_bookings_name;
+    """
+    COLUMNS = [
+        'id', 'name', 'phone', 'email', 'campsite', 'start_date', 'end_date',
+        'people', 'status', 'extras', 'extras_paid', 'kayaks', 'kayaks_count', 'is_group_booking', 'group_id'
+    ]
+
+    def __init__(self, path: str = BOOKINGS_DB):
+        self.path = path
+        # Writes run on this connection uncommitted, so reads see them at once;
+        # the commit is what gets queued on the writer thread.
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        if 'group_id' not in [row[1] for row in self.conn.execute("PRAGMA table_info(bookings)")]:
+            # Databases from before group bookings were linked.
+            self.conn.execute("ALTER TABLE bookings ADD COLUMN group_id INTEGER NOT NULL DEFAULT 0")
+            self.conn.commit()
+        self._lock = threading.RLock()
+        self._max_span = 0
+        self._loaded = False
+        self.search_index = BookingSearchIndex()
+
+    def load(self) -> None:
+        # Every date-range query is bounded below by start_date > start - longest
+        # stay, which keeps month loads and overlap checks on an index range.
+        self._max_span = int(self._fetchone("SELECT MAX(julianday(end_date) - julianday(start_date)) FROM bookings")[0] or 0)
+        with self._lock:
+            rows = self.conn.execute("SELECT id, name, phone, email FROM bookings").fetchall()
+        self.search_index = BookingSearchIndex.from_dataframe(pd.DataFrame(rows, columns=['ID', 'Name', 'Phone', 'Email']))
+        self._loaded = True
+
+    def next_id(self) -> int:
+        return (self._fetchone("SELECT MAX(id) FROM bookings")[0] or 0) + 1
+
+    def data_dir(self) -> str:
+        return os.path.dirname(self.path) or '.'
+
+    def get(self, booking_id: int) -> Optional[Dict[str, Any]]:
+        df = self._query("WHERE id = ?", (booking_id,))
+        return None if df.empty else df.iloc[0].to_dict()
+
+    def all_bookings(self) -> pd.DataFrame:
+        return self._query("ORDER BY id")
+
+    def bookings_between(self, start_date: Any, end_date: Any) -> pd.DataFrame:
+        start, end = _iso(start_date), _iso(end_date)
+        return self._query(
+            "WHERE start_date >= ? AND start_date <= ? AND end_date >= ?",
+            (self._earliest_start(start_date), end, start)
+        )
+
+    def overlapping_ids(self, campsite: str, start_date: Any, end_date: Any, exclude_id: Optional[int] = None) -> List[int]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id FROM bookings "
+                "WHERE campsite = ? AND start_date >= ? AND start_date < ? AND end_date > ? "
+                "AND status != 'Canceled' AND id IS NOT ?",
+                (campsite, self._earliest_start(start_date), _iso(end_date), _iso(start_date), exclude_id)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def bookings_by_ids(self, ids: List[int]) -> pd.DataFrame:
+        if not ids:
+            return empty_bookings_df()
+        frames = [
+            self._query(f"WHERE id IN ({', '.join('?' * len(chunk))})", tuple(chunk))
+            for chunk in (ids[i:i + 500] for i in range(0, len(ids), 500))
+        ]
+        return rows_by_ids(index_by_id(pd.concat(frames)), ids)
+
+    def upsert(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._insert([record])
+        self._max_span = max(self._max_span, (pd.Timestamp(record['End Date']) - pd.Timestamp(record['Start Date'])).days)
+        self.search_index.add(record)
+        self.persist(self.commit)
+
+    def insert_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        # One transaction for the batch. A loaded store is updated in place;
+        # an unloaded one (migration, benchmark setup) picks it all up on load.
+        records = list(records)
+        with self._lock:
+            count = self._insert(records)
+        if self._loaded:
+            for record in records:
+                self._max_span = max(self._max_span, (pd.Timestamp(record['End Date']) - pd.Timestamp(record['Start Date'])).days)
+            self.search_index.add_many(records)
+            self.persist(self.commit)
+        else:
+            self.commit()
+        return count
+
+    def delete(self, booking_id: int) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM bookings WHERE id = ?", (booking_id,))
+        self.search_index.remove(booking_id)
+        self.persist(self.commit)
+
+    @timed('save_bookings')
+    def commit(self) -> None:
+        with self._lock:
+            self.conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def _fetchone(self, sql: str, params: tuple = ()) -> tuple:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def _earliest_start(self, start_date: Any) -> str:
+        return _iso(pd.Timestamp(start_date) - timedelta(days=self._max_span))
+
+    def _insert(self, records: Iterable[Dict[str, Any]]) -> int:
+        rows = [self._row(record) for record in records]
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO bookings ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+            rows
+        )
+        return len(rows)
+
+    def _row(self, record: Dict[str, Any]) -> tuple:
+        record = encode_record(record)
+        row = []
+        for column in BOOKING_COLUMNS:
+            value = record.get(column)
+            if column in DATE_COLUMNS:
+                value = _iso(value)
+            elif column in ('Extras Paid', 'Kayaks', 'Is Group Booking'):
+                value = int(bool(value))
+            elif column == 'Group ID':
+                value = int(value or 0)
+            row.append(value)
+        return tuple(row)
+
+    def _query(self, clause: str, params: tuple = ()) -> pd.DataFrame:
+        with self._lock:
+            rows = self.conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM bookings {clause}", params).fetchall()
+        if not rows:
+            return empty_bookings_df()
+        df = pd.DataFrame(rows, columns=BOOKING_COLUMNS)
+        for col in DATE_COLUMNS:
+            df[col] = pd.to_datetime(df[col])
+        for col in ('Extras Paid', 'Kayaks', 'Is Group Booking'):
+            df[col] = df[col].astype(bool)
+        return df
+
+
+def _iso(value: Any) -> str:
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def open_repository(db_path: str = BOOKINGS_DB, partitions_dir: str = 'bookings') -> BookingRepository:
+    if os.path.exists(db_path):
+        return SqliteBookingRepository(db_path)
+    if os.path.exists(os.path.join(partitions_dir, 'manifest.json')):
+        from partitions import PartitionedBookingRepository
+        return PartitionedBookingRepository(partitions_dir)
+    return CsvBookingRepository()
+
+
+def migrate_csv_to_sqlite(csv_path: str = 'bookings.csv', db_path: str = BOOKINGS_DB) -> int:
+    source = CsvBookingRepository(BookingJournal(snapshot_path=csv_path, journal_path=os.path.splitext(csv_path)[0] + '.journal'))
+    source.load()
+    target = SqliteBookingRepository(db_path)
+    try:
+        count = target.insert_many(source.all_bookings().to_dict('records'))
+    finally:
+        target.close()
+        source.close()
+    logging.info(f"Migrated {count} bookings from {csv_path} to {db_path}")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import bookings.csv (and its journal) into a SQLite booking database.")
+    parser.add_argument('csv_path', nargs='?', default='bookings.csv')
+    parser.add_argument('db_path', nargs='?', default=BOOKINGS_DB)
+    args = parser.parse_args()
+    print(f"Migrated {migrate_csv_to_sqlite(args.csv_path, args.db_path)} bookings into {args.db_path}")
@@ -0,0 +1,208 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+PHONE_QUERY = re.compile(r'[\d\s()+-]*\d[\d\s()+-]*')
+
+
+def normalize(value: Any) -> str:
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return ' '.join(str(value).lower().split())
+
+
+def phone_digits(value: Any) -> str:
+    return re.sub(r'\D', '', normalize(value))
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def trigram_postings(texts: List[str], ids: List[int], chunk: int = 100000) -> Dict[str, Set[int]]:
+    # Bulk version of trigrams() for a whole table: each text becomes a row
+    # of code points, every window of three is packed into one int64, and
+    # the (gram, id) pairs are grouped with a single sort per chunk.
+    postings: Dict[str, Set[int]] = defaultdict(set)
+    for start in range(0, len(texts), chunk):
+        points = np.array(texts[start:start + chunk], dtype=str)
+        if points.itemsize < 12:
+            continue
+        points = points.view(np.uint32).reshape(len(points), -1).astype(np.int64)
+        codes = (points[:, :-2] << 42) | (points[:, 1:-1] << 21) | points[:, 2:]
+        row_ids = np.broadcast_to(np.asarray(ids[start:start + chunk], dtype=np.int64)[:, None], codes.shape)
+        valid = points[:, 2:] != 0
+        codes, row_ids = codes[valid], row_ids[valid]
+        order = np.argsort(codes)
+        codes, row_ids = codes[order], row_ids[order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        for code, group in zip(codes[np.r_[0, bounds]].tolist(), np.split(row_ids, bounds)):
+            postings[chr(code >> 42) + chr((code >> 21) & 0x1FFFFF) + chr(code & 0x1FFFFF)].update(group.tolist())
+    return postings
+
+
+def page_tiers(tiers: List[Set[int]], limit: int, offset: int) -> Tuple[List[int], int]:
+    # Only the tiers the page touches are ordered, and only as far as needed.
+    page, skip = [], offset
+    for tier in tiers:
+        if len(page) >= limit:
+            break
+        if skip >= len(tier):
+            skip -= len(tier)
+            continue
+        page.extend(heapq.nlargest(skip + limit - len(page), tier)[skip:])
+        skip = 0
+    return page, sum(len(tier) for tier in tiers)
+
+
+def rank_tiers(tiers: List[Set[int]]) -> List[int]:
+    return [booking_id for tier in tiers for booking_id in sorted(tier, reverse=True)]
+
+
+class BookingSearchIndex:
+    # Full-history lookup over name, phone and email. Substring queries go
+    # through trigram postings (candidate IDs are the intersection of each
+    # query trigram's set, checked against the stored text); type-ahead goes
+    # through a sorted token table searched with bisect. Results are ranked
+    # exact token match, then token prefix, then substring, newest booking
+    # first within each tier, and only the requested page is sorted. The
+    # lock lets the search window query from a worker thread while the Tk
+    # thread adds and removes bookings.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._text: Dict[int, str] = {}
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+        self._tokens: List[str] = []
+        self._token_ids: List[int] = []
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'BookingSearchIndex':
+        index = cls()
+        entries = []
+        for booking_id, name, phone, email in zip(*(df[col].tolist() for col in ['ID', 'Name', 'Phone', 'Email'])):
+            text = index._text[booking_id] = index._join(name, phone, email)
+            entries.extend(index._entries(booking_id, text))
+        index._grams = trigram_postings(list(index._text.values()), list(index._text))
+        entries.sort()
+        index._tokens = [token for token, _ in entries]
+        index._token_ids = [booking_id for _, booking_id in entries]
+        return index
+
+    def __len__(self) -> int:
+        return len(self._text)
+
+    def __contains__(self, booking_id: int) -> bool:
+        return booking_id in self._text
+
+    def add(self, booking: Dict[str, Any]) -> None:
+        self.add_fields(int(booking['ID']), booking.get('Name'), booking.get('Phone'), booking.get('Email'))
+
+    def add_fields(self, booking_id: int, name: Any, phone: Any, email: Any) -> None:
+        with self._lock:
+            self._remove(booking_id)
+            for token, _ in self._insert(booking_id, name, phone, email):
+                position = bisect_right(self._tokens, token)
+                self._tokens.insert(position, token)
+                self._token_ids.insert(position, booking_id)
+
+    def add_many(self, bookings: Iterable[Dict[str, Any]]) -> None:
+        # The new entries are spliced into the token table in one pass of
+        # slice copies instead of an insert (and list shift) per token.
+        with self._lock:
+            entries = []
+            for booking in bookings:
+                booking_id = int(booking['ID'])
+                self._remove(booking_id)
+                entries.extend(self._insert(booking_id, booking.get('Name'), booking.get('Phone'), booking.get('Email')))
+            entries.sort()
+            tokens, token_ids, previous = [], [], 0
+            for token, booking_id in entries:
+                position = bisect_right(self._tokens, token, previous)
+                tokens.extend(self._tokens[previous:position])
+                token_ids.extend(self._token_ids[previous:position])
+                tokens.append(token)
+                token_ids.append(booking_id)
+                previous = position
+            tokens.extend(self._tokens[previous:])
+            token_ids.extend(self._token_ids[previous:])
+            self._tokens, self._token_ids = tokens, token_ids
+
+    def remove(self, booking_id: int) -> None:
+        with self._lock:
+            self._remove(booking_id)
+
+    def search(self, text: str, limit: int = 50, offset: int = 0) -> Tuple[List[int], int]:
+        return page_tiers(self.tiers(text), limit, offset)
+
+    def ranked_ids(self, text: str) -> List[int]:
+        return rank_tiers(self.tiers(text))
+
+    def tiers(self, text: str) -> List[Set[int]]:
+        with self._lock:
+            return self._tiers(text)
+
+    def _remove(self, booking_id: int) -> None:
+        text = self._text.pop(booking_id, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            postings = self._grams[gram]
+            postings.discard(booking_id)
+            if not postings:
+                del self._grams[gram]
+        for token, _ in self._entries(booking_id, text):
+            position = bisect_left(self._tokens, token)
+            while self._token_ids[position] != booking_id:
+                position += 1
+            del self._tokens[position]
+            del self._token_ids[position]
+
+    def _tiers(self, text: str) -> List[Set[int]]:
+        query = normalize(text)
+        if PHONE_QUERY.fullmatch(query):
+            query = phone_digits(query)
+        if not query:
+            return []
+
+        lo = bisect_left(self._tokens, query)
+        exact_hi = bisect_right(self._tokens, query, lo)
+        prefix_hi = bisect_left(self._tokens, query + '\uffff', exact_hi)
+        exact = set(self._token_ids[lo:exact_hi])
+        prefix = set(self._token_ids[exact_hi:prefix_hi]) - exact
+        if len(query) < 3:
+            return [exact, prefix]
+        return [exact, prefix, self._substring_ids(query, exact | prefix)]
+
+    def _substring_ids(self, query: str, found: Set[int]) -> Set[int]:
+        postings = sorted((self._grams.get(gram, set()) for gram in trigrams(query)), key=len)
+        if not postings[0]:
+            return set()
+        candidates = postings[0].difference(found).intersection(*postings[1:])
+        if len(query) == 3:
+            return candidates
+        return {booking_id for booking_id in candidates if query in self._text[booking_id]}
+
+    def _insert(self, booking_id: int, name: Any, phone: Any, email: Any) -> List[Tuple[str, int]]:
+        text = self._text[booking_id] = self._join(name, phone, email)
+        for gram in trigrams(text):
+            self._grams[gram].add(booking_id)
+        return self._entries(booking_id, text)
+
+    @staticmethod
+    def _join(name: Any, phone: Any, email: Any) -> str:
+        # The fields are kept as one string with \x1f separators; queries are
+        # normalised text, so they never match across a field boundary.
+        return '\x1f'.join((normalize(name), phone_digits(phone), normalize(email)))
+
+    @staticmethod
+    def _entries(booking_id: int, text: str) -> Iterable[Tuple[str, int]]:
+        name, phone, email = text.split('\x1f')
+        tokens = set(name.split()) | {name, phone, email, email.split('@')[0]}
+        tokens.discard('')
+        return [(token, booking_id) for token in sorted(tokens)]
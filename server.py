@@ -0,0 +1,298 @@
+import argparse
+import asyncio
+import json
+import logging
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from analytics import SEASON_FREQ
+from app_logging import configure_logging, stop_logging
+from booking_engine import (EXTRAS_OPTIONS, EXTRAS_QUANTITIES, Booking, BookingEngine, BookingError,
+                            BookingConflictError, BookingNotFoundError)
+from instrumentation import metrics
+from io_worker import IOWorker
+from journal import encode_record
+
+ANALYTICS_PERIODS = {'season': SEASON_FREQ, 'month': 'MS', 'year': 'YS'}
+
+Response = Tuple[int, Dict[str, Any]]
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class BookingServer:
+    # HTTP/1.1 + JSON front end over a BookingEngine for the front desk,
+    # enquiry form and kiosk. Everything runs on one event loop: reads are
+    # answered straight from the engine's in-memory store, and writes take
+    # write_lock, apply to the engine, then wait for the IOWorker to make
+    # them durable before replying.
+    def __init__(self, engine: Optional[BookingEngine] = None, host: str = '127.0.0.1', port: int = 8080):
+        self.engine = engine if engine is not None else BookingEngine()
+        self.host = host
+        self.port = port
+        self.io = IOWorker(name='booking-server-io')
+        self.engine.repository.writer = self.io
+        self.write_lock = asyncio.Lock()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> asyncio.AbstractServer:
+        self.engine.load()
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logging.info(f"Booking server listening on {self.host}:{self.port}")
+        return self._server
+
+    async def serve_forever(self) -> None:
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.io.close()
+        self.engine.close()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, value = line.decode('latin-1').split(':', 1)
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length') or 0))
+
+                status, payload = await self.dispatch(method, target, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logging.debug("Dropping client connection: %s", e)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Response:
+        url = urlsplit(target)
+        path = [part for part in url.path.split('/') if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if path == ['availability'] and method == 'GET':
+                return self.availability(query)
+            if path == ['search'] and method == 'GET':
+                return self.search(query)
+            if path == ['report'] and method == 'GET':
+                return self.report(query)
+            if path == ['analytics'] and method == 'GET':
+                return self.analytics(query)
+            if path == ['extras'] and method == 'GET':
+                return self.extras(query)
+            if path == ['pricing'] and method == 'GET':
+                return self.pricing(query)
+            if path == ['metrics'] and method == 'GET':
+                return 200, {'operations': metrics.snapshot()}
+            if path == ['bookings'] and method == 'POST':
+                return await self.write(self.add_booking, self._json(body))
+            if len(path) == 2 and path[0] == 'bookings':
+                booking_id = _int(path[1], 'booking id')
+                if method == 'GET':
+                    return self.get_booking(booking_id)
+                if method == 'PUT':
+                    return await self.write(self.update_booking, booking_id, self._json(body))
+                if method == 'DELETE':
+                    return await self.write(self.delete_booking, booking_id)
+                raise RequestError(405, f"{method} is not supported on {url.path}")
+            raise RequestError(404, f"No route for {method} {url.path}")
+        except RequestError as e:
+            return e.status, {'error': str(e)}
+        except BookingNotFoundError as e:
+            return 404, {'error': str(e)}
+        except BookingConflictError as e:
+            return 409, {'error': str(e)}
+        except BookingError as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            logging.error(f"Error handling {method} {target}: {e}")
+            return 500, {'error': 'Internal server error'}
+
+    async def write(self, handler: Any, *args: Any) -> Response:
+        async with self.write_lock:
+            response = handler(*args)
+            await asyncio.get_running_loop().run_in_executor(None, self.io.flush)
+        return response
+
+    def availability(self, query: Dict[str, str]) -> Response:
+        campsite = _required(query, 'campsite')
+        start_date, end_date = _date(query, 'start'), _date(query, 'end')
+        exclude_id = _int(query['exclude'], 'exclude') if 'exclude' in query else None
+        conflicts = self.engine.repository.overlapping_ids(campsite, start_date, end_date, exclude_id)
+        return 200, {'campsite': campsite, 'available': not conflicts, 'conflicts': conflicts}
+
+    def search(self, query: Dict[str, str]) -> Response:
+        if 'date' in query:
+            return 200, {'bookings': _records(self.engine.search(query.get('name', ''), _date(query, 'date')))}
+        limit, offset = _int(query.get('limit', 50), 'limit'), _int(query.get('offset', 0), 'offset')
+        ids, total = self.engine.search_ids(_required(query, 'name'), limit, offset)
+        return 200, {'bookings': _records(self.engine.bookings_by_ids(ids)), 'total': total, 'offset': offset}
+
+    def report(self, query: Dict[str, str]) -> Response:
+        return 200, {'bookings': _records(self.engine.report(_date(query, 'start'), _date(query, 'end')))}
+
+    def analytics(self, query: Dict[str, str]) -> Response:
+        # by=day (default), campsite, season, month or year; all answered
+        # from the engine's daily rollups.
+        start_date, end_date = _date(query, 'start'), _date(query, 'end')
+        rollups = self.engine.rollups()
+        by = query.get('by', 'day')
+        if by == 'day':
+            table = rollups.daily(start_date, end_date)
+        elif by == 'campsite':
+            table = rollups.by_campsite(start_date, end_date)
+        elif by in ANALYTICS_PERIODS:
+            table = rollups.by_period(start_date, end_date, ANALYTICS_PERIODS[by])
+        else:
+            raise RequestError(400, f"by must be one of day, campsite, {', '.join(ANALYTICS_PERIODS)}")
+        for key in ('Date', 'Period'):
+            if key in table.columns:
+                table[key] = table[key].dt.strftime('%Y-%m-%d')
+        return 200, {'by': by, 'rows': table.to_dict('records')}
+
+    def get_booking(self, booking_id: int) -> Response:
+        booking = self.engine.get_booking(booking_id)
+        if booking is None:
+            raise BookingNotFoundError(booking_id)
+        items = [dict(zip(['item', 'quantity', 'unit_price', 'amount'], line)) for line in self.engine.ledger.items(booking_id)]
+        return 200, {'booking': _booking_json(booking), 'extras_items': items}
+
+    def extras(self, query: Dict[str, str]) -> Response:
+        # Quantities per arrival day, e.g. ?items=Fire Wood,Breakfast Special
+        items = [item.strip() for item in query['items'].split(',')] if query.get('items') else None
+        table = self.engine.extras_needed(_date(query, 'start'), _date(query, 'end'), items)
+        return 200, {'days': [dict({'Date': date.strftime('%Y-%m-%d')}, **record) for date, record in zip(table.index, table.to_dict('records'))]}
+
+    def pricing(self, query: Dict[str, str]) -> Response:
+        table = self.engine.price_bookings(_date(query, 'start'), _date(query, 'end'))
+        return 200, {'bookings': table.to_dict('records')}
+
+    def add_booking(self, data: Dict[str, Any]) -> Response:
+        request = _booking_request(data)
+        if request[0]['Is Group Booking']:
+            # Split across as many campsites as the group needs.
+            bookings, extras_cost = self.engine.add_group_booking(*request)
+            return 201, {'bookings': [_booking_json(booking) for booking in bookings], 'extras_cost': extras_cost}
+        booking, extras_cost = self.engine.add_booking(*request)
+        return 201, {'booking': _booking_json(booking), 'extras_cost': extras_cost}
+
+    def update_booking(self, booking_id: int, data: Dict[str, Any]) -> Response:
+        booking, extras_cost = self.engine.update_booking(booking_id, *_booking_request(data))
+        return 200, {'booking': _booking_json(booking), 'extras_cost': extras_cost}
+
+    def delete_booking(self, booking_id: int) -> Response:
+        self.engine.delete_booking(booking_id)
+        return 200, {'deleted': booking_id}
+
+    @staticmethod
+    def _json(body: bytes) -> Dict[str, Any]:
+        try:
+            data = json.loads(body or b'{}')
+        except json.JSONDecodeError as e:
+            raise RequestError(400, f"Invalid JSON body: {e}")
+        if not isinstance(data, dict):
+            raise RequestError(400, "Request body must be a JSON object.")
+        return data
+
+
+def _required(query: Dict[str, str], key: str) -> str:
+    if not query.get(key):
+        raise RequestError(400, f"Missing required parameter '{key}'.")
+    return query[key]
+
+
+def _date(query: Dict[str, Any], key: str) -> pd.Timestamp:
+    try:
+        return pd.Timestamp(_required(query, key)).normalize()
+    except ValueError:
+        raise RequestError(400, f"Parameter '{key}' must be a date (YYYY-MM-DD).")
+
+
+def _int(value: Any, label: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RequestError(400, f"The {label} must be a number.")
+
+
+def _booking_request(data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, int], Dict[str, bool], bool]:
+    extras = data.get('extras') or {}
+    booking_data = {
+        'Name': data.get('name', ''),
+        'Phone': data.get('phone', ''),
+        'Email': data.get('email', ''),
+        'Campsite': data.get('campsite', ''),
+        'Start Date': _date(data, 'start_date'),
+        'End Date': _date(data, 'end_date'),
+        'People': _int(data.get('people', 0), 'people count'),
+        'Status': data.get('status', 'Pending'),
+        'Kayaks': bool(data.get('kayaks', False)),
+        'Kayaks Count': _int(data.get('kayaks_count', 0), 'kayak count'),
+        'Is Group Booking': bool(data.get('is_group_booking', False))
+    }
+    quantities = {key: _int(extras.get(key, 0), key) for key in EXTRAS_QUANTITIES}
+    quantities['Kayaks Count'] = booking_data['Kayaks Count']
+    options = {key: bool(extras.get(key, False)) for key in EXTRAS_OPTIONS}
+    options['Kayaks'] = booking_data['Kayaks']
+    return booking_data, quantities, options, bool(data.get('extras_paid', False))
+
+
+def _booking_json(booking: Booking) -> Dict[str, Any]:
+    return _record_json(booking.to_dict())
+
+
+def _record_json(record: Dict[str, Any]) -> Dict[str, Any]:
+    record = encode_record(record)
+    for key in ('Start Date', 'End Date'):
+        if record.get(key):
+            record[key] = record[key][:10]
+    return record
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    return [_record_json(record) for record in df.to_dict('records')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the booking engine over HTTP/JSON.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+    configure_logging()
+    try:
+        asyncio.run(BookingServer(host=args.host, port=args.port).serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_logging()